@@ -0,0 +1,195 @@
+"""
+Abuse Module for NOVAXA Bot
+--------------------------
+This module bans users who keep trying what they are not allowed to.
+
+The detector follows the security events as they are published: every
+denied command and failed owner verification counts against its user. A
+user who reaches the threshold within the sliding window is banned for a
+while, and the update pipeline drops their updates at ingestion, before
+they are parsed or reach a handler, with one dict lookup.
+
+Memory stays bounded however many users attack: each user keeps only the
+times of their last ``threshold`` attempts, and the least recently seen
+users are forgotten beyond ``max_users``. Bans expire by themselves. The
+owner gets the bans and unbans in one digest message per interval, not
+one message per ban.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterable, Optional
+
+from dispatch import update_sender
+from metrics import metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+# The events engine.registry logs for denied commands, and IPProtection's.
+ABUSE_EVENTS = (
+    "unauthorized_access",
+    "unauthorized_token_access",
+    "unauthorized_broadcast",
+    "owner_verification_failed",
+)
+
+
+class AbuseDetector:
+    """Class for banning users whose denied requests exceed a rate."""
+
+    def __init__(self, threshold: int = 5, window: float = 60.0, ban_duration: float = 900.0,
+                 max_users: int = 10000, event_types: Iterable[str] = ABUSE_EVENTS,
+                 exempt_ids: Iterable[int] = (), notify: Callable[[str], None] = None,
+                 max_digest: int = 50, security_monitor=None, metrics=None,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the detector.
+
+        Args:
+            threshold: Denied requests within the window that get a user banned
+            window: Seconds the attempts are counted over
+            ban_duration: Seconds a ban lasts
+            max_users: Users whose attempts are tracked at most
+            event_types: Security events that count as denied requests
+            exempt_ids: User IDs never banned, e.g. the owner and admins
+            notify: Sends a digest to the owner; digests are only logged if not given
+            max_digest: Lines in one digest; further bans and unbans are counted
+            security_monitor: security.SecurityMonitor recording bans and unbans
+            metrics: Metrics registry, defaults to the shared one
+            clock: Time source, for tests
+        """
+        self.threshold = max(1, threshold)
+        self.window = window
+        self.ban_duration = ban_duration
+        self.max_users = max_users
+        self.event_types = frozenset(event_types)
+        self.exempt_ids = {uid for uid in exempt_ids if uid}
+        self.notify = notify
+        self.max_digest = max_digest
+        self.security_monitor = security_monitor
+        self.metrics = metrics or default_metrics
+        self.clock = clock
+        self._attempts: "OrderedDict[int, deque]" = OrderedDict()
+        self._bans: Dict[int, float] = {}
+        self._digest = []
+        self._digest_overflow = 0
+        self._lock = threading.Lock()
+
+    def attach(self, bus):
+        """Follow the abuse events published on an eventlog.EventBus."""
+        for event_type in self.event_types:
+            bus.subscribe(self.observe, event_type)
+
+    def detach(self, bus):
+        """Stop following the events of a bus."""
+        for event_type in self.event_types:
+            bus.unsubscribe(self.observe, event_type)
+
+    def observe(self, event: Dict):
+        """Count a security event against its user and ban them past the threshold."""
+        if event.get("type") not in self.event_types:
+            return
+        user_id = event.get("user_id")
+        if user_id is None or user_id in self.exempt_ids:
+            return
+
+        now = self.clock()
+        with self._lock:
+            if user_id in self._bans:
+                # Updates already queued when the ban started.
+                return
+            attempts = self._attempts.get(user_id)
+            if attempts is None:
+                attempts = self._attempts[user_id] = deque(maxlen=self.threshold)
+                if len(self._attempts) > self.max_users:
+                    self._attempts.popitem(last=False)
+            else:
+                self._attempts.move_to_end(user_id)
+            attempts.append(now)
+            if len(attempts) < self.threshold or now - attempts[0] > self.window:
+                return
+
+            del self._attempts[user_id]
+            self._bans[user_id] = now + self.ban_duration
+            self._add_to_digest(f"🚫 Banned {user_id} for {self.ban_duration / 60:g} min: "
+                                f"{self.threshold} denied requests within {self.window:g}s, "
+                                f"last {event['type']}")
+
+        self.metrics.increment("abuse_bans")
+        logger.warning(f"Banned user {user_id} for {self.ban_duration:g}s after "
+                       f"{self.threshold} denied requests")
+        if self.security_monitor:
+            self.security_monitor.log_event(
+                "user_banned", {"duration": self.ban_duration, "trigger": event["type"]}, user_id
+            )
+
+    def is_banned(self, user_id: Optional[int]) -> bool:
+        """Check whether a user is banned now; an expired ban is lifted on the way."""
+        expires = self._bans.get(user_id)
+        if expires is None:
+            return False
+        if expires > self.clock():
+            return True
+        self._lift(user_id, expires)
+        return False
+
+    def blocks(self, raw: Dict) -> bool:
+        """Check whether a raw update comes from a banned user, for the pipeline."""
+        return bool(self._bans) and self.is_banned(update_sender(raw))
+
+    def _lift(self, user_id: int, expires: float):
+        """Lift an expired ban, unless another thread already did."""
+        with self._lock:
+            if self._bans.get(user_id) != expires:
+                return
+            del self._bans[user_id]
+            self._add_to_digest(f"✅ Unbanned {user_id}")
+
+        self.metrics.increment("abuse_unbans")
+        logger.info(f"Ban of user {user_id} expired")
+        if self.security_monitor:
+            self.security_monitor.log_event("user_unbanned", {}, user_id)
+
+    def _add_to_digest(self, line: str):
+        """Queue a line for the next digest. Called with the lock held."""
+        if len(self._digest) < self.max_digest:
+            self._digest.append(line)
+        else:
+            self._digest_overflow += 1
+
+    def sweep(self):
+        """Lift every ban that has expired, so the digest reports it on time."""
+        now = self.clock()
+        for user_id, expires in list(self._bans.items()):
+            if expires <= now:
+                self._lift(user_id, expires)
+
+    def send_digest(self):
+        """Report the bans and unbans since the last digest in one message.
+
+        Runs on the job scheduler; an empty digest sends nothing.
+        """
+        self.sweep()
+        with self._lock:
+            lines, overflow = self._digest, self._digest_overflow
+            self._digest, self._digest_overflow = [], 0
+        if not lines:
+            return
+        if overflow:
+            lines.append(f"… and {overflow} more")
+        text = "🛡 Abuse report\n\n" + "\n".join(lines)
+
+        if self.notify is None:
+            logger.info(text)
+            return
+        try:
+            self.notify(text)
+        except Exception as e:
+            logger.error(f"Could not send the abuse digest: {e}")
+
+    def stats(self) -> Dict:
+        """Get the tracked users and current bans, for the dashboard and tests."""
+        with self._lock:
+            return {"tracked": len(self._attempts), "banned": len(self._bans),
+                    "digest": len(self._digest) + self._digest_overflow}
@@ -0,0 +1,733 @@
+"""
+Broadcast Module for NOVAXA Bot
+------------------------------
+This module sends a message to every active subscriber.
+
+Recipients are streamed from the subscriber store in pages and sent through
+a small pool of workers that share a token-bucket rate limit, so a broadcast
+stays inside Telegram's limits regardless of audience size. Chats that have
+blocked the bot are marked so later broadcasts skip them.
+
+Broadcasts run as jobs persisted in SQLite with a cursor checkpoint, so they
+survive restarts without double-sending and can be paused, resumed or
+cancelled from the bot or the dashboard.
+"""
+
+import os
+import logging
+import secrets
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from metrics import metrics as default_metrics
+from scheduler import get_scheduler
+
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=logging.INFO,
+)
+logger = logging.getLogger(__name__)
+
+# Telegram allows roughly 30 messages per second across different chats.
+DEFAULT_RATE = 25.0
+MAX_RETRIES = 3
+
+RESULT_SENT = "sent"
+RESULT_BLOCKED = "blocked"
+RESULT_FAILED = "failed"
+RESULT_ABORTED = "aborted"
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_PAUSED = "paused"
+JOB_CANCELLED = "cancelled"
+JOB_COMPLETED = "completed"
+
+# Control action -> (new status, statuses it may be applied to).
+JOB_TRANSITIONS = {
+    "pause": (JOB_PAUSED, [JOB_QUEUED, JOB_RUNNING]),
+    "resume": (JOB_QUEUED, [JOB_PAUSED]),
+    "cancel": (JOB_CANCELLED, [JOB_QUEUED, JOB_RUNNING, JOB_PAUSED]),
+}
+
+JOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS broadcast_jobs (
+    id TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    parse_mode TEXT,
+    status TEXT NOT NULL,
+    cursor INTEGER,
+    total INTEGER NOT NULL DEFAULT 0,
+    sent INTEGER NOT NULL DEFAULT 0,
+    blocked INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_by INTEGER,
+    progress_chat_id INTEGER,
+    progress_message_id INTEGER,
+    created TEXT NOT NULL,
+    updated TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_broadcast_jobs_status ON broadcast_jobs (status, created);
+"""
+
+JOB_COLUMNS = ("id", "text", "parse_mode", "status", "cursor", "total", "sent", "blocked",
+               "failed", "created_by", "progress_chat_id", "progress_message_id",
+               "created", "updated")
+
+
+class RateLimiter:
+    """Token bucket shared by the broadcast workers."""
+
+    def __init__(self, rate: float, burst: int = None):
+        """Initialize the rate limiter.
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity, defaults to one second's worth
+        """
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event: threading.Event = None) -> bool:
+        """Wait for a token.
+
+        Args:
+            stop_event: Event that aborts the wait when set
+
+        Returns:
+            bool: True if a token was taken, False if the wait was aborted
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self.blocked_until:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return True
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    wait = self.blocked_until - now
+
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for a while, e.g. after a 429."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+            self.updated = self.blocked_until
+
+
+class BroadcastStats:
+    """Running counters for one broadcast."""
+
+    def __init__(self, total: int = 0, sent: int = 0, blocked: int = 0, failed: int = 0):
+        """Initialize the counters, optionally carrying on from a checkpoint."""
+        self.total = total
+        self.sent = sent
+        self.blocked = blocked
+        self.failed = failed
+        self.resumed_from = sent + blocked + failed
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, result: str):
+        """Count the result of one delivery."""
+        with self._lock:
+            if result == RESULT_SENT:
+                self.sent += 1
+            elif result == RESULT_BLOCKED:
+                self.blocked += 1
+            elif result == RESULT_FAILED:
+                self.failed += 1
+
+    @property
+    def done(self) -> int:
+        """Number of recipients processed so far."""
+        return self.sent + self.blocked + self.failed
+
+    def to_dict(self) -> Dict:
+        """Get a snapshot including throughput."""
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            done = self.sent + self.blocked + self.failed
+            return {
+                "total": self.total,
+                "done": done,
+                "sent": self.sent,
+                "blocked": self.blocked,
+                "failed": self.failed,
+                "elapsed": round(elapsed, 1),
+                "rate": round((done - self.resumed_from) / elapsed, 2) if elapsed > 0 else 0.0,
+            }
+
+
+class BroadcastEngine:
+    """Class for fanning a message out to every active subscriber."""
+
+    def __init__(self, bot, store, rate: float = DEFAULT_RATE, workers: int = 4,
+                 page_size: int = 500, progress_interval: float = 5.0, metrics=None):
+        """Initialize the broadcast engine.
+
+        Args:
+            bot: telebot.TeleBot instance used to send messages
+            store: SubscriberStore supplying recipients
+            rate: Messages per second across all workers
+            workers: Number of concurrent senders
+            page_size: Recipients fetched from the store per query
+            progress_interval: Minimum seconds between progress reports
+            metrics: Metrics registry, defaults to the shared one
+        """
+        self.bot = bot
+        self.store = store
+        self.limiter = RateLimiter(rate)
+        self.workers = workers
+        self.page_size = page_size
+        self.progress_interval = progress_interval
+        self.metrics = metrics or default_metrics
+
+    def deliver(self, chat_id: int, text: str, parse_mode: str = None,
+                stop_event: threading.Event = None) -> str:
+        """Send the message to one chat, honouring the rate limit.
+
+        Returns:
+            str: "sent", "blocked", "failed", or "aborted" if the broadcast
+                was stopped before this chat was attempted
+        """
+        for _ in range(MAX_RETRIES):
+            if not self.limiter.acquire(stop_event):
+                return RESULT_ABORTED
+
+            try:
+                self.bot.send_message(chat_id, text, parse_mode=parse_mode)
+                return RESULT_SENT
+            except Exception as e:
+                error_code = getattr(e, "error_code", None)
+
+                if error_code == 403:
+                    self.store.mark_blocked(chat_id)
+                    return RESULT_BLOCKED
+
+                if error_code == 429:
+                    result_json = getattr(e, "result_json", None) or {}
+                    retry_after = result_json.get("parameters", {}).get("retry_after", 1)
+                    logger.warning(f"Broadcast throttled by Telegram, pausing {retry_after}s")
+                    self.limiter.pause(retry_after)
+                    continue
+
+                logger.error(f"Error broadcasting to {chat_id}: {e}")
+                return RESULT_FAILED
+
+        return RESULT_FAILED
+
+    def run(self, text: str, parse_mode: str = None, on_progress: Callable[[Dict], None] = None,
+            stop_event: threading.Event = None, after: int = None, stats: BroadcastStats = None,
+            on_checkpoint: Callable[[Optional[int], Dict], None] = None,
+            checkpoint_every: int = 100) -> Dict:
+        """Broadcast a message and block until every recipient is processed.
+
+        Recipients are sent in ascending chat ID order. The checkpoint cursor
+        is the highest chat ID below which every recipient has been
+        processed, so resuming after it never skips anyone and re-sends at
+        most the chats that were in flight when the checkpoint was taken.
+
+        Args:
+            text: Message text
+            parse_mode: Telegram parse mode
+            on_progress: Called with a stats snapshot at most every
+                ``progress_interval`` seconds and once at the end
+            stop_event: Event that stops the broadcast early when set
+            after: Resume after this chat ID
+            stats: Counters to continue from when resuming
+            on_checkpoint: Called with the cursor and a stats snapshot every
+                ``checkpoint_every`` processed recipients and once at the end
+            checkpoint_every: Recipients processed between checkpoints
+
+        Returns:
+            dict: Final stats, including the cursor and whether it was stopped
+        """
+        stats = stats or BroadcastStats(self.store.count())
+        in_flight = threading.BoundedSemaphore(self.workers * 2)
+        last_report = time.monotonic()
+
+        lock = threading.Lock()
+        order = deque()
+        finished = set()
+        progress = {"cursor": after, "since_checkpoint": 0}
+
+        def deliver(chat_id):
+            try:
+                result = self.deliver(chat_id, text, parse_mode, stop_event)
+                if result == RESULT_ABORTED:
+                    return
+                stats.add(result)
+                with lock:
+                    finished.add(chat_id)
+                    while order and order[0] in finished:
+                        progress["cursor"] = order.popleft()
+                        finished.discard(progress["cursor"])
+                    progress["since_checkpoint"] += 1
+            finally:
+                in_flight.release()
+
+        def checkpoint():
+            with lock:
+                cursor = progress["cursor"]
+                progress["since_checkpoint"] = 0
+            if on_checkpoint:
+                try:
+                    on_checkpoint(cursor, stats.to_dict())
+                except Exception as e:
+                    logger.error(f"Error checkpointing broadcast: {e}")
+
+        logger.info(f"Broadcast started to {stats.total} subscribers"
+                    + (f", resuming after chat {after}" if after is not None else ""))
+
+        with ThreadPoolExecutor(max_workers=self.workers,
+                                thread_name_prefix="novaxa-broadcast") as executor:
+            for chat_id in self.store.iter_active(after=after, page_size=self.page_size):
+                if stop_event is not None and stop_event.is_set():
+                    break
+
+                in_flight.acquire()
+                with lock:
+                    order.append(chat_id)
+                executor.submit(deliver, chat_id)
+
+                if progress["since_checkpoint"] >= checkpoint_every:
+                    checkpoint()
+
+                if time.monotonic() - last_report >= self.progress_interval:
+                    last_report = time.monotonic()
+                    self._report(stats, on_progress)
+
+        checkpoint()
+        snapshot = self._report(stats, on_progress, final=True)
+        snapshot["cursor"] = progress["cursor"]
+        snapshot["stopped"] = stop_event is not None and stop_event.is_set()
+        return snapshot
+
+    def start(self, text: str, parse_mode: str = None, on_progress: Callable[[Dict], None] = None,
+              on_complete: Callable[[Dict], None] = None) -> threading.Thread:
+        """Run a broadcast on a background thread.
+
+        Args:
+            text: Message text
+            parse_mode: Telegram parse mode
+            on_progress: Called with periodic stats snapshots
+            on_complete: Called with the final stats
+
+        Returns:
+            threading.Thread: The broadcast thread
+        """
+        def target():
+            try:
+                result = self.run(text, parse_mode, on_progress)
+            except Exception as e:
+                logger.error(f"Broadcast failed: {e}")
+                return
+            if on_complete:
+                on_complete(result)
+
+        thread = threading.Thread(target=target, name="novaxa-broadcast-job", daemon=True)
+        thread.start()
+        return thread
+
+    def _report(self, stats: BroadcastStats, on_progress: Callable = None, final: bool = False) -> Dict:
+        """Publish throughput to the log, metrics and the progress callback."""
+        snapshot = stats.to_dict()
+        self.metrics.set_gauge("broadcast_rate", snapshot["rate"])
+        self.metrics.set_gauge("broadcast_done", snapshot["done"])
+
+        if final:
+            self.metrics.increment("broadcast_sent", value=snapshot["sent"])
+            self.metrics.increment("broadcast_blocked", value=snapshot["blocked"])
+            self.metrics.increment("broadcast_failed", value=snapshot["failed"])
+
+        logger.info(f"Broadcast {'finished' if final else 'progress'}: "
+                    f"{snapshot['done']}/{snapshot['total']} at {snapshot['rate']} msg/s")
+
+        if on_progress:
+            try:
+                on_progress(snapshot)
+            except Exception as e:
+                logger.error(f"Error reporting broadcast progress: {e}")
+
+        return snapshot
+
+
+class BroadcastJobStore:
+    """Class for persisting broadcast jobs and their checkpoints.
+
+    The dashboard opens the same database to pause, resume and cancel jobs;
+    the bot picks those changes up at its next checkpoint or poll.
+    """
+
+    def __init__(self, db_file: str = "data/broadcasts.db"):
+        """Initialize the job store.
+
+        Args:
+            db_file: Path to the SQLite database
+        """
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """The database connection, opened on first use rather than at startup."""
+        with self._connect_lock:
+            if self._connection is None:
+                if os.path.dirname(self.db_file):
+                    os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+
+                conn = sqlite3.connect(self.db_file, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(JOB_SCHEMA)
+                conn.commit()
+                self._connection = conn
+            return self._connection
+
+    def create(self, text: str, parse_mode: str = None, total: int = 0, created_by: int = None,
+               progress_chat_id: int = None, progress_message_id: int = None) -> str:
+        """Create a queued job.
+
+        Returns:
+            str: Job ID
+        """
+        job_id = secrets.token_hex(4)
+        timestamp = datetime.now().isoformat()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO broadcast_jobs (id, text, parse_mode, status, total, created_by, "
+                "progress_chat_id, progress_message_id, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, text, parse_mode, JOB_QUEUED, total, created_by,
+                 progress_chat_id, progress_message_id, timestamp, timestamp),
+            )
+            self._conn.commit()
+
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Get a job."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM broadcast_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return dict(zip(JOB_COLUMNS, row)) if row else None
+
+    def get_status(self, job_id: str) -> Optional[str]:
+        """Get just the status of a job."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status FROM broadcast_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def list(self, statuses: List[str] = None, limit: int = 20) -> List[Dict]:
+        """List jobs, oldest first when filtering by status, newest first otherwise."""
+        with self._lock:
+            if statuses:
+                placeholders = ", ".join("?" for _ in statuses)
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(JOB_COLUMNS)} FROM broadcast_jobs "
+                    f"WHERE status IN ({placeholders}) ORDER BY created LIMIT ?",
+                    (*statuses, limit),
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(JOB_COLUMNS)} FROM broadcast_jobs "
+                    f"ORDER BY created DESC LIMIT ?",
+                    (limit,),
+                ).fetchall()
+        return [dict(zip(JOB_COLUMNS, row)) for row in rows]
+
+    def set_status(self, job_id: str, status: str, expected: List[str] = None) -> bool:
+        """Change a job's status.
+
+        Args:
+            job_id: Job ID
+            status: New status
+            expected: Only change it if the current status is one of these
+
+        Returns:
+            bool: True if the job was updated
+        """
+        timestamp = datetime.now().isoformat()
+        with self._lock:
+            if expected:
+                placeholders = ", ".join("?" for _ in expected)
+                cursor = self._conn.execute(
+                    f"UPDATE broadcast_jobs SET status = ?, updated = ? "
+                    f"WHERE id = ? AND status IN ({placeholders})",
+                    (status, timestamp, job_id, *expected),
+                )
+            else:
+                cursor = self._conn.execute(
+                    "UPDATE broadcast_jobs SET status = ?, updated = ? WHERE id = ?",
+                    (status, timestamp, job_id),
+                )
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def apply(self, job_id: str, action: str) -> bool:
+        """Apply a control action ("pause", "resume" or "cancel") to a job.
+
+        Returns:
+            bool: True if the job was in a state the action applies to
+        """
+        status, expected = JOB_TRANSITIONS[action]
+        return self.set_status(job_id, status, expected)
+
+    def checkpoint(self, job_id: str, cursor: Optional[int], stats: Dict):
+        """Persist a job's cursor and counters."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE broadcast_jobs SET cursor = ?, sent = ?, blocked = ?, failed = ?, updated = ? "
+                "WHERE id = ?",
+                (cursor, stats["sent"], stats["blocked"], stats["failed"],
+                 datetime.now().isoformat(), job_id),
+            )
+            self._conn.commit()
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock, self._connect_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class BroadcastManager:
+    """Class for running persisted broadcast jobs one at a time."""
+
+    def __init__(self, engine: BroadcastEngine, jobs: BroadcastJobStore,
+                 checkpoint_every: int = 100, progress_interval: float = 10.0):
+        """Initialize the broadcast manager.
+
+        Args:
+            engine: Engine that performs the sends
+            jobs: Job store
+            checkpoint_every: Sends between cursor checkpoints
+            progress_interval: Minimum seconds between progress message edits
+        """
+        self.engine = engine
+        self.jobs = jobs
+        self.checkpoint_every = checkpoint_every
+        self.progress_interval = progress_interval
+        self.active_job_id = None
+        self.closing = False
+        self._stop_event = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, text: str, parse_mode: str = None, created_by: int = None,
+               progress_chat_id: int = None) -> str:
+        """Queue a broadcast and start it if nothing else is running.
+
+        Args:
+            text: Message text
+            parse_mode: Telegram parse mode
+            created_by: User ID of the admin who started it
+            progress_chat_id: Chat that gets a live progress message
+
+        Returns:
+            str: Job ID
+        """
+        progress_message_id = None
+        if progress_chat_id is not None:
+            try:
+                progress_message_id = self.engine.bot.send_message(
+                    progress_chat_id, "📣 Broadcast queued..."
+                ).message_id
+            except Exception as e:
+                logger.error(f"Error sending broadcast progress message: {e}")
+
+        job_id = self.jobs.create(text, parse_mode, self.engine.store.count(), created_by,
+                                  progress_chat_id, progress_message_id)
+        logger.info(f"Broadcast job {job_id} queued")
+
+        self.poll()
+        return job_id
+
+    def pause(self, job_id: str) -> bool:
+        """Pause a queued or running job at its next checkpoint."""
+        return self.control(job_id, "pause")
+
+    def resume(self, job_id: str) -> bool:
+        """Requeue a paused job."""
+        return self.control(job_id, "resume")
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not finished."""
+        return self.control(job_id, "cancel")
+
+    def control(self, job_id: str, action: str) -> bool:
+        """Apply a control action to a job and act on it in this process."""
+        if not self.jobs.apply(job_id, action):
+            return False
+
+        logger.info(f"Broadcast job {job_id}: {action}")
+        if action == "resume":
+            self.poll()
+        else:
+            self._stop_if_active(job_id)
+        return True
+
+    def recover(self):
+        """Requeue jobs left running by a previous process and start them.
+
+        Call once at startup, before any job is started in this process.
+        """
+        for job in self.jobs.list([JOB_RUNNING], limit=1000):
+            self.jobs.set_status(job["id"], JOB_QUEUED, [JOB_RUNNING])
+            logger.info(f"Broadcast job {job['id']} will resume after chat {job['cursor']}")
+        self.poll()
+
+    def poll(self):
+        """Start the oldest queued job if no job is running."""
+        with self._lock:
+            if self.closing or (self._thread is not None and self._thread.is_alive()):
+                return
+
+            queued = self.jobs.list([JOB_QUEUED], limit=1)
+            if not queued:
+                return
+
+            job = queued[0]
+            if not self.jobs.set_status(job["id"], JOB_RUNNING, [JOB_QUEUED]):
+                return
+
+            self.active_job_id = job["id"]
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(job, self._stop_event),
+                                            name=f"novaxa-broadcast-{job['id']}", daemon=True)
+            self._thread.start()
+
+    def shutdown(self, timeout: float = 5.0) -> Optional[Dict]:
+        """Stop the running job at a checkpoint and start no others.
+
+        The job stays marked running, so ``recover`` in the next process
+        resumes it from the checkpoint.
+
+        Args:
+            timeout: Maximum seconds to wait for the job to checkpoint
+
+        Returns:
+            dict: The suspended job's ID, cursor and whether it checkpointed
+                in time, or None if no job was running
+        """
+        with self._lock:
+            self.closing = True
+            job_id, thread = self.active_job_id, self._thread
+            if self._stop_event is not None:
+                self._stop_event.set()
+
+        if thread is None:
+            return None
+
+        thread.join(timeout=timeout)
+        job = self.jobs.get(job_id)
+        return {"job_id": job_id, "cursor": job["cursor"] if job else None,
+                "checkpointed": not thread.is_alive()}
+
+    def _stop_if_active(self, job_id: str):
+        """Signal the running job to stop if it is the given one."""
+        with self._lock:
+            if self.active_job_id == job_id and self._stop_event is not None:
+                self._stop_event.set()
+
+    def _run(self, job: Dict, stop_event: threading.Event):
+        """Run one job to completion, pause or cancellation."""
+        job_id = job["id"]
+        stats = BroadcastStats(job["total"], job["sent"], job["blocked"], job["failed"])
+        last_edit = [0.0]
+
+        def on_checkpoint(cursor, snapshot):
+            self.jobs.checkpoint(job_id, cursor, snapshot)
+            # Pause and cancel may come from another process, e.g. the dashboard.
+            if self.jobs.get_status(job_id) != JOB_RUNNING:
+                stop_event.set()
+
+        def on_progress(snapshot):
+            if time.monotonic() - last_edit[0] >= self.progress_interval:
+                last_edit[0] = time.monotonic()
+                self._show_progress(job, snapshot, JOB_RUNNING)
+
+        try:
+            result = self.engine.run(
+                job["text"], job["parse_mode"], on_progress=on_progress, stop_event=stop_event,
+                after=job["cursor"], stats=stats, on_checkpoint=on_checkpoint,
+                checkpoint_every=self.checkpoint_every,
+            )
+        except Exception as e:
+            logger.error(f"Broadcast job {job_id} failed: {e}")
+            self.jobs.set_status(job_id, JOB_PAUSED, [JOB_RUNNING])
+            result = None
+
+        if result is not None and not result["stopped"]:
+            self.jobs.set_status(job_id, JOB_COMPLETED, [JOB_RUNNING])
+
+        status = self.jobs.get_status(job_id)
+        logger.info(f"Broadcast job {job_id} {status}")
+        if result is not None:
+            self._show_progress(job, result, status)
+
+        with self._lock:
+            self.active_job_id = None
+            self._stop_event = None
+            self._thread = None
+
+        self.poll()
+
+    def _show_progress(self, job: Dict, snapshot: Dict, status: str):
+        """Edit the job's progress message in place."""
+        if not job["progress_chat_id"] or not job["progress_message_id"]:
+            return
+
+        total = snapshot["total"] or 1
+        text = (
+            f"📣 Broadcast {job['id']}: {status}\n\n"
+            f"Progress: {snapshot['done']}/{snapshot['total']} "
+            f"({min(100, snapshot['done'] * 100 // total)}%)\n"
+            f"Sent: {snapshot['sent']}\n"
+            f"Blocked: {snapshot['blocked']}\n"
+            f"Failed: {snapshot['failed']}\n"
+            f"Rate: {snapshot['rate']} msg/s"
+        )
+        try:
+            self.engine.bot.edit_message_text(text, chat_id=job["progress_chat_id"],
+                                              message_id=job["progress_message_id"])
+        except Exception as e:
+            logger.debug(f"Could not update broadcast progress message: {e}")
+
+    def start_watcher(self, interval: float = 5.0, idle_interval: float = 60.0, scheduler=None):
+        """Poll for jobs queued by other processes, e.g. resumed from the dashboard.
+
+        Args:
+            interval: Seconds between polls
+            idle_interval: Seconds between polls while the bot is idle
+            scheduler: Job scheduler to poll on, defaults to the shared one
+        """
+        if scheduler is None:
+            scheduler = get_scheduler()
+        return scheduler.add_job("broadcast_jobs", self.poll, interval, jitter=1.0,
+                                 idle_interval=idle_interval)
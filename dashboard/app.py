@@ -14,10 +14,12 @@ import psutil
 from flask import Flask, render_template, jsonify, request
 from dotenv import load_dotenv
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
 
 try:
     from monitor import SystemMonitor, PerformanceTracker
+    from broadcast import BroadcastJobStore, JOB_TRANSITIONS
 except ImportError as e:
     print(f"Error importing bot modules: {e}")
     print("Make sure the bot modules are in the parent directory.")
@@ -29,6 +31,7 @@ app = Flask(__name__)
 
 system_monitor = SystemMonitor()
 performance_tracker = PerformanceTracker()
+broadcast_jobs = BroadcastJobStore(os.path.join(BASE_DIR, "data", "broadcasts.db"))
 
 @app.route('/')
 def index():
@@ -65,5 +68,25 @@ def toggle_maintenance():
     maintenance_mode = system_monitor.toggle_maintenance_mode()
     return jsonify({"maintenance_mode": maintenance_mode})
 
+@app.route('/api/broadcasts')
+def broadcasts():
+    """Get recent broadcast jobs."""
+    count = request.args.get('count', default=20, type=int)
+    return jsonify(broadcast_jobs.list(limit=count))
+
+@app.route('/api/broadcasts/<job_id>/<action>', methods=['POST'])
+def control_broadcast(job_id, action):
+    """Pause, resume or cancel a broadcast job.
+    
+    The bot applies the change at its next checkpoint or job poll.
+    """
+    if action not in JOB_TRANSITIONS:
+        return jsonify({"error": f"Unknown action: {action}"}), 400
+    
+    if not broadcast_jobs.apply(job_id, action):
+        return jsonify({"error": f"Cannot {action} job {job_id}"}), 409
+    
+    return jsonify(broadcast_jobs.get(job_id))
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,1072 @@
+"""
+Dispatch Module for NOVAXA Bot
+-----------------------------
+This module sits between telebot and the bot's command handlers.
+
+It provides a command router that enforces a per-command deadline on every
+handler, so a slow command cannot hold a worker indefinitely, and an update
+pipeline that queues incoming updates in priority lanes so owner and admin
+traffic is served first and expendable updates are shed under overload.
+Updates the bot has no use for, such as plain chatter in groups, are dropped
+at ingestion by an ignore policy before they are parsed. On shutdown the
+polling offset and any update that could not be handled in time are
+persisted, so the next process resumes where this one stopped.
+"""
+
+import os
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Iterable, List, Optional
+
+from metrics import metrics as default_metrics
+
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=logging.INFO,
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEADLINE = 10.0
+DEFAULT_FALLBACK_TEXT = "⏳ This is taking too long. Please try again later."
+
+LANE_PRIORITY = 0
+LANE_NORMAL = 1
+LANE_EXPENDABLE = 2
+LANE_NAMES = ("priority", "normal", "expendable")
+
+# Update types nobody is waiting on a reply for; shed these first.
+EXPENDABLE_UPDATE_TYPES = frozenset({
+    "edited_message",
+    "edited_channel_post",
+    "channel_post",
+    "message_reaction",
+    "message_reaction_count",
+    "poll",
+    "poll_answer",
+    "chosen_inline_result",
+    "my_chat_member",
+    "chat_member",
+    "chat_boost",
+    "removed_chat_boost",
+})
+
+# telebot handler list attribute -> Bot API update type it consumes.
+HANDLER_UPDATE_TYPES = (
+    ("message_handlers", "message"),
+    ("edited_message_handlers", "edited_message"),
+    ("channel_post_handlers", "channel_post"),
+    ("edited_channel_post_handlers", "edited_channel_post"),
+    ("message_reaction_handlers", "message_reaction"),
+    ("message_reaction_count_handlers", "message_reaction_count"),
+    ("inline_handlers", "inline_query"),
+    ("chosen_inline_handlers", "chosen_inline_result"),
+    ("callback_query_handlers", "callback_query"),
+    ("shipping_query_handlers", "shipping_query"),
+    ("pre_checkout_query_handlers", "pre_checkout_query"),
+    ("poll_handlers", "poll"),
+    ("poll_answer_handlers", "poll_answer"),
+    ("my_chat_member_handlers", "my_chat_member"),
+    ("chat_member_handlers", "chat_member"),
+    ("chat_join_request_handlers", "chat_join_request"),
+    ("chat_boost_handlers", "chat_boost"),
+    ("removed_chat_boost_handlers", "removed_chat_boost"),
+)
+
+IGNORE_GROUP_CHATTER = "group_chatter"
+IGNORE_CHANNEL_POSTS = "channel_posts"
+IGNORE_EDITS = "edits"
+DEFAULT_IGNORE_RULES = (IGNORE_GROUP_CHATTER, IGNORE_CHANNEL_POSTS, IGNORE_EDITS)
+
+_local = threading.local()
+
+
+class DeadlineExceeded(Exception):
+    """Raised inside a handler whose deadline has passed."""
+
+
+class Deadline:
+    """Time budget for a single handler run."""
+
+    def __init__(self, timeout: float, name: str = None):
+        """Initialize the deadline.
+
+        Args:
+            timeout: Budget in seconds
+            name: Command the deadline belongs to
+        """
+        self.name = name
+        self.timeout = timeout
+        self.started = time.monotonic()
+        self.expires = self.started + timeout
+        self.cancelled = False
+
+    def remaining(self) -> float:
+        """Get the seconds left before the deadline, never negative."""
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self) -> bool:
+        """Check whether the deadline has passed or was cancelled."""
+        return self.cancelled or time.monotonic() >= self.expires
+
+    def check(self):
+        """Raise DeadlineExceeded if the handler should stop working."""
+        if self.expired():
+            raise DeadlineExceeded(self.name or "handler")
+
+    def cancel(self):
+        """Mark the work as abandoned so cooperative checks stop it."""
+        self.cancelled = True
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Get the deadline of the handler running on this thread, if any."""
+    return getattr(_local, "deadline", None)
+
+
+def remaining_time(default: float = None) -> Optional[float]:
+    """Get a timeout bounded by the current handler's deadline.
+
+    Args:
+        default: Timeout to use when no deadline is active
+
+    Returns:
+        float: The smaller of ``default`` and the time left, or ``default``
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return default
+    if default is None:
+        return deadline.remaining()
+    return min(default, deadline.remaining())
+
+
+def check_deadline():
+    """Raise DeadlineExceeded if the current handler's deadline has passed."""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check()
+
+
+def parse_deadlines(spec: str) -> Dict[str, float]:
+    """Parse a deadline spec such as ``"log=5,broadcast=30"``.
+
+    Args:
+        spec: Comma-separated ``command=seconds`` pairs
+
+    Returns:
+        dict: Deadline in seconds keyed by command name
+    """
+    deadlines = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        command, _, seconds = item.partition("=")
+        try:
+            deadlines[command.strip().lstrip("/")] = float(seconds)
+        except ValueError:
+            logger.warning(f"Ignoring invalid deadline '{item.strip()}'")
+    return deadlines
+
+
+class HandlerPool:
+    """Thread pool whose capacity survives handlers that never return.
+
+    A handler abandoned at its deadline may ignore the cooperative check
+    and keep running. ``detach`` stops counting its thread against the
+    pool, which starts a replacement, so hung handlers cannot starve the
+    commands queued behind them. The detached thread exits once the
+    handler finally returns.
+    """
+
+    def __init__(self, max_workers: int = 8, thread_name_prefix: str = "novaxa-handler",
+                 metrics=None):
+        """Initialize the handler pool.
+
+        Args:
+            max_workers: Number of threads serving new handlers
+            thread_name_prefix: Prefix of the worker thread names
+            metrics: Metrics registry, defaults to the shared one
+        """
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self.metrics = metrics or default_metrics
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._workers = 0
+        self._idle = 0
+        self._detached = set()
+        self._threads = []
+        self._shutdown = False
+
+    @property
+    def detached(self) -> int:
+        """Number of abandoned handlers still running."""
+        with self._lock:
+            return len(self._detached)
+
+    def submit(self, func: Callable, *args) -> Future:
+        """Run a function on the pool."""
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Handler pool is shut down")
+            self._queue.put((future, func, args))
+            if self._idle == 0 and self._workers < self.max_workers:
+                self._spawn()
+        return future
+
+    def detach(self, future: Future):
+        """Stop counting the thread running an abandoned handler."""
+        with self._lock:
+            if future.done() or future in self._detached or not future.running():
+                return
+            self._detached.add(future)
+            self._workers -= 1
+            if not self._shutdown:
+                self._spawn()
+            self.metrics.set_gauge("handlers_abandoned_running", len(self._detached))
+
+    def _spawn(self):
+        """Start one counted worker. Called with the lock held."""
+        self._workers += 1
+        thread = threading.Thread(target=self._worker, daemon=True,
+                                  name=f"{self.thread_name_prefix}-{len(self._threads)}")
+        self._threads.append(thread)
+        thread.start()
+
+    def _worker(self):
+        """Run queued functions until shut down or detached."""
+        while True:
+            with self._lock:
+                self._idle += 1
+            item = self._queue.get()
+            with self._lock:
+                self._idle -= 1
+            if item is None:
+                return
+
+            future, func, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+            with self._lock:
+                if future in self._detached:
+                    self._detached.discard(future)
+                    self.metrics.set_gauge("handlers_abandoned_running", len(self._detached))
+                    return
+
+    def shutdown(self, wait: bool = False):
+        """Stop the counted workers once the queue is empty.
+
+        Args:
+            wait: Whether to wait for the counted workers to exit
+        """
+        with self._lock:
+            self._shutdown = True
+            workers = self._workers
+            threads = list(self._threads)
+        for _ in range(workers):
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                if thread is not threading.current_thread():
+                    thread.join()
+
+
+class CommandRouter:
+    """Class for registering telebot handlers with per-command deadlines."""
+
+    def __init__(self, bot, deadlines: Dict[str, float] = None,
+                 default_deadline: float = DEFAULT_DEADLINE,
+                 fallback_text: str = DEFAULT_FALLBACK_TEXT,
+                 max_workers: int = 8, metrics=None):
+        """Initialize the command router.
+
+        Args:
+            bot: telebot.TeleBot instance handlers are registered on
+            deadlines: Deadline in seconds keyed by command name
+            default_deadline: Deadline for commands without an explicit one
+            fallback_text: Reply sent when a deadline is exceeded
+            max_workers: Number of handlers that can run at once, not
+                counting abandoned ones that are still running
+            metrics: Metrics registry, defaults to the shared one
+        """
+        self.bot = bot
+        self.deadlines = dict(deadlines or {})
+        self.default_deadline = default_deadline
+        self.fallback_text = fallback_text
+        self.metrics = metrics or default_metrics
+        self.executor = HandlerPool(max_workers=max_workers, metrics=self.metrics)
+
+    def deadline_for(self, name: str) -> float:
+        """Get the deadline configured for a command."""
+        return self.deadlines.get(name, self.default_deadline)
+
+    def message_handler(self, commands: List[str] = None, deadline: float = None, **kwargs):
+        """Register a message handler with a deadline.
+
+        Args:
+            commands: Commands the handler answers, as for telebot
+            deadline: Override for the configured deadline
+            **kwargs: Passed through to ``bot.message_handler``
+        """
+        def decorator(handler: Callable):
+            name = commands[0] if commands else handler.__name__
+            wrapped = self._wrap(name, handler, deadline, self._fallback_message)
+            self.bot.message_handler(commands=commands, **kwargs)(wrapped)
+            return wrapped
+        return decorator
+
+    def callback_query_handler(self, name: str = None, deadline: float = None, **kwargs):
+        """Register a callback query handler with a deadline.
+
+        Args:
+            name: Name used for deadline lookup and metrics
+            deadline: Override for the configured deadline
+            **kwargs: Passed through to ``bot.callback_query_handler``
+        """
+        def decorator(handler: Callable):
+            wrapped = self._wrap(name or handler.__name__, handler, deadline,
+                                 self._fallback_callback)
+            self.bot.callback_query_handler(**kwargs)(wrapped)
+            return wrapped
+        return decorator
+
+    def _wrap(self, name: str, handler: Callable, deadline: Optional[float],
+              fallback: Callable) -> Callable:
+        """Wrap a handler so it runs under a deadline."""
+        def wrapped(update):
+            timeout = deadline if deadline is not None else self.deadline_for(name)
+            return self.run(name, handler, update, timeout, fallback)
+
+        wrapped.__name__ = handler.__name__
+        wrapped.__doc__ = handler.__doc__
+        wrapped.handler = handler
+        return wrapped
+
+    def run(self, name: str, handler: Callable, update, timeout: float,
+            fallback: Callable = None):
+        """Run a handler, abandoning it once its deadline has passed.
+
+        Args:
+            name: Command name used for metrics and logging
+            handler: Handler to run
+            update: Message or callback query passed to the handler
+            timeout: Deadline in seconds
+            fallback: Called with the update when the deadline is exceeded
+        """
+        if current_deadline() is not None:
+            # Nested call, e.g. a callback delegating to a command handler:
+            # it already runs under the caller's deadline.
+            return handler(update)
+
+        budget = Deadline(timeout, name)
+        future = self.executor.submit(self._invoke, budget, handler, update)
+
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            budget.cancel()
+            if not future.cancel():
+                self.executor.detach(future)
+            elapsed = time.monotonic() - budget.started
+
+            self.metrics.increment("handler_overruns", {"command": name})
+            logger.warning(f"Handler for '{name}' exceeded its {timeout:.1f}s deadline, abandoning")
+
+            if fallback:
+                try:
+                    fallback(update)
+                except Exception as e:
+                    logger.error(f"Error sending fallback reply for '{name}': {e}")
+            self.metrics.observe("handler_time_ms", elapsed * 1000, {"command": name})
+            return None
+
+        self.metrics.observe("handler_time_ms",
+                             (time.monotonic() - budget.started) * 1000,
+                             {"command": name})
+        return result
+
+    def _invoke(self, budget: Deadline, handler: Callable, update):
+        """Run a handler on a pool thread with its deadline installed."""
+        if budget.expired():
+            return None
+
+        _local.deadline = budget
+        try:
+            return handler(update)
+        except DeadlineExceeded:
+            logger.info(f"Handler for '{budget.name}' stopped at its deadline")
+            return None
+        finally:
+            _local.deadline = None
+
+    def _fallback_message(self, message):
+        """Tell the user their command timed out."""
+        self.bot.reply_to(message, self.fallback_text)
+
+    def _fallback_callback(self, call):
+        """Tell the user their button press timed out."""
+        self.bot.answer_callback_query(call.id, self.fallback_text)
+
+    def shutdown(self, wait: bool = False):
+        """Stop the handler pool."""
+        self.executor.shutdown(wait=wait)
+
+
+def update_type(raw: Dict) -> Optional[str]:
+    """Get the type of a raw update, e.g. ``"message"`` or ``"callback_query"``."""
+    for key in raw:
+        if key != "update_id":
+            return key
+    return None
+
+
+def update_sender(raw: Dict) -> Optional[int]:
+    """Get the user ID that sent a raw update, if it has one."""
+    kind = update_type(raw)
+    payload = raw.get(kind) if kind else None
+    if not isinstance(payload, dict):
+        return None
+    sender = payload.get("from") or payload.get("user")
+    if isinstance(sender, dict):
+        return sender.get("id")
+    return None
+
+
+class IgnorePolicy:
+    """Class for deciding which raw updates to drop at ingestion.
+
+    Rules:
+        group_chatter: non-command messages in groups and supergroups
+        channel_posts: channel posts and edited channel posts
+        edits: edited messages and edited channel posts
+    """
+
+    def __init__(self, rules: Iterable[str] = DEFAULT_IGNORE_RULES):
+        """Initialize the ignore policy.
+
+        Args:
+            rules: Names of the rules to enable
+        """
+        self.rules = set(rules)
+        unknown = self.rules - set(DEFAULT_IGNORE_RULES)
+        if unknown:
+            logger.warning(f"Ignoring unknown ignore rules: {', '.join(sorted(unknown))}")
+            self.rules -= unknown
+
+    @classmethod
+    def from_spec(cls, spec: Optional[str]) -> "IgnorePolicy":
+        """Build a policy from a comma-separated rule list.
+
+        Args:
+            spec: e.g. ``"group_chatter,edits"``; None enables every rule,
+                an empty string or ``"none"`` disables them all
+        """
+        if spec is None:
+            return cls()
+        rules = [rule.strip() for rule in spec.split(",") if rule.strip()]
+        return cls([rule for rule in rules if rule != "none"])
+
+    def reason(self, raw: Dict) -> Optional[str]:
+        """Get the rule that drops an update, or None to keep it."""
+        kind = update_type(raw)
+
+        if IGNORE_EDITS in self.rules and kind in ("edited_message", "edited_channel_post"):
+            return IGNORE_EDITS
+
+        if IGNORE_CHANNEL_POSTS in self.rules and kind in ("channel_post", "edited_channel_post"):
+            return IGNORE_CHANNEL_POSTS
+
+        if IGNORE_GROUP_CHATTER in self.rules and kind == "message":
+            message = raw["message"]
+            chat_type = (message.get("chat") or {}).get("type")
+            if chat_type in ("group", "supergroup"):
+                text = message.get("text") or message.get("caption") or ""
+                if not text.startswith("/"):
+                    return IGNORE_GROUP_CHATTER
+
+        return None
+
+    def excludes(self, kind: str) -> bool:
+        """Check whether every update of a type is dropped by this policy."""
+        if kind in ("edited_message", "edited_channel_post") and IGNORE_EDITS in self.rules:
+            return True
+        if kind in ("channel_post", "edited_channel_post") and IGNORE_CHANNEL_POSTS in self.rules:
+            return True
+        return False
+
+
+def allowed_updates_for(bot, policy: IgnorePolicy = None) -> List[str]:
+    """Derive getUpdates/setWebhook ``allowed_updates`` from registered handlers.
+
+    Args:
+        bot: telebot.TeleBot instance with its handlers registered
+        policy: Ignore policy; update types it drops entirely are left out
+
+    Returns:
+        list: Update types that at least one handler consumes
+    """
+    allowed = []
+    for attribute, kind in HANDLER_UPDATE_TYPES:
+        if getattr(bot, attribute, None) and not (policy and policy.excludes(kind)):
+            allowed.append(kind)
+    return allowed
+
+
+OFFSET_SCHEMA = """
+CREATE TABLE IF NOT EXISTS offsets (
+    bot_id TEXT PRIMARY KEY,
+    next_offset INTEGER NOT NULL,
+    updated TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pending_updates (
+    bot_id TEXT NOT NULL,
+    update_id INTEGER NOT NULL,
+    raw TEXT NOT NULL,
+    PRIMARY KEY (bot_id, update_id)
+);
+"""
+
+
+class OffsetStore:
+    """Class for persisting each bot's polling offset and unhandled updates.
+
+    Telegram treats every update below the offset of the last getUpdates
+    call as delivered, so updates that were fetched but not handled before
+    shutdown only survive if they are kept here.
+    """
+
+    def __init__(self, db_file: str = "data/polling.db"):
+        """Initialize the offset store.
+
+        Args:
+            db_file: Path to the SQLite database
+        """
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self, create: bool = True) -> Optional[sqlite3.Connection]:
+        """Open the database on first use. Called with the lock held.
+
+        Args:
+            create: Whether to create the database if it does not exist yet
+
+        Returns:
+            sqlite3.Connection: The connection, or None if there is no
+            database and create is False
+        """
+        if self._conn is None:
+            if not create and not os.path.exists(self.db_file):
+                return None
+            if os.path.dirname(self.db_file):
+                os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(OFFSET_SCHEMA)
+            self._conn.commit()
+        return self._conn
+
+    def get(self, bot_id: str) -> Optional[int]:
+        """Get the offset a bot should resume polling from."""
+        with self._lock:
+            conn = self._connect(create=False)
+            if conn is None:
+                return None
+            row = conn.execute(
+                "SELECT next_offset FROM offsets WHERE bot_id = ?", (str(bot_id),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, bot_id: str, offset: int):
+        """Record the offset a bot should resume polling from."""
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO offsets (bot_id, next_offset, updated) VALUES (?, ?, datetime('now')) "
+                "ON CONFLICT(bot_id) DO UPDATE SET next_offset = excluded.next_offset, "
+                "updated = excluded.updated",
+                (str(bot_id), offset),
+            )
+            self._conn.commit()
+
+    def save_pending(self, bot_id: str, updates: Iterable[Dict]):
+        """Keep updates that were received but not handled."""
+        rows = [(str(bot_id), raw["update_id"], json.dumps(raw))
+                for raw in updates if "update_id" in raw]
+        with self._lock:
+            self._connect().executemany(
+                "INSERT OR REPLACE INTO pending_updates (bot_id, update_id, raw) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def take_pending(self, bot_id: str) -> List[Dict]:
+        """Remove and return a bot's unhandled updates, oldest first."""
+        with self._lock:
+            conn = self._connect(create=False)
+            if conn is None:
+                return []
+            rows = conn.execute(
+                "SELECT raw FROM pending_updates WHERE bot_id = ? ORDER BY update_id",
+                (str(bot_id),),
+            ).fetchall()
+            if rows:
+                conn.execute("DELETE FROM pending_updates WHERE bot_id = ?", (str(bot_id),))
+                conn.commit()
+        return [json.loads(row[0]) for row in rows]
+
+    def persist(self, bot_id: str, report: Dict):
+        """Save the offset and abandoned updates from a pipeline shutdown report."""
+        if report["offset"] is not None:
+            self.set(bot_id, report["offset"])
+        if report["abandoned"]:
+            self.save_pending(bot_id, report["abandoned"])
+
+    def restore(self, bot_id: str, pipeline: "UpdatePipeline") -> int:
+        """Resume a pipeline from what the previous process persisted.
+
+        Returns:
+            int: Number of requeued updates
+        """
+        offset = self.get(bot_id)
+        if offset is not None and pipeline.offset is None:
+            pipeline.offset = offset
+
+        pending = self.take_pending(bot_id)
+        for raw in pending:
+            pipeline.submit(raw)
+        if pending:
+            logger.info(f"Requeued {len(pending)} updates left by the previous process")
+        return len(pending)
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class AdaptivePollTimeout:
+    """Long-poll timeout that stretches while traffic is quiet.
+
+    Telegram answers a long poll as soon as an update arrives, so a longer
+    timeout adds no latency on a healthy connection; it only means fewer
+    wakeups. What it does bound is how long a silently dropped connection,
+    common on phones switching networks, goes unnoticed: the timeout plus
+    the client margin, which is kept within the latency target.
+    """
+
+    CLIENT_MARGIN = 10
+
+    def __init__(self, base: int = 20, maximum: int = 50, latency_target: float = 60.0,
+                 idle_after: float = 300.0, on_idle: Callable[[], None] = None,
+                 on_active: Callable[[], None] = None, metrics=None):
+        """Initialize the timeout.
+
+        Args:
+            base: Timeout while updates are arriving
+            maximum: Longest timeout, Telegram allows up to 50
+            latency_target: Longest an update may go unnoticed, in seconds
+            idle_after: Seconds without updates before the bot counts as idle
+            on_idle: Called when the bot becomes idle
+            on_active: Called when updates arrive again after being idle
+            metrics: Metrics registry, defaults to the shared one
+        """
+        self.base = base
+        self.maximum = max(base, min(maximum, int(latency_target) - self.CLIENT_MARGIN))
+        self.latency_target = latency_target
+        self.idle_after = idle_after
+        self.on_idle = on_idle
+        self.on_active = on_active
+        self.metrics = metrics or default_metrics
+        self.timeout = base
+        self.idle = False
+        self.last_activity = time.monotonic()
+        self._wakeups = deque()
+
+    def record(self, count: int):
+        """Adjust the timeout after a getUpdates call returned.
+
+        Args:
+            count: Number of updates the call returned
+        """
+        now = time.monotonic()
+        self._wakeups.append(now)
+        while self._wakeups[0] < now - 3600:
+            self._wakeups.popleft()
+        self.metrics.set_gauge("wakeups_per_hour", len(self._wakeups))
+
+        if count:
+            self.timeout = self.base
+            self.last_activity = now
+            if self.idle:
+                self._set_idle(False)
+        else:
+            self.timeout = min(self.maximum, self.timeout * 2)
+            if not self.idle and now - self.last_activity >= self.idle_after:
+                self._set_idle(True)
+        self.metrics.set_gauge("poll_timeout_s", self.timeout)
+
+    def _set_idle(self, idle: bool):
+        """Enter or leave idle mode and notify the callback."""
+        self.idle = idle
+        self.metrics.set_gauge("bot_idle", int(idle))
+        logger.info("Bot idle, polling less often" if idle else "Updates arriving, bot active")
+        callback = self.on_idle if idle else self.on_active
+        if callback:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error switching idle mode: {e}")
+
+
+class UpdatePipeline:
+    """Class for queueing raw updates in priority lanes ahead of the handlers.
+
+    Updates from privileged users (owner and admins) go to the priority lane,
+    which is always dequeued first and never shed. Everything else shares a
+    bounded backlog; when it is full, the oldest update in the most expendable
+    non-empty lane is dropped to make room.
+    """
+
+    def __init__(self, bot, privileged_ids: Iterable[int] = (), max_pending: int = 1000,
+                 workers: int = 4, metrics=None, process: Callable = None,
+                 ignore_policy: IgnorePolicy = None, observers: Iterable[Callable] = (),
+                 blocklist=None):
+        """Initialize the update pipeline.
+
+        Args:
+            bot: telebot.TeleBot instance, created with ``threaded=False``
+            privileged_ids: User IDs whose updates use the priority lane
+            max_pending: Maximum number of queued non-priority updates
+            workers: Number of worker threads processing updates
+            metrics: Metrics registry, defaults to the shared one
+            process: Callable handling one raw update, defaults to telebot dispatch
+            ignore_policy: Policy for dropping updates at ingestion
+            observers: Callables that see every raw update before filtering,
+                e.g. the subscriber registry
+            blocklist: Drops updates of banned users before anything else
+                sees them, e.g. abuse.AbuseDetector; needs ``blocks(raw)``
+        """
+        self.bot = bot
+        self.privileged_ids = {uid for uid in privileged_ids if uid}
+        self.max_pending = max_pending
+        self.workers = workers
+        self.metrics = metrics or default_metrics
+        self.process = process or self._process_update
+        self.ignore_policy = ignore_policy
+        self.observers = list(observers)
+        self.blocklist = blocklist
+        self.lanes = [deque() for _ in LANE_NAMES]
+        self.running = False
+        self.closing = False
+        self.offset = None
+        self._threads = []
+        self._condition = threading.Condition()
+        self._intake = threading.Event()
+        self._intake.set()
+        self._polling = False
+        self._busy = 0
+
+    def classify(self, raw: Dict) -> int:
+        """Pick the lane for a raw update."""
+        if update_sender(raw) in self.privileged_ids:
+            return LANE_PRIORITY
+        if update_type(raw) in EXPENDABLE_UPDATE_TYPES:
+            return LANE_EXPENDABLE
+        return LANE_NORMAL
+
+    def pending(self) -> int:
+        """Get the number of queued updates across all lanes."""
+        with self._condition:
+            return sum(len(lane) for lane in self.lanes)
+
+    def submit(self, raw: Dict) -> bool:
+        """Queue a raw update for processing.
+
+        Args:
+            raw: Update as decoded from the Bot API JSON
+
+        Returns:
+            bool: True if the update was queued, False if it was ignored or shed
+        """
+        if self.closing:
+            return False
+
+        if self.blocklist and self.blocklist.blocks(raw):
+            self.metrics.increment("updates_ignored", {"reason": "banned"})
+            return False
+
+        for observer in self.observers:
+            try:
+                observer(raw)
+            except Exception as e:
+                logger.error(f"Error in update observer: {e}")
+
+        if self.ignore_policy:
+            reason = self.ignore_policy.reason(raw)
+            if reason:
+                self.metrics.increment("updates_ignored", {"reason": reason})
+                return False
+
+        lane = self.classify(raw)
+        self.metrics.increment("updates_received", {"lane": LANE_NAMES[lane]})
+
+        with self._condition:
+            if lane != LANE_PRIORITY and self._backlog() >= self.max_pending:
+                if not self._shed(lane):
+                    self._record_shed(lane, raw)
+                    return False
+
+            self.lanes[lane].append((time.monotonic(), raw))
+            self._condition.notify()
+
+        return True
+
+    def _backlog(self) -> int:
+        """Count queued updates that are subject to shedding."""
+        return sum(len(lane) for lane in self.lanes[LANE_NORMAL:])
+
+    def _shed(self, incoming_lane: int) -> bool:
+        """Drop the oldest update that is no more important than the incoming one."""
+        for lane in range(len(self.lanes) - 1, incoming_lane - 1, -1):
+            if self.lanes[lane]:
+                _, victim = self.lanes[lane].popleft()
+                self._record_shed(lane, victim)
+                return True
+        return False
+
+    def _record_shed(self, lane: int, raw: Dict):
+        """Count a dropped update."""
+        self.metrics.increment("updates_shed", {"lane": LANE_NAMES[lane],
+                                                "type": update_type(raw)})
+
+    def _next(self, timeout: float = 1.0):
+        """Take the next update, highest-priority lane first."""
+        with self._condition:
+            if not any(self.lanes):
+                self._condition.wait(timeout)
+            for lane, queue in enumerate(self.lanes):
+                if queue:
+                    queued_at, raw = queue.popleft()
+                    self._busy += 1
+                    return lane, queued_at, raw
+        return None
+
+    def _done(self):
+        """Mark an update taken by ``_next`` as finished."""
+        with self._condition:
+            self._busy -= 1
+            self._condition.notify_all()
+
+    def _worker(self):
+        """Process queued updates until the pipeline stops."""
+        while self.running:
+            item = self._next()
+            if item is None:
+                continue
+
+            lane, queued_at, raw = item
+            self.metrics.observe("update_wait_ms", (time.monotonic() - queued_at) * 1000,
+                                 {"lane": LANE_NAMES[lane]})
+            try:
+                self.process(raw)
+                self.metrics.increment("updates_processed", {"lane": LANE_NAMES[lane]})
+            except Exception as e:
+                logger.error(f"Error processing update {raw.get('update_id')}: {e}")
+            finally:
+                self._done()
+
+    def _process_update(self, raw: Dict):
+        """Parse a raw update and hand it to the telebot handlers."""
+        from telebot import types
+
+        self.bot.process_new_updates([types.Update.de_json(raw)])
+
+    def start(self):
+        """Start the worker threads."""
+        if self.running:
+            return
+        self.running = True
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"novaxa-update-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Update pipeline started with {self.workers} workers")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the worker threads."""
+        self.running = False
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        logger.info("Update pipeline stopped")
+
+    def hold(self):
+        """Stop fetching new updates. Queued updates are still processed."""
+        with self._condition:
+            self._intake.clear()
+        logger.info("Update intake held")
+
+    @property
+    def held(self) -> bool:
+        """Whether intake is held, by ``hold`` or ``close_intake``."""
+        return not self._intake.is_set()
+
+    def release(self):
+        """Resume fetching updates after ``hold``."""
+        with self._condition:
+            self._intake.set()
+            self._condition.notify_all()
+        logger.info("Update intake resumed")
+
+    def drain(self, timeout: float = 30.0) -> bool:
+        """Wait until no update is being fetched, queued or processed.
+
+        Call ``hold`` first, otherwise new updates keep arriving.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            bool: True if the pipeline is idle, False if the timeout expired
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._polling or self._busy or any(self.lanes):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close_intake(self):
+        """Refuse new updates for good, ahead of ``shutdown``."""
+        self.closing = True
+        self.hold()
+
+    def shutdown(self, timeout: float = 25.0) -> Dict:
+        """Stop intake, let queued updates finish and stop the workers.
+
+        Updates still queued when the timeout expires are abandoned and
+        returned in the report, for the caller to persist; Telegram already
+        considers them delivered. Handlers still running are left to finish
+        on their own and only counted.
+
+        Args:
+            timeout: Maximum seconds to wait for the queues to drain
+
+        Returns:
+            dict: Whether the pipeline drained, the abandoned updates, the
+                number of handlers still running and the offset to resume from
+        """
+        self.close_intake()
+
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            # Without workers, nothing queued would ever be taken.
+            while self._busy or (self.running and any(self.lanes)):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            abandoned = sorted((raw for lane in self.lanes for _, raw in lane),
+                               key=lambda raw: raw.get("update_id", 0))
+            for lane in self.lanes:
+                lane.clear()
+            in_flight = self._busy
+
+        self.stop(timeout=1.0)
+
+        for raw in abandoned:
+            self.metrics.increment("updates_abandoned", {"type": update_type(raw)})
+
+        return {
+            "drained": not abandoned and not in_flight,
+            "abandoned": abandoned,
+            "in_flight": in_flight,
+            "offset": self.offset,
+        }
+
+    def run_polling(self, long_polling_timeout: int = 20, allowed_updates: List[str] = None,
+                    stop_event: threading.Event = None, adaptive: AdaptivePollTimeout = None):
+        """Long-poll getUpdates and feed the pipeline until stopped.
+
+        Args:
+            long_polling_timeout: Seconds Telegram holds each getUpdates call
+            allowed_updates: Update types to request, defaults to those
+                the registered handlers consume
+            stop_event: Ends polling when set, leaving the pipeline running
+            adaptive: Adjusts the timeout to the traffic instead, and caps
+                the retry backoff at its latency target
+        """
+        from telebot import apihelper
+
+        if allowed_updates is None:
+            allowed_updates = allowed_updates_for(self.bot, self.ignore_policy)
+            logger.info(f"Requesting update types: {', '.join(allowed_updates)}")
+
+        self.start()
+        backoff = 1
+        max_backoff = adaptive.latency_target if adaptive else 60
+
+        while self.running and not (stop_event and stop_event.is_set()):
+            # Checked and claimed together with hold(), so once hold()
+            # returns, drain() sees any fetch that slipped in before it.
+            with self._condition:
+                self._polling = self._intake.is_set()
+                polling = self._polling
+                if not polling:
+                    # Woken by release() and stop(); the timeout only
+                    # re-checks stop_event, so a held standby stays quiet.
+                    self._condition.wait(30.0)
+            if not polling:
+                continue
+
+            timeout = adaptive.timeout if adaptive else long_polling_timeout
+            try:
+                raw_updates = apihelper.get_updates(
+                    self.bot.token, offset=self.offset,
+                    timeout=timeout + AdaptivePollTimeout.CLIENT_MARGIN,
+                    allowed_updates=allowed_updates, long_polling_timeout=timeout,
+                )
+                if adaptive:
+                    adaptive.record(len(raw_updates))
+                for raw in raw_updates:
+                    if self.closing:
+                        # Left unconfirmed, so the next process fetches them again.
+                        break
+                    self.offset = raw["update_id"] + 1
+                    self.submit(raw)
+                failed = False
+            except Exception as e:
+                logger.error(f"Error polling for updates: {e}")
+                failed = True
+            finally:
+                with self._condition:
+                    self._polling = False
+                    self._condition.notify_all()
+
+            if failed:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, max_backoff)
+            else:
+                backoff = 1
@@ -0,0 +1,23 @@
+"""
+NOVAXA bot engine.
+
+One engine runs every bot variant: a preset picks the transport and the
+features, the shared handlers live in engine.handlers, and the bot scripts
+only choose a preset.
+"""
+
+from engine.config import EngineConfig, PRESETS
+from engine.registry import HandlerRegistry, registry
+from engine.context import BotContext
+from engine.transports import (
+    Transport, PollingTransport, WebhookTransport, ReplayTransport, create_transport,
+)
+from engine.core import Engine, EngineError, build_engine, run_preset, wsgi_app
+
+__all__ = [
+    "EngineConfig", "PRESETS",
+    "HandlerRegistry", "registry",
+    "BotContext",
+    "Transport", "PollingTransport", "WebhookTransport", "ReplayTransport", "create_transport",
+    "Engine", "EngineError", "build_engine", "run_preset", "wsgi_app",
+]
@@ -0,0 +1,194 @@
+"""
+Engine configuration and presets.
+
+A preset names the transport and the handler features a bot variant runs
+with; everything else comes from the environment, as the variant scripts
+used to read it.
+"""
+
+import os
+from typing import Dict, Iterable, List
+
+from dispatch import parse_deadlines
+
+FEATURE_CORE = "core"
+FEATURE_TOKENS = "tokens"
+FEATURE_TOKEN_COMMAND = "token_command"
+FEATURE_BROADCASTS = "broadcasts"
+FEATURE_REMINDERS = "reminders"
+FEATURE_OWNER_NOTIFY = "owner_notify"
+FEATURE_LOGS = "logs"
+FEATURE_FALLBACK = "fallback"
+
+TRANSPORT_POLLING = "polling"
+TRANSPORT_WEBHOOK = "webhook"
+TRANSPORT_REPLAY = "replay"
+
+# What each former entry point ran. The script of the same name now just
+# starts the engine with its preset.
+PRESETS = {
+    "novaxa": {
+        "transport": TRANSPORT_POLLING,
+        "features": [FEATURE_CORE, FEATURE_TOKENS, FEATURE_BROADCASTS, FEATURE_LOGS, FEATURE_FALLBACK],
+    },
+    "polling": {
+        "transport": TRANSPORT_POLLING,
+        "features": [FEATURE_CORE, FEATURE_TOKEN_COMMAND],
+    },
+    "polling_fixed": {
+        "transport": TRANSPORT_POLLING,
+        "features": [FEATURE_CORE, FEATURE_OWNER_NOTIFY, FEATURE_BROADCASTS, FEATURE_LOGS,
+                     FEATURE_TOKEN_COMMAND],
+    },
+    "simple": {
+        "transport": TRANSPORT_POLLING,
+        "features": [FEATURE_CORE, FEATURE_OWNER_NOTIFY, FEATURE_BROADCASTS, FEATURE_LOGS,
+                     FEATURE_TOKEN_COMMAND],
+    },
+    "ready": {
+        "transport": TRANSPORT_POLLING,
+        "features": [FEATURE_CORE, FEATURE_OWNER_NOTIFY, FEATURE_BROADCASTS, FEATURE_LOGS,
+                     FEATURE_TOKEN_COMMAND],
+    },
+    "enhanced": {
+        "transport": TRANSPORT_WEBHOOK,
+        "features": [FEATURE_CORE, FEATURE_TOKENS, FEATURE_FALLBACK],
+    },
+    "enhanced_simple": {
+        "transport": TRANSPORT_POLLING,
+        "features": [FEATURE_CORE, FEATURE_TOKENS, FEATURE_FALLBACK],
+    },
+    "app": {
+        "transport": TRANSPORT_WEBHOOK,
+        "features": [FEATURE_CORE, FEATURE_REMINDERS, FEATURE_BROADCASTS, FEATURE_LOGS],
+    },
+    "multibot": {
+        "transport": TRANSPORT_POLLING,
+        "features": [FEATURE_CORE, FEATURE_FALLBACK],
+    },
+}
+
+
+def _ids(value: str) -> List[int]:
+    """Parse a comma-separated list of Telegram IDs."""
+    return [int(x) for x in (value or "").split(",") if x.strip().isdigit()]
+
+
+class EngineConfig:
+    """Settings for one engine instance."""
+
+    def __init__(self, preset: str = "novaxa", features: Iterable[str] = None,
+                 transport: str = None, token: str = None, owner_id: int = 0,
+                 admin_ids: Iterable[int] = (), **settings):
+        """Initialize the configuration.
+
+        Args:
+            preset: Name of the preset supplying defaults
+            features: Handler features to enable, defaults to the preset's
+            transport: polling, webhook or replay, defaults to the preset's
+            token: Telegram Bot API token, used when TokenManager has none
+            owner_id: Telegram ID of the owner
+            admin_ids: Telegram IDs of the admins
+            **settings: Overrides for any attribute set below
+        """
+        if preset not in PRESETS:
+            raise ValueError(f"Unknown preset '{preset}'")
+
+        self.preset = preset
+        self.features = list(features or PRESETS[preset]["features"])
+        self.transport = transport or PRESETS[preset]["transport"]
+        self.token = token
+        self.owner_id = owner_id
+        self.admin_ids = [uid for uid in admin_ids if uid]
+
+        self.log_file = "logs/bot.log"
+        self.data_dir = "data"
+        self.handler_deadlines = {"log": 5.0, "broadcast": 30.0}
+        self.default_deadline = 10.0
+        self.update_workers = 4
+        self.update_queue_size = 1000
+        self.ignore_updates = None
+        self.long_polling_timeout = 20
+        self.energy_saver = False
+        self.poll_timeout_max = 50
+        self.latency_target = 60.0
+        self.idle_after = 300.0
+        self.polling_lease = False
+        self.lease_ttl = 15.0
+        self.abuse_threshold = 5
+        self.abuse_window = 60.0
+        self.abuse_ban = 900.0
+        self.abuse_digest_interval = 300.0
+        self.broadcast_rate = 25.0
+        self.broadcast_checkpoint_every = 100
+        self.webhook_url = None
+        self.webhook_monitor_interval = 60.0
+        self.webhook_backlog_threshold = 100
+        self.webhook_failover_after = 3
+        self.host = "0.0.0.0"
+        self.port = 8443
+        self.replay_file = None
+        self.shutdown_timeout = 25.0
+        self.metrics_file = "logs/metrics.json"
+
+        for key, value in settings.items():
+            if not hasattr(self, key):
+                raise TypeError(f"Unknown engine setting '{key}'")
+            setattr(self, key, value)
+
+    @classmethod
+    def from_env(cls, preset: str = "novaxa", **overrides) -> "EngineConfig":
+        """Build a configuration from a preset and the environment.
+
+        Args:
+            preset: Name of the preset supplying defaults
+            **overrides: Settings taking precedence over the environment
+
+        Returns:
+            EngineConfig: The configuration
+        """
+        env = os.environ
+        deadlines = {"log": 5.0, "broadcast": 30.0}
+        deadlines.update(parse_deadlines(env.get("HANDLER_DEADLINES", "")))
+
+        settings = {
+            "token": env.get("TELEGRAM_BOT_TOKEN"),
+            "owner_id": int(env["OWNER_ID"]) if env.get("OWNER_ID", "").isdigit() else 0,
+            "admin_ids": _ids(env.get("ADMIN_IDS", "")),
+            "handler_deadlines": deadlines,
+            "default_deadline": float(env.get("HANDLER_DEADLINE_DEFAULT", "10")),
+            "update_workers": int(env.get("UPDATE_WORKERS", "4")),
+            "update_queue_size": int(env.get("UPDATE_QUEUE_SIZE", "1000")),
+            "ignore_updates": env.get("IGNORE_UPDATES"),
+            "broadcast_rate": float(env.get("BROADCAST_RATE", "25")),
+            "broadcast_checkpoint_every": int(env.get("BROADCAST_CHECKPOINT_EVERY", "100")),
+            "webhook_url": env.get("WEBHOOK_URL") or None,
+            "webhook_monitor_interval": float(env.get("WEBHOOK_MONITOR_INTERVAL", "60")),
+            "webhook_backlog_threshold": int(env.get("WEBHOOK_BACKLOG_THRESHOLD", "100")),
+            "webhook_failover_after": int(env.get("WEBHOOK_FAILOVER_AFTER", "3")),
+            "port": int(env.get("PORT", "8443")),
+            "shutdown_timeout": float(env.get("SHUTDOWN_TIMEOUT", "25")),
+            "energy_saver": env.get("ENERGY_SAVER", "").lower() == "true",
+            "poll_timeout_max": int(env.get("POLL_TIMEOUT_MAX", "50")),
+            "latency_target": float(env.get("LATENCY_TARGET", "60")),
+            "idle_after": float(env.get("IDLE_AFTER", "300")),
+            "polling_lease": env.get("POLLING_LEASE", "").lower() == "true",
+            "lease_ttl": float(env.get("LEASE_TTL", "15")),
+            "abuse_threshold": int(env.get("ABUSE_THRESHOLD", "5")),
+            "abuse_window": float(env.get("ABUSE_WINDOW", "60")),
+            "abuse_ban": float(env.get("ABUSE_BAN", "900")),
+            "abuse_digest_interval": float(env.get("ABUSE_DIGEST_INTERVAL", "300")),
+        }
+        if env.get("WEBHOOK_ENABLED", "").lower() == "false":
+            settings["transport"] = TRANSPORT_POLLING
+        if env.get("BOT_TRANSPORT"):
+            settings["transport"] = env["BOT_TRANSPORT"]
+        if env.get("BOT_FEATURES"):
+            settings["features"] = [f.strip() for f in env["BOT_FEATURES"].split(",") if f.strip()]
+
+        settings.update(overrides)
+        return cls(preset, **settings)
+
+    def to_dict(self) -> Dict:
+        """Get the configuration without the token."""
+        return {key: value for key, value in vars(self).items() if key != "token"}
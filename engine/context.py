@@ -0,0 +1,151 @@
+"""
+Per-bot handler context.
+
+A BotContext is what every registered handler receives: the bot it serves,
+that bot's router and pipeline, the services enabled for it, and its own
+state. Nothing in it is shared between bots unless a service is passed in
+explicitly.
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict
+
+from engine.registry import ROLE_ADMIN, ROLE_OWNER
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_INTERVAL = 60
+RATE_LIMIT_MAX = 30
+
+
+class BotContext:
+    """Class holding one bot and the services its handlers use."""
+
+    def __init__(self, config, bot, router, pipeline, token_manager=None, security_monitor=None,
+                 ip_protection=None, subscribers=None, broadcasts=None, reminders=None,
+                 switcher=None, state: Dict = None):
+        """Initialize the context.
+
+        Args:
+            config: EngineConfig of the bot
+            bot: telebot.TeleBot instance
+            router: CommandRouter handlers are registered through
+            pipeline: UpdatePipeline feeding the bot
+            token_manager: security.TokenManager, for token features
+            security_monitor: security.SecurityMonitor receiving audit events
+            ip_protection: security.IPProtection verifying owner-only access
+            subscribers: SubscriberStore, for broadcasts
+            broadcasts: BroadcastManager, for broadcasts
+            reminders: ReminderScheduler, for reminders
+            switcher: TokenSwitcher used to apply token changes live
+            state: Per-bot handler state
+        """
+        self.config = config
+        self.bot = bot
+        self.router = router
+        self.pipeline = pipeline
+        self.token_manager = token_manager
+        self.security_monitor = security_monitor
+        self.ip_protection = ip_protection
+        self.subscribers = subscribers
+        self.broadcasts = broadcasts
+        self.reminders = reminders
+        self.switcher = switcher
+        self.state = state if state is not None else {}
+        self.started = datetime.now()
+        self._rate_limits = {}
+
+    def _is_owner_id(self, user_id: int) -> bool:
+        """Compare a user against the configured owner, without auditing."""
+        return bool(self.config.owner_id) and user_id == self.config.owner_id
+
+    def is_owner(self, user_id: int) -> bool:
+        """Check if a user is the owner, for owner-only access.
+
+        Goes through IPProtection when configured, which records failed
+        attempts as ``owner_verification_failed``.
+        """
+        verified = self.ip_protection.verify_owner(user_id) if self.ip_protection else True
+        return self._is_owner_id(user_id) and verified
+
+    def is_admin(self, user_id: int) -> bool:
+        """Check if a user is an admin. The owner always is."""
+        return user_id in self.config.admin_ids or self._is_owner_id(user_id)
+
+    def has_role(self, user_id: int, role: str) -> bool:
+        """Check if a user may run a handler requiring a role."""
+        if role == ROLE_OWNER:
+            return self.is_owner(user_id)
+        if role == ROLE_ADMIN:
+            return self.is_admin(user_id)
+        return True
+
+    def role_of(self, user_id: int) -> str:
+        """Get the highest role a user has."""
+        if self._is_owner_id(user_id):
+            return ROLE_OWNER
+        if self.is_admin(user_id):
+            return ROLE_ADMIN
+        return "user"
+
+    def rate_limited(self, user_id: int) -> bool:
+        """Count a request and check if the user exceeded the rate limit."""
+        current = time.time()
+        count, reset_at = self._rate_limits.get(user_id, (0, current + RATE_LIMIT_INTERVAL))
+        if current > reset_at:
+            count, reset_at = 0, current + RATE_LIMIT_INTERVAL
+        self._rate_limits[user_id] = (count + 1, reset_at)
+        return count + 1 > RATE_LIMIT_MAX
+
+    def log_event(self, event_type: str, details: Dict = None, user_id: int = None):
+        """Record an audit event, if a security monitor is configured."""
+        if self.security_monitor:
+            self.security_monitor.log_event(event_type, details, user_id)
+
+    def switch_token(self, new_token: str, chat_id: int) -> bool:
+        """Switch the running bot to a new token without a restart.
+
+        Args:
+            new_token: Telegram Bot API token to switch to
+            chat_id: Chat to report the outcome to
+
+        Returns:
+            bool: True if a switch was started
+        """
+        if not self.switcher or not new_token or new_token == self.bot.token:
+            return False
+
+        def report(result, error):
+            if error:
+                self.bot.send_message(
+                    chat_id,
+                    f"❌ Could not switch tokens: {error}\n\n"
+                    f"The bot keeps running on the previous token."
+                )
+                return
+            try:
+                self.bot.send_message(
+                    chat_id,
+                    f"✅ Now running as @{result['username']} "
+                    f"(switched in {result['elapsed']}s)."
+                )
+            except Exception as e:
+                # A different bot may not be allowed to message this chat yet.
+                logger.info(f"Could not confirm token switch in chat {chat_id}: {e}")
+
+        self.switcher.switch_async(new_token, on_done=report)
+        return True
+
+    def switch_notice(self, chat_id: int) -> str:
+        """Apply the TokenManager's active token and describe what happens."""
+        new_token = None
+        if self.token_manager:
+            new_token = self.token_manager.get_token()
+        new_token = new_token or self.config.token or os.environ.get("TELEGRAM_BOT_TOKEN")
+
+        if self.switch_token(new_token, chat_id):
+            return "Switching the running bot to the new token..."
+        return "The running bot already uses the active token."
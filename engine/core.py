@@ -0,0 +1,380 @@
+"""
+The bot engine.
+
+An Engine builds one bot from an EngineConfig: the telebot instance, the
+command router and update pipeline, the services the enabled features need,
+the shared handlers and the transport.
+"""
+
+import os
+import sys
+import atexit
+import logging
+import signal
+import threading
+import time
+from typing import Dict
+
+from dispatch import CommandRouter, IgnorePolicy, OffsetStore, UpdatePipeline
+from eventlog import flush_writers
+from hotswap import TokenSwitcher, bot_id_of
+from lease import PollingLease
+from metrics import metrics
+from scheduler import get_scheduler
+from engine.config import (
+    EngineConfig, FEATURE_BROADCASTS, FEATURE_REMINDERS, FEATURE_TOKEN_COMMAND, FEATURE_TOKENS,
+    TRANSPORT_POLLING, TRANSPORT_WEBHOOK,
+)
+from engine.context import BotContext
+from engine.registry import registry
+from engine.transports import LazyWSGIApp, create_transport
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class EngineError(Exception):
+    """Raised when the engine cannot be started."""
+
+
+def load_handlers():
+    """Import the handler modules so they declare themselves in the registry."""
+    import engine.handlers  # noqa: F401
+
+
+def _log_to_file(log_file: str):
+    """Send the process's log records to the bot log, once per file."""
+    path = os.path.abspath(log_file)
+    root = logging.getLogger()
+    for handler in root.handlers:
+        if isinstance(handler, logging.FileHandler) and handler.baseFilename == path:
+            return
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    file_handler = logging.FileHandler(path)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root.addHandler(file_handler)
+
+
+def flush_logs():
+    """Flush the handlers of every logger and the background event logs."""
+    loggers = [logging.getLogger()] + [
+        item for item in logging.Logger.manager.loggerDict.values()
+        if isinstance(item, logging.Logger)
+    ]
+    for item in loggers:
+        for handler in item.handlers:
+            try:
+                handler.flush()
+            except Exception:
+                pass
+    flush_writers()
+
+
+class Engine:
+    """Class running one bot with the features of its configuration."""
+
+    def __init__(self, config: EngineConfig, token_manager=None, security_monitor=None):
+        """Initialize the engine.
+
+        Args:
+            config: Engine configuration
+            token_manager: security.TokenManager, created if not given and
+                a token feature is enabled
+            security_monitor: security.SecurityMonitor, the process-wide one if not given
+
+        Raises:
+            EngineError: If no token is available
+        """
+        import telebot
+        from security import IPProtection, TokenManager, get_security_monitor
+
+        load_handlers()
+        _log_to_file(config.log_file)
+
+        self.config = config
+        self.token_manager = token_manager
+        if token_manager is None and {FEATURE_TOKENS, FEATURE_TOKEN_COMMAND} & set(config.features):
+            self.token_manager = TokenManager()
+        self.security_monitor = security_monitor or get_security_monitor()
+
+        if FEATURE_TOKENS in config.features:
+            token = self.token_manager.get_token() or config.token
+        else:
+            token = config.token
+        if not token:
+            raise EngineError("No Telegram token provided")
+
+        self.bot = telebot.TeleBot(token, threaded=False)
+        self.router = CommandRouter(
+            self.bot,
+            deadlines=config.handler_deadlines,
+            default_deadline=config.default_deadline,
+        )
+
+        observers = []
+        self.subscribers = None
+        self.broadcasts = None
+        if FEATURE_BROADCASTS in config.features:
+            from subscribers import SubscriberStore
+            from broadcast import BroadcastEngine, BroadcastJobStore, BroadcastManager
+
+            self.subscribers = SubscriberStore(os.path.join(config.data_dir, "subscribers.db"))
+            observers.append(self.subscribers.record_update)
+            self.broadcasts = BroadcastManager(
+                BroadcastEngine(self.bot, self.subscribers, rate=config.broadcast_rate),
+                BroadcastJobStore(os.path.join(config.data_dir, "broadcasts.db")),
+                checkpoint_every=config.broadcast_checkpoint_every,
+            )
+
+        self.reminders = None
+        if FEATURE_REMINDERS in config.features:
+            from scheduler import ReminderScheduler
+
+            self.reminders = ReminderScheduler(
+                self._deliver_reminder, db_file=os.path.join(config.data_dir, "reminders.db")
+            )
+
+        self.abuse = None
+        if config.abuse_threshold:
+            from abuse import AbuseDetector
+
+            self.abuse = AbuseDetector(
+                threshold=config.abuse_threshold,
+                window=config.abuse_window,
+                ban_duration=config.abuse_ban,
+                exempt_ids=[config.owner_id] + config.admin_ids,
+                notify=self._notify_owner if config.owner_id else None,
+                security_monitor=self.security_monitor,
+            )
+            self.abuse.attach(self.security_monitor.bus)
+
+        self.pipeline = UpdatePipeline(
+            self.bot,
+            privileged_ids=[config.owner_id] + config.admin_ids,
+            max_pending=config.update_queue_size,
+            workers=config.update_workers,
+            ignore_policy=IgnorePolicy.from_spec(config.ignore_updates),
+            observers=observers,
+            blocklist=self.abuse,
+        )
+        self.offsets = OffsetStore(os.path.join(config.data_dir, "polling.db"))
+        self.lease = None
+        if config.polling_lease and config.transport == TRANSPORT_POLLING:
+            self.lease = PollingLease(bot_id_of(self.bot.token),
+                                      os.path.join(config.data_dir, "polling.db"),
+                                      ttl=config.lease_ttl)
+        self.stopped = False
+        self.transport = create_transport(config.transport, self)
+        self.switcher = TokenSwitcher(self.bot, self.pipeline,
+                                      on_switch=[self.transport.on_token_switch])
+
+        self.ctx = BotContext(
+            config, self.bot, self.router, self.pipeline,
+            token_manager=self.token_manager,
+            security_monitor=self.security_monitor,
+            ip_protection=IPProtection(config.owner_id, self.security_monitor),
+            subscribers=self.subscribers,
+            broadcasts=self.broadcasts,
+            reminders=self.reminders,
+            switcher=self.switcher,
+        )
+        registry.apply(self.ctx, config.features)
+
+    def _notify_owner(self, text: str):
+        """Send a message to the owner from the scheduler thread."""
+        self.bot.send_message(self.config.owner_id, text)
+
+    def _deliver_reminder(self, reminder):
+        """Send a due reminder from the scheduler thread."""
+        prefix = "⏰ Reminder (late)" if reminder["late"] else "⏰ Reminder"
+        self.bot.send_message(reminder["chat_id"], f"{prefix}: {reminder['text']}")
+
+    def start(self):
+        """Start the background services of the enabled features.
+
+        With a polling lease the engine stands by instead, fully built but
+        with intake held, until it holds the lease.
+        """
+        if self.lease:
+            self.pipeline.hold()
+            get_scheduler().add_job("polling_lease", self._tend_lease, self.lease.ttl / 3,
+                                    initial_delay=0)
+            logger.info(f"Standing by for the polling lease as {self.lease.holder}")
+            return
+        self._start_services()
+
+    def _tend_lease(self):
+        """Renew the polling lease, or take it over once it has expired."""
+        bot_id = bot_id_of(self.bot.token)
+        if self.lease.held:
+            if self.lease.renew():
+                # A standby taking over after a crash resumes from here.
+                if self.pipeline.offset is not None:
+                    self.offsets.set(bot_id, self.pipeline.offset)
+                return
+            # Another process polls now; stop before Telegram rejects us with 409.
+            self.pipeline.hold()
+            logger.error("Polling lease lost; shutting down so the new leader polls alone")
+            threading.Thread(target=self.stop, name="novaxa-demote").start()
+            return
+
+        if self.stopped or not self.lease.try_acquire():
+            return
+        self.pipeline.offset = None
+        self._start_services()
+        self.pipeline.release()
+        metrics.increment("lease_takeovers")
+        logger.info(f"Took over polling from offset {self.pipeline.offset}")
+
+    def _start_services(self):
+        """Resume from the persisted state and start the enabled services."""
+        self.offsets.restore(bot_id_of(self.bot.token), self.pipeline)
+        if self.broadcasts:
+            self.broadcasts.recover()
+            self.broadcasts.start_watcher()
+        if self.reminders:
+            self.reminders.start()
+        if self.abuse:
+            get_scheduler().add_job("abuse_digest", self.abuse.send_digest,
+                                    self.config.abuse_digest_interval, essential=False)
+
+    def run(self):
+        """Start the services and deliver updates until stopped. Blocks."""
+        self.start()
+        logger.info(f"Starting NOVAXA Bot ({self.config.preset} preset, "
+                    f"{self.transport.name} transport)...")
+        self.transport.run()
+
+    def stop(self, timeout: float = None) -> Dict:
+        """Shut down without losing work.
+
+        Stops intake, waits up to the deadline for queued and running
+        updates, suspends the running broadcast at a checkpoint, persists
+        the polling offset, the updates that could not be handled in time
+        and the token usage stamps, sends the last abuse digest, flushes
+        logs and metrics and reports what was left behind.
+
+        Args:
+            timeout: Seconds the whole shutdown may take, defaults to the
+                configured shutdown timeout
+
+        Returns:
+            dict: Shutdown report
+        """
+        if self.stopped:
+            return {}
+        self.stopped = True
+
+        started = time.monotonic()
+        timeout = self.config.shutdown_timeout if timeout is None else timeout
+        deadline = started + timeout
+
+        def remaining(minimum: float = 0.0) -> float:
+            return max(minimum, deadline - time.monotonic())
+
+        # Leave room for the broadcast checkpoint and the flushes below.
+        report = self.pipeline.shutdown(timeout=remaining() * 0.8)
+
+        report["broadcast"] = None
+        if self.broadcasts:
+            report["broadcast"] = self.broadcasts.shutdown(timeout=remaining(1.0))
+        if self.reminders:
+            self.reminders.stop(timeout=remaining(0.5))
+        self.router.shutdown()
+        get_scheduler().stop(timeout=remaining(0.5))
+
+        self.offsets.persist(bot_id_of(self.bot.token), report)
+        if self.token_manager:
+            self.token_manager.flush()
+        if self.abuse:
+            self.abuse.detach(self.security_monitor.bus)
+            self.abuse.send_digest()
+        if self.lease:
+            self.lease.release()
+
+        report["elapsed"] = round(time.monotonic() - started, 2)
+        self._report(report)
+        self._flush()
+        return report
+
+    def _flush(self):
+        """Write out the metrics and every buffered log record."""
+        try:
+            metrics.dump(self.config.metrics_file)
+        except Exception as e:
+            logger.error(f"Could not write metrics: {e}")
+
+        flush_logs()
+
+    def _report(self, report: Dict):
+        """Log what the shutdown had to leave behind."""
+        broadcast = report["broadcast"]
+        if broadcast:
+            logger.info(f"Broadcast job {broadcast['job_id']} suspended after chat "
+                        f"{broadcast['cursor']}; it resumes on the next start")
+        if report["drained"]:
+            logger.info(f"Engine stopped in {report['elapsed']}s with nothing abandoned")
+        else:
+            logger.warning(
+                f"Engine stopped in {report['elapsed']}s: {len(report['abandoned'])} queued "
+                f"updates kept for the next start, {report['in_flight']} still running"
+            )
+
+
+def build_engine(preset: str, **overrides) -> Engine:
+    """Build an engine from a preset and the environment."""
+    from dotenv import load_dotenv
+
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    if os.path.exists(".env"):
+        load_dotenv()
+    return Engine(EngineConfig.from_env(preset, **overrides))
+
+
+def run_preset(preset: str, **overrides):
+    """Run a bot with a preset until interrupted.
+
+    Args:
+        preset: Name of the preset
+        **overrides: Settings taking precedence over the environment
+    """
+    try:
+        engine = build_engine(preset, **overrides)
+    except EngineError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    try:
+        bot_info = engine.bot.get_me()
+        logger.info(f"Bot started: @{bot_info.username} ({bot_info.id})")
+        print(f"Bot started: @{bot_info.username}")
+        print("Press Ctrl+C to stop the bot")
+    except Exception as e:
+        logger.error(f"Failed to get bot info: {e}")
+        sys.exit(1)
+
+    def shutdown(sig, frame):
+        logger.info("Shutting down...")
+        engine.stop()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    engine.run()
+
+
+def wsgi_app(preset: str, **overrides) -> LazyWSGIApp:
+    """Get a WSGI app for gunicorn serving a preset over its webhook."""
+    def factory():
+        engine = build_engine(preset, transport=TRANSPORT_WEBHOOK, **overrides)
+        # gunicorn workers exit through SystemExit on SIGTERM.
+        atexit.register(engine.stop)
+        engine.start()
+        engine.transport.prepare()
+        return engine
+
+    return LazyWSGIApp(factory)
@@ -0,0 +1,41 @@
+"""
+Helpers for the .env file the bot scripts read their settings from.
+"""
+
+import logging
+
+from statefile import write_file
+
+logger = logging.getLogger(__name__)
+
+
+def update_token_in_env(new_token: str, env_file: str = ".env") -> bool:
+    """Replace TELEGRAM_BOT_TOKEN in an env file, appending it if missing.
+
+    Args:
+        new_token: Telegram Bot API token to store
+        env_file: Path of the env file
+
+    Returns:
+        bool: True if the file was updated
+    """
+    try:
+        try:
+            with open(env_file, "r") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            lines = []
+
+        entry = f"TELEGRAM_BOT_TOKEN={new_token}\n"
+        updated = [entry if line.startswith("TELEGRAM_BOT_TOKEN=") else line for line in lines]
+        if entry not in updated:
+            if updated and not updated[-1].endswith("\n"):
+                updated[-1] += "\n"
+            updated.append(entry)
+
+        if write_file(env_file, "".join(updated), backups=1):
+            logger.info(f"Token updated in {env_file}: {new_token[:4]}...{new_token[-4:]}")
+        return True
+    except Exception as e:
+        logger.error(f"Error updating token in {env_file}: {str(e)}")
+        return False
@@ -0,0 +1,7 @@
+"""
+Shared handlers.
+
+Importing this package declares every feature's handlers in the registry.
+"""
+
+from engine.handlers import core, tokens, token_command, broadcasts, reminders, notify, logs, fallback  # noqa: F401
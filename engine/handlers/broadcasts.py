@@ -0,0 +1,96 @@
+"""
+Broadcast commands backed by the persistent BroadcastManager (admin only).
+"""
+
+from engine.config import FEATURE_BROADCASTS
+from engine.registry import ROLE_ADMIN, registry
+
+
+@registry.command(FEATURE_BROADCASTS, ["broadcast"], role=ROLE_ADMIN,
+                  help="[MESSAGE] - Broadcast a message to all users")
+def handle_broadcast(ctx, message):
+    """Queue a broadcast to all subscribers."""
+    user_id = message.from_user.id
+    parts = message.text.split(maxsplit=1)
+    if len(parts) < 2:
+        ctx.bot.reply_to(
+            message,
+            "❌ Please provide a message to broadcast.\n\nUsage: /broadcast [MESSAGE]"
+        )
+        return
+
+    broadcast_message = parts[1]
+    job_id = ctx.broadcasts.submit(
+        broadcast_message,
+        created_by=user_id,
+        progress_chat_id=message.chat.id
+    )
+
+    ctx.bot.reply_to(
+        message,
+        f"✅ Broadcast job `{job_id}` queued for {ctx.subscribers.count()} subscribers.\n\n"
+        f"Use /pausebroadcast {job_id} or /cancelbroadcast {job_id} to stop it.",
+        parse_mode="Markdown"
+    )
+
+    ctx.log_event("broadcast_queued", {"job_id": job_id, "message": broadcast_message}, user_id)
+
+
+@registry.command(FEATURE_BROADCASTS, ["broadcasts"], role=ROLE_ADMIN,
+                  help="List recent broadcast jobs")
+def handle_list_broadcasts(ctx, message):
+    """List recent broadcast jobs."""
+    jobs = ctx.broadcasts.jobs.list(limit=10)
+
+    if not jobs:
+        ctx.bot.reply_to(message, "No broadcast jobs found.")
+        return
+
+    jobs_text = "📣 *Broadcast Jobs*\n\n"
+    for job in jobs:
+        done = job["sent"] + job["blocked"] + job["failed"]
+        jobs_text += (
+            f"ID: `{job['id']}`\n"
+            f"Status: {job['status']}\n"
+            f"Progress: {done}/{job['total']}\n"
+            f"Created: {job['created'][:16]}\n\n"
+        )
+
+    ctx.bot.reply_to(message, jobs_text, parse_mode="Markdown")
+
+
+@registry.command(FEATURE_BROADCASTS, ["pausebroadcast", "resumebroadcast", "cancelbroadcast"],
+                  role=ROLE_ADMIN, help="[JOB_ID] - Pause a broadcast (also resume/cancel)")
+def handle_control_broadcast(ctx, message):
+    """Pause, resume or cancel a broadcast job."""
+    parts = message.text.split()
+    action = parts[0].lstrip("/").split("@")[0].replace("broadcast", "")
+
+    if len(parts) < 2:
+        ctx.bot.reply_to(
+            message,
+            f"❌ Please provide a job ID.\n\nUsage: /{action}broadcast [JOB_ID]"
+        )
+        return
+
+    job_id = parts[1]
+    controls = {
+        "pause": ctx.broadcasts.pause,
+        "resume": ctx.broadcasts.resume,
+        "cancel": ctx.broadcasts.cancel,
+    }
+
+    if controls[action](job_id):
+        ctx.bot.reply_to(
+            message,
+            f"✅ Broadcast job `{job_id}`: {action} requested.",
+            parse_mode="Markdown"
+        )
+        ctx.log_event(f"broadcast_{action}", {"job_id": job_id}, message.from_user.id)
+    else:
+        ctx.bot.reply_to(
+            message,
+            f"❌ Cannot {action} broadcast job `{job_id}`.\n\n"
+            f"Check the job ID and its current status with /broadcasts.",
+            parse_mode="Markdown"
+        )
@@ -0,0 +1,109 @@
+"""
+Core commands every bot answers: /start, /help, /status and /getid.
+"""
+
+import logging
+from datetime import datetime
+
+from engine.config import FEATURE_CORE
+from engine.registry import ROLE_ADMIN, ROLE_OWNER, ROLE_USER, registry
+
+logger = logging.getLogger(__name__)
+
+HELP_SECTIONS = (
+    (ROLE_USER, "Basic Commands"),
+    (ROLE_ADMIN, "Admin Commands"),
+    (ROLE_OWNER, "Owner Commands"),
+)
+
+
+@registry.command(FEATURE_CORE, ["start"], help="Start the bot")
+def handle_start(ctx, message):
+    """Handle the /start command."""
+    from telebot import types
+
+    user_id = message.from_user.id
+    if ctx.subscribers:
+        ctx.subscribers.record(
+            message.chat.id,
+            user_id=user_id,
+            chat_type=message.chat.type,
+            username=message.from_user.username,
+            force=True,
+        )
+
+    markup = types.InlineKeyboardMarkup()
+    markup.add(types.InlineKeyboardButton("📊 Status", callback_data="status"))
+    markup.add(types.InlineKeyboardButton("ℹ️ Help", callback_data="help"))
+
+    ctx.bot.send_message(
+        message.chat.id,
+        f"👋 Welcome to NOVAXA Bot!\n\n"
+        f"Your user ID is: `{user_id}`\n\n"
+        f"Use /help to see available commands.",
+        parse_mode="Markdown",
+        reply_markup=markup
+    )
+
+    logger.info(f"User {user_id} started the bot")
+    ctx.log_event("bot_start", {"user_id": user_id}, user_id)
+
+
+@registry.command(FEATURE_CORE, ["help"], help="Show this help message")
+def handle_help(ctx, message):
+    """Handle the /help command, listing the commands the user may run."""
+    role = ctx.role_of(message.from_user.id)
+    entries = registry.help_entries(ctx.config.features, role)
+
+    help_text = "🤖 *NOVAXA Bot Commands*\n\n"
+    for section_role, title in HELP_SECTIONS:
+        lines = [f"/{spec.name} {spec.help}" if " - " in spec.help else f"/{spec.name} - {spec.help}"
+                 for spec in entries if spec.role == section_role]
+        if lines:
+            help_text += f"{title}:\n" + "\n".join(lines) + "\n\n"
+
+    ctx.bot.send_message(message.chat.id, help_text, parse_mode="Markdown")
+
+
+@registry.command(FEATURE_CORE, ["status"], help="Check bot status")
+def handle_status(ctx, message):
+    """Handle the /status command."""
+    uptime = datetime.now() - ctx.started
+    uptime_str = f"{uptime.days}d {uptime.seconds // 3600}h {(uptime.seconds // 60) % 60}m"
+
+    status_text = (
+        "✅ *NOVAXA Bot Status*\n\n"
+        f"Status: 🟢 Online\n"
+        f"Uptime: {uptime_str}\n"
+        f"Mode: {ctx.config.transport.capitalize()}\n"
+        f"Pending updates: {ctx.pipeline.pending()}\n"
+    )
+
+    if ctx.is_owner(message.from_user.id) and ctx.token_manager:
+        status_text += f"Active Token: {ctx.token_manager.active_token_id or 'None'}\n"
+
+    ctx.bot.send_message(message.chat.id, status_text, parse_mode="Markdown")
+
+
+@registry.command(FEATURE_CORE, ["getid"], help="Get your Telegram ID")
+def handle_getid(ctx, message):
+    """Handle the /getid command."""
+    ctx.bot.reply_to(
+        message,
+        f"Your Telegram ID is: `{message.from_user.id}`\n\n"
+        f"Chat ID: `{message.chat.id}`",
+        parse_mode="Markdown"
+    )
+
+
+@registry.callback(FEATURE_CORE, "menu", func=lambda call: call.data in ("status", "help"))
+def callback_menu(ctx, call):
+    """Handle the buttons sent with /start."""
+    # Answer as the user who pressed the button, not the bot that sent the menu.
+    call.message.from_user = call.from_user
+    if call.data == "status":
+        ctx.bot.answer_callback_query(call.id, "✅ NOVAXA is healthy.")
+        handle_status(ctx, call.message)
+    else:
+        ctx.bot.answer_callback_query(call.id, "Showing help...")
+        handle_help(ctx, call.message)
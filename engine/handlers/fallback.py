@@ -0,0 +1,15 @@
+"""
+Reply to messages no other handler took.
+"""
+
+from engine.config import FEATURE_FALLBACK
+from engine.registry import registry
+
+
+@registry.message(FEATURE_FALLBACK, "message", func=lambda message: True)
+def handle_message(ctx, message):
+    """Handle all other messages."""
+    ctx.bot.reply_to(
+        message,
+        "I don't understand that command. Use /help to see available commands."
+    )
@@ -0,0 +1,42 @@
+"""
+The /log command showing the tail of the bot log (admin only).
+"""
+
+import os
+from typing import List
+
+from dispatch import check_deadline
+from engine.config import FEATURE_LOGS
+from engine.registry import ROLE_ADMIN, registry
+
+
+def read_last_lines(path: str, count: int = 10, block_size: int = 4096) -> List[str]:
+    """Read the last lines of a file without loading the whole file."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            check_deadline()
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    return [line.decode("utf-8", errors="replace") for line in data.splitlines()[-count:]]
+
+
+@registry.command(FEATURE_LOGS, ["log"], role=ROLE_ADMIN, help="View recent logs")
+def handle_log(ctx, message):
+    """View recent logs."""
+    try:
+        last_logs = read_last_lines(ctx.config.log_file, 10)
+
+        log_text = "📋 *Recent Logs*\n\n"
+        for log in last_logs:
+            log_text += f"`{log.strip()}`\n\n"
+
+        ctx.bot.reply_to(message, log_text, parse_mode="Markdown")
+
+        ctx.log_event("logs_viewed", {"count": len(last_logs)}, message.from_user.id)
+    except Exception as e:
+        ctx.bot.reply_to(message, f"❌ Failed to read logs: {str(e)}")
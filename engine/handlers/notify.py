@@ -0,0 +1,31 @@
+"""
+The /notify command forwarding a message to the bot owner.
+"""
+
+import logging
+
+from engine.config import FEATURE_OWNER_NOTIFY
+from engine.registry import registry
+
+logger = logging.getLogger(__name__)
+
+
+@registry.command(FEATURE_OWNER_NOTIFY, ["notify"], help="[MESSAGE] - Send a notification to the owner")
+def handle_notify(ctx, message):
+    """Forward a message to the owner."""
+    if not ctx.config.owner_id:
+        ctx.bot.reply_to(message, "❌ No owner is configured for this bot.")
+        return
+
+    parts = message.text.split(maxsplit=1)
+    if len(parts) < 2:
+        ctx.bot.reply_to(message, "❌ Please provide a message after /notify")
+        return
+
+    user_info = f"From: {message.from_user.first_name} (ID: {message.from_user.id})"
+    try:
+        ctx.bot.send_message(ctx.config.owner_id, f"📢 Notification!\n\n{parts[1]}\n\n{user_info}")
+        ctx.bot.reply_to(message, "✅ Notification sent to the owner!")
+    except Exception as e:
+        logger.error(f"Error sending notification: {str(e)}")
+        ctx.bot.reply_to(message, "❌ Error sending the notification.")
@@ -0,0 +1,27 @@
+"""
+The /notify command setting a persistent reminder.
+"""
+
+from scheduler import parse_when
+from engine.config import FEATURE_REMINDERS
+from engine.registry import registry
+
+USAGE = "Usage: /notify 15:00 Reminder or /notify 10m Reminder"
+
+
+@registry.command(FEATURE_REMINDERS, ["notify"], help="[TIME] [MESSAGE] - Set a reminder")
+def handle_notify(ctx, message):
+    """Schedule a reminder in the current chat."""
+    parts = message.text.split(maxsplit=2)
+    if len(parts) < 3:
+        ctx.bot.reply_to(message, USAGE)
+        return
+
+    due = parse_when(parts[1])
+    if due is None:
+        ctx.bot.reply_to(message, f"❌ Invalid time. {USAGE}")
+        return
+
+    text = parts[2]
+    ctx.reminders.add(message.chat.id, text, due, user_id=message.from_user.id)
+    ctx.bot.reply_to(message, f"✅ Reminder: {due.strftime('%d/%m %H:%M')} - {text}")
@@ -0,0 +1,85 @@
+"""
+The /token command: a minimal safety valve for bots without a TokenManager.
+
+The owner can inspect the running token and replace it. The new token is
+written to .env and applied to the running bot.
+"""
+
+import logging
+
+from engine.config import FEATURE_TOKEN_COMMAND
+from engine.envfile import update_token_in_env
+from engine.registry import ROLE_OWNER, registry
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HELP = (
+    "💼 Token Management (Safety Valve)\n\n"
+    "Available commands:\n"
+    "/token info - Show information about the current token\n"
+    "/token change <new_token> - Change the bot's token\n\n"
+    "Note: These commands are only available to the bot owner."
+)
+
+
+def _mask(token: str) -> str:
+    return f"{token[:4]}...{token[-4:]}"
+
+
+@registry.command(FEATURE_TOKEN_COMMAND, ["token"], role=ROLE_OWNER,
+                  help="Token management (safety valve)")
+def handle_token(ctx, message):
+    """Show or change the running token."""
+    from telebot import apihelper
+
+    parts = message.text.split()
+    if len(parts) == 1:
+        ctx.bot.reply_to(message, TOKEN_HELP)
+        return
+
+    subcommand = parts[1].lower()
+
+    if subcommand == "info":
+        token = ctx.bot.token
+        try:
+            bot_info = apihelper.get_me(token)
+        except Exception as e:
+            logger.error(f"Error getting token info: {str(e)}")
+            ctx.bot.reply_to(message, f"❌ Error: {str(e)}")
+            return
+
+        ctx.bot.reply_to(
+            message,
+            "ℹ️ Token Information\n\n"
+            f"🤖 Bot: @{bot_info.get('username')} ({bot_info.get('first_name')})\n"
+            f"🆔 Bot ID: {bot_info.get('id')}\n"
+            f"🔑 Token: {_mask(token)}\n"
+            "✅ Status: Valid"
+        )
+
+    elif subcommand == "change" and len(parts) >= 3:
+        new_token = parts[2]
+        try:
+            bot_info = apihelper.get_me(new_token)
+        except Exception as e:
+            ctx.bot.reply_to(message, f"❌ Token validation failed: {str(e)}")
+            return
+
+        if not update_token_in_env(new_token):
+            ctx.bot.reply_to(message, "❌ Error updating the token.")
+            return
+
+        ctx.bot.reply_to(
+            message,
+            "✅ Token updated successfully!\n\n"
+            f"🤖 New Bot: @{bot_info.get('username')} ({bot_info.get('first_name')})\n"
+            f"🆔 Bot ID: {bot_info.get('id')}\n"
+            f"🔑 Token: {_mask(new_token)}\n\n"
+            "Switching the running bot to the new token..."
+        )
+        ctx.switch_token(new_token, message.chat.id)
+        logger.info(f"Token changed by owner (ID: {message.from_user.id})")
+        ctx.log_event("token_changed", {"bot_id": bot_info.get("id")}, message.from_user.id)
+
+    else:
+        ctx.bot.reply_to(message, "❌ Invalid subcommand. Use /token to see the available commands.")
@@ -0,0 +1,315 @@
+"""
+Token management commands backed by the TokenManager (owner only).
+
+Changes to the active token are applied to the running bot through the
+token switcher, so none of these commands needs a restart.
+"""
+
+from datetime import datetime
+
+from engine.config import FEATURE_TOKENS
+from engine.registry import ROLE_OWNER, registry
+
+
+@registry.command(FEATURE_TOKENS, ["addtoken"], role=ROLE_OWNER,
+                  help="[TOKEN] [NAME] - Add a new token")
+def handle_add_token(ctx, message):
+    """Add a new token."""
+    user_id = message.from_user.id
+    parts = message.text.split()
+    if len(parts) < 2:
+        ctx.bot.reply_to(
+            message,
+            "❌ Please provide a token.\n\nUsage: /addtoken [TOKEN] [NAME]"
+        )
+        return
+
+    token = parts[1]
+    name = " ".join(parts[2:]) if len(parts) > 2 else "Default"
+
+    token_id = ctx.token_manager.add_token(token, name, user_id)
+
+    ctx.bot.reply_to(
+        message,
+        f"✅ Token added with ID: `{token_id}`\n\n"
+        f"Use /activatetoken {token_id} to activate this token.",
+        parse_mode="Markdown"
+    )
+
+    ctx.log_event("token_added", {"token_id": token_id, "name": name}, user_id)
+
+
+@registry.command(FEATURE_TOKENS, ["activatetoken"], role=ROLE_OWNER,
+                  help="[TOKEN_ID] - Activate a token")
+def handle_activate_token(ctx, message):
+    """Activate a token."""
+    parts = message.text.split()
+    if len(parts) < 2:
+        ctx.bot.reply_to(
+            message,
+            "❌ Please provide a token ID.\n\nUsage: /activatetoken [TOKEN_ID]"
+        )
+        return
+
+    token_id = parts[1]
+
+    if ctx.token_manager.activate_token(token_id):
+        ctx.bot.reply_to(
+            message,
+            f"✅ Token `{token_id}` activated.\n\n"
+            f"{ctx.switch_notice(message.chat.id)}",
+            parse_mode="Markdown"
+        )
+
+        ctx.log_event("token_activated", {"token_id": token_id}, message.from_user.id)
+    else:
+        ctx.bot.reply_to(
+            message,
+            f"❌ Failed to activate token `{token_id}`.\n\n"
+            f"Please check if the token ID is correct.",
+            parse_mode="Markdown"
+        )
+
+
+@registry.command(FEATURE_TOKENS, ["listtokens", "tokens"], role=ROLE_OWNER,
+                  help="List all tokens")
+def handle_list_tokens(ctx, message):
+    """List all tokens."""
+    tokens = ctx.token_manager.get_tokens()
+
+    if not tokens:
+        ctx.bot.reply_to(message, "No tokens found.")
+        return
+
+    active_token_id = ctx.token_manager.active_token_id
+
+    tokens_text = "🔑 *Tokens*\n\n"
+    for token in tokens:
+        status = "✅ ACTIVE" if token["id"] == active_token_id else "❌ INACTIVE"
+        tokens_text += (
+            f"ID: `{token['id']}`\n"
+            f"Name: {token['name']}\n"
+            f"Status: {status}\n"
+            f"Created: {token['created'][:10]}\n\n"
+        )
+
+    ctx.bot.reply_to(message, tokens_text, parse_mode="Markdown")
+
+    ctx.log_event("tokens_listed", {"count": len(tokens)}, message.from_user.id)
+
+
+@registry.command(FEATURE_TOKENS, ["deletetoken"], role=ROLE_OWNER,
+                  help="[TOKEN_ID] - Delete a token")
+def handle_delete_token(ctx, message):
+    """Ask for confirmation before deleting a token."""
+    from telebot import types
+
+    parts = message.text.split()
+    if len(parts) < 2:
+        ctx.bot.reply_to(
+            message,
+            "❌ Please provide a token ID.\n\nUsage: /deletetoken [TOKEN_ID]"
+        )
+        return
+
+    token_id = parts[1]
+
+    markup = types.InlineKeyboardMarkup()
+    markup.add(
+        types.InlineKeyboardButton("✅ Yes", callback_data=f"delete_token_yes_{token_id}"),
+        types.InlineKeyboardButton("❌ No", callback_data="delete_token_no")
+    )
+
+    ctx.bot.reply_to(
+        message,
+        f"⚠️ Are you sure you want to delete token `{token_id}`?",
+        parse_mode="Markdown",
+        reply_markup=markup
+    )
+
+
+@registry.callback(FEATURE_TOKENS, "deletetoken", role=ROLE_OWNER,
+                   func=lambda call: call.data.startswith("delete_token_"))
+def callback_delete_token(ctx, call):
+    """Handle token deletion confirmation."""
+    chat_id = call.message.chat.id
+    message_id = call.message.message_id
+
+    if call.data == "delete_token_no":
+        ctx.bot.answer_callback_query(call.id, "Deletion cancelled.")
+        ctx.bot.edit_message_text("Token deletion cancelled.", chat_id=chat_id, message_id=message_id)
+        return
+
+    token_id = call.data.replace("delete_token_yes_", "")
+
+    if ctx.token_manager.delete_token(token_id):
+        ctx.bot.answer_callback_query(call.id, "Token deleted.")
+        ctx.bot.edit_message_text(
+            f"✅ Token `{token_id}` deleted.\n\n{ctx.switch_notice(chat_id)}",
+            chat_id=chat_id,
+            message_id=message_id,
+            parse_mode="Markdown"
+        )
+
+        ctx.log_event("token_deleted", {"token_id": token_id}, call.from_user.id)
+    else:
+        ctx.bot.answer_callback_query(call.id, "Failed to delete token.")
+        ctx.bot.edit_message_text(
+            f"❌ Failed to delete token `{token_id}`.",
+            chat_id=chat_id,
+            message_id=message_id,
+            parse_mode="Markdown"
+        )
+
+
+@registry.command(FEATURE_TOKENS, ["rotatetoken"], role=ROLE_OWNER,
+                  help="[TOKEN_ID] [NEW_TOKEN] - Rotate a token")
+def handle_rotate_token(ctx, message):
+    """Rotate a token to a new value."""
+    parts = message.text.split()
+    if len(parts) < 3:
+        ctx.bot.reply_to(
+            message,
+            "❌ Please provide a token ID and a new token value.\n\n"
+            "Usage: /rotatetoken [TOKEN_ID] [NEW_TOKEN]"
+        )
+        return
+
+    token_id = parts[1]
+    new_token = parts[2]
+
+    if ctx.token_manager.rotate_token(token_id, new_token):
+        ctx.bot.reply_to(
+            message,
+            f"✅ Token `{token_id}` rotated to new value.\n\n"
+            f"{ctx.switch_notice(message.chat.id)}",
+            parse_mode="Markdown"
+        )
+
+        ctx.log_event("token_rotated", {"token_id": token_id}, message.from_user.id)
+    else:
+        ctx.bot.reply_to(
+            message,
+            f"❌ Failed to rotate token `{token_id}`.\n\n"
+            f"Please check if the token ID is correct.",
+            parse_mode="Markdown"
+        )
+
+
+@registry.command(FEATURE_TOKENS, ["emergency", "emergencyreset"], role=ROLE_OWNER,
+                  help="Emergency reset")
+def handle_emergency(ctx, message):
+    """Ask for confirmation before an emergency reset of tokens."""
+    from telebot import types
+
+    markup = types.InlineKeyboardMarkup()
+    markup.add(
+        types.InlineKeyboardButton("✅ Yes", callback_data="emergency_yes"),
+        types.InlineKeyboardButton("❌ No", callback_data="emergency_no")
+    )
+
+    ctx.bot.reply_to(
+        message,
+        "⚠️ *EMERGENCY RESET*\n\n"
+        "This will reset all tokens to their last known good state.\n\n"
+        "Are you sure you want to proceed?",
+        parse_mode="Markdown",
+        reply_markup=markup
+    )
+
+
+@registry.callback(FEATURE_TOKENS, "emergency", role=ROLE_OWNER,
+                   func=lambda call: call.data.startswith("emergency_"))
+def callback_emergency(ctx, call):
+    """Handle emergency reset confirmation."""
+    user_id = call.from_user.id
+    chat_id = call.message.chat.id
+    message_id = call.message.message_id
+
+    if call.data == "emergency_no":
+        ctx.bot.answer_callback_query(call.id, "Emergency reset cancelled.")
+        ctx.bot.edit_message_text("Emergency reset cancelled.", chat_id=chat_id, message_id=message_id)
+        return
+
+    success = ctx.token_manager.emergency_reset(user_id)
+    if success:
+        ctx.bot.answer_callback_query(call.id, "Emergency reset completed.")
+        ctx.bot.edit_message_text(
+            "✅ Emergency reset completed.\n\n"
+            "All tokens have been reset to their last known good state.\n\n"
+            f"{ctx.switch_notice(chat_id)}",
+            chat_id=chat_id,
+            message_id=message_id
+        )
+    else:
+        ctx.bot.answer_callback_query(call.id, "Failed to perform emergency reset.")
+        ctx.bot.edit_message_text("❌ Failed to perform emergency reset.",
+                                  chat_id=chat_id, message_id=message_id)
+
+    ctx.log_event("emergency_reset", {"success": success}, user_id)
+
+
+@registry.command(FEATURE_TOKENS, ["exporttokens"], role=ROLE_OWNER,
+                  help="[full] - Export tokens to a file")
+def handle_export_tokens(ctx, message):
+    """Export tokens to a file under config/."""
+    parts = message.text.split()
+    include_values = len(parts) > 1 and parts[1].lower() == "full"
+
+    if include_values:
+        ctx.bot.reply_to(
+            message,
+            "⚠️ You are exporting tokens with their values. This is a security risk."
+        )
+
+    export_data = ctx.token_manager.export_tokens(include_values)
+    export_file = f"config/tokens_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+
+    try:
+        with open(export_file, "w") as f:
+            f.write(export_data)
+
+        ctx.bot.reply_to(
+            message,
+            f"✅ Tokens exported to `{export_file}`\n\n"
+            f"Use the file to backup or transfer tokens.",
+            parse_mode="Markdown"
+        )
+
+        ctx.log_event("tokens_exported", {"file": export_file, "include_values": include_values},
+                      message.from_user.id)
+    except Exception as e:
+        ctx.bot.reply_to(message, f"❌ Failed to export tokens: {str(e)}")
+
+
+@registry.command(FEATURE_TOKENS, ["importtokens"], role=ROLE_OWNER,
+                  help="[FILE_PATH] - Import tokens from a file")
+def handle_import_tokens(ctx, message):
+    """Import tokens from a file."""
+    user_id = message.from_user.id
+    parts = message.text.split()
+    if len(parts) < 2:
+        ctx.bot.reply_to(
+            message,
+            "❌ Please provide a file path.\n\n"
+            "Usage: /importtokens [FILE_PATH]"
+        )
+        return
+
+    file_path = parts[1]
+
+    try:
+        with open(file_path, "r") as f:
+            json_data = f.read()
+
+        if ctx.token_manager.import_tokens(json_data, user_id):
+            ctx.bot.reply_to(
+                message,
+                f"✅ Tokens imported successfully.\n\n{ctx.switch_notice(message.chat.id)}"
+            )
+
+            ctx.log_event("tokens_imported", {"file": file_path}, user_id)
+        else:
+            ctx.bot.reply_to(message, "❌ Failed to import tokens.")
+    except Exception as e:
+        ctx.bot.reply_to(message, f"❌ Failed to import tokens: {str(e)}")
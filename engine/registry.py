@@ -0,0 +1,185 @@
+"""
+Shared handler registry.
+
+Handlers are declared once, grouped by feature, and applied to any bot the
+engine runs. Each handler is called with the BotContext of the bot it serves
+and the telebot update. Rate limiting and the owner/admin checks are done
+here, so individual handlers only contain their own logic.
+"""
+
+import logging
+from typing import Callable, Dict, Iterable, List
+
+from engine.config import FEATURE_BROADCASTS, FEATURE_LOGS, FEATURE_TOKEN_COMMAND, FEATURE_TOKENS
+
+logger = logging.getLogger(__name__)
+
+ROLE_USER = "user"
+ROLE_ADMIN = "admin"
+ROLE_OWNER = "owner"
+
+KIND_COMMAND = "command"
+KIND_CALLBACK = "callback"
+KIND_MESSAGE = "message"
+
+DENIED_TEXT = {
+    ROLE_ADMIN: "⛔ You don't have permission to use this command.",
+    ROLE_OWNER: "⛔ This command is only available to the bot owner.",
+}
+
+# Audit event recorded when a user lacks the role, by feature.
+DENIED_EVENT = {
+    FEATURE_TOKENS: "unauthorized_token_access",
+    FEATURE_TOKEN_COMMAND: "unauthorized_token_access",
+    FEATURE_BROADCASTS: "unauthorized_broadcast",
+    FEATURE_LOGS: "unauthorized_log_access",
+}
+DEFAULT_DENIED_EVENT = "unauthorized_access"
+
+
+class HandlerSpec:
+    """One declared handler, not yet bound to a bot."""
+
+    def __init__(self, kind: str, feature: str, name: str, func: Callable,
+                 commands: List[str] = None, role: str = ROLE_USER, help: str = None,
+                 deadline: float = None, filters: Dict = None):
+        self.kind = kind
+        self.feature = feature
+        self.name = name
+        self.func = func
+        self.commands = commands
+        self.role = role
+        self.help = help
+        self.deadline = deadline
+        self.filters = filters or {}
+
+
+class HandlerRegistry:
+    """Class for declaring handlers once and applying them to many bots."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._specs = []
+
+    def command(self, feature: str, commands: List[str], role: str = ROLE_USER,
+                help: str = None, deadline: float = None, **filters):
+        """Declare a command handler.
+
+        Args:
+            feature: Feature the command belongs to
+            commands: Command names, the first one is used for help and metrics
+            role: ROLE_USER, ROLE_ADMIN or ROLE_OWNER
+            help: Argument synopsis and description shown by /help
+            deadline: Override for the configured deadline
+            **filters: Passed through to telebot's ``message_handler``
+        """
+        def decorator(func: Callable) -> Callable:
+            self._specs.append(HandlerSpec(KIND_COMMAND, feature, commands[0], func, commands=commands,
+                                           role=role, help=help, deadline=deadline, filters=filters))
+            return func
+        return decorator
+
+    def callback(self, feature: str, name: str = None, role: str = ROLE_USER,
+                 deadline: float = None, **filters):
+        """Declare a callback query handler.
+
+        Args:
+            feature: Feature the callback belongs to
+            name: Name used for deadline lookup and metrics
+            role: ROLE_USER, ROLE_ADMIN or ROLE_OWNER
+            deadline: Override for the configured deadline
+            **filters: Passed through to telebot's ``callback_query_handler``
+        """
+        def decorator(func: Callable) -> Callable:
+            self._specs.append(HandlerSpec(KIND_CALLBACK, feature, name or func.__name__, func,
+                                           role=role, deadline=deadline, filters=filters))
+            return func
+        return decorator
+
+    def message(self, feature: str, name: str = None, **filters):
+        """Declare a handler for non-command messages. These are applied last."""
+        def decorator(func: Callable) -> Callable:
+            self._specs.append(HandlerSpec(KIND_MESSAGE, feature, name or func.__name__, func,
+                                           filters=filters))
+            return func
+        return decorator
+
+    def features(self) -> List[str]:
+        """Get the names of all declared features."""
+        return sorted({spec.feature for spec in self._specs})
+
+    def specs(self, features: Iterable[str]) -> List[HandlerSpec]:
+        """Get the handlers of the given features in the order telebot should try them.
+
+        A command declared by several enabled features is served by the one
+        listed first.
+        """
+        features = list(features)
+        unknown = set(features) - set(self.features())
+        if unknown:
+            raise ValueError(f"Unknown features: {', '.join(sorted(unknown))}")
+
+        selected, seen = [], set()
+        for feature in features:
+            for spec in self._specs:
+                if spec.feature != feature or spec.kind == KIND_MESSAGE:
+                    continue
+                if spec.kind == KIND_COMMAND:
+                    if seen.intersection(spec.commands):
+                        continue
+                    seen.update(spec.commands)
+                selected.append(spec)
+
+        # Catch-all message handlers would shadow everything declared after them.
+        selected.extend(spec for spec in self._specs
+                        if spec.kind == KIND_MESSAGE and spec.feature in features)
+        return selected
+
+    def help_entries(self, features: Iterable[str], role: str) -> List[HandlerSpec]:
+        """Get the commands a user with the given role can see in /help."""
+        visible = {ROLE_USER: (ROLE_USER,), ROLE_ADMIN: (ROLE_USER, ROLE_ADMIN),
+                   ROLE_OWNER: (ROLE_USER, ROLE_ADMIN, ROLE_OWNER)}[role]
+        return [spec for spec in self.specs(features)
+                if spec.kind == KIND_COMMAND and spec.help and spec.role in visible]
+
+    def apply(self, ctx, features: Iterable[str]):
+        """Register the handlers of the given features on a bot.
+
+        Args:
+            ctx: BotContext of the bot
+            features: Features to enable
+        """
+        for spec in self.specs(features):
+            handler = self._bind(ctx, spec)
+            if spec.kind == KIND_CALLBACK:
+                ctx.router.callback_query_handler(name=spec.name, deadline=spec.deadline,
+                                                  **spec.filters)(handler)
+            else:
+                ctx.router.message_handler(commands=spec.commands, deadline=spec.deadline,
+                                           **spec.filters)(handler)
+
+    def _bind(self, ctx, spec: HandlerSpec) -> Callable:
+        """Bind a handler to a context, with rate limiting and the role check."""
+        def handler(update):
+            user_id = update.from_user.id
+            if spec.kind != KIND_CALLBACK and ctx.rate_limited(user_id):
+                ctx.bot.reply_to(update, "⚠️ Rate limit exceeded.")
+                return None
+
+            if not ctx.has_role(user_id, spec.role):
+                if spec.kind == KIND_CALLBACK:
+                    ctx.bot.answer_callback_query(update.id, DENIED_TEXT[spec.role])
+                else:
+                    ctx.bot.reply_to(update, DENIED_TEXT[spec.role])
+                ctx.log_event(DENIED_EVENT.get(spec.feature, DEFAULT_DENIED_EVENT),
+                              {"command": spec.name}, user_id)
+                return None
+
+            return spec.func(ctx, update)
+
+        handler.__name__ = spec.func.__name__
+        handler.__doc__ = spec.func.__doc__
+        return handler
+
+
+registry = HandlerRegistry()
@@ -0,0 +1,444 @@
+"""
+Update transports.
+
+A transport decides how raw updates reach the engine's pipeline: long
+polling, a webhook endpoint, or a replay of recorded updates. The handlers
+never see the difference.
+"""
+
+import hmac
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional, Union
+from urllib.parse import urlparse
+
+from dispatch import AdaptivePollTimeout, allowed_updates_for
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEBHOOK_PATH = "/webhook"
+
+
+def webhook_secret(token: str) -> str:
+    """Derive the secret Telegram echoes back on a bot's webhook requests."""
+    return hmac.new(token.encode(), b"novaxa-webhook", hashlib.sha256).hexdigest()
+
+
+class Transport:
+    """Base class for feeding updates to an engine."""
+
+    name = None
+
+    def __init__(self, engine):
+        """Initialize the transport.
+
+        Args:
+            engine: Engine whose pipeline receives the updates
+        """
+        self.engine = engine
+
+    def run(self):
+        """Deliver updates until stopped. Blocks."""
+        raise NotImplementedError
+
+    def stop(self):
+        """Stop delivering updates."""
+        self.engine.pipeline.stop()
+
+    def on_token_switch(self, old_token: str, info: Dict):
+        """Called after the bot switched tokens, while intake is held."""
+
+
+class PollingTransport(Transport):
+    """Transport long-polling getUpdates."""
+
+    name = "polling"
+
+    def run(self):
+        """Poll for updates until stopped."""
+        from telebot import apihelper
+
+        try:
+            apihelper.delete_webhook(self.engine.bot.token)
+        except Exception as e:
+            logger.warning(f"Could not delete webhook before polling: {e}")
+
+        config = self.engine.config
+        self.engine.pipeline.run_polling(
+            long_polling_timeout=config.long_polling_timeout,
+            adaptive=self.adaptive_timeout() if config.energy_saver else None,
+        )
+
+    def adaptive_timeout(self) -> AdaptivePollTimeout:
+        """Get the energy-saving poll timeout, pausing idle-only jobs while quiet."""
+        from scheduler import get_scheduler
+
+        config = self.engine.config
+        scheduler = get_scheduler()
+        return AdaptivePollTimeout(
+            base=config.long_polling_timeout,
+            maximum=config.poll_timeout_max,
+            latency_target=config.latency_target,
+            idle_after=config.idle_after,
+            on_idle=lambda: scheduler.set_idle(True),
+            on_active=lambda: scheduler.set_idle(False),
+            metrics=self.engine.pipeline.metrics,
+        )
+
+
+
+class WebhookTransport(Transport):
+    """Transport receiving updates on a Flask webhook endpoint."""
+
+    name = "webhook"
+
+    def __init__(self, engine):
+        """Initialize the transport."""
+        super().__init__(engine)
+        url = engine.config.webhook_url
+        self.path = (urlparse(url).path if url else "") or DEFAULT_WEBHOOK_PATH
+        self.app = None
+        self.failover = None
+
+    def register(self) -> bool:
+        """Point the bot's webhook at this process.
+
+        Returns:
+            bool: True if the webhook was set
+        """
+        from telebot import apihelper
+
+        url = self.engine.config.webhook_url
+        if not url:
+            logger.warning("WEBHOOK_URL is not set; Telegram will not deliver updates")
+            return False
+
+        bot = self.engine.bot
+        try:
+            apihelper.set_webhook(
+                bot.token, url=url, secret_token=webhook_secret(bot.token),
+                allowed_updates=allowed_updates_for(bot, self.engine.pipeline.ignore_policy),
+            )
+            logger.info(f"Webhook set to {url}")
+            return True
+        except Exception as e:
+            logger.error(f"Could not set webhook: {e}")
+            return False
+
+    def handle(self, secret: Optional[str], payload: Dict) -> int:
+        """Queue one webhook request.
+
+        Args:
+            secret: X-Telegram-Bot-Api-Secret-Token header
+            payload: Update as decoded from the request body
+
+        Returns:
+            int: HTTP status code for the response, 503 while intake is
+                held or shutting down
+        """
+        if self.engine.pipeline.closing or self.engine.pipeline.held:
+            # Telegram retries, and the resumed or next process picks it up.
+            return 503
+
+        expected = webhook_secret(self.engine.bot.token)
+        if not secret or not hmac.compare_digest(secret, expected):
+            self.engine.pipeline.metrics.increment("webhook_rejected")
+            return 403
+        if not isinstance(payload, dict) or "update_id" not in payload:
+            return 400
+
+        self.engine.pipeline.submit(payload)
+        return 200
+
+    def create_app(self):
+        """Create the Flask app serving the webhook endpoint."""
+        from flask import Flask, jsonify, request
+
+        app = Flask(__name__)
+
+        @app.route("/", methods=["GET"])
+        def index():
+            return jsonify({"status": "ok", "message": "NOVAXA bot is running",
+                            "preset": self.engine.config.preset})
+
+        @app.route("/setwebhook", methods=["GET"])
+        def set_webhook():
+            return jsonify({"status": "success" if self.register() else "failure"})
+
+        @app.route(self.path, methods=["POST"])
+        def webhook():
+            status = self.handle(request.headers.get("X-Telegram-Bot-Api-Secret-Token"),
+                                 request.get_json(silent=True))
+            return jsonify({"status": "ok" if status == 200 else "error"}), status
+
+        return app
+
+    def prepare(self):
+        """Start processing and register the webhook.
+
+        Returns:
+            flask.Flask: The app to serve
+        """
+        self.engine.pipeline.start()
+        self.register()
+        if self.app is None:
+            self.app = self.create_app()
+
+        interval = self.engine.config.webhook_monitor_interval
+        if self.failover is None and interval and self.engine.config.webhook_url:
+            from scheduler import get_scheduler
+
+            self.failover = WebhookFailover(self)
+            get_scheduler().add_job("webhook_monitor", self.failover.check, interval,
+                                    jitter=min(5.0, interval * 0.1))
+        return self.app
+
+    def run(self):
+        """Serve the webhook endpoint with Flask's server."""
+        config = self.engine.config
+        self.prepare().run(host=config.host, port=config.port)
+
+    def on_token_switch(self, old_token: str, info: Dict):
+        """Move the webhook to the new token, unless polling has taken over."""
+        if self.failover and self.failover.state != WebhookFailover.WEBHOOK:
+            return
+        self.register()
+
+
+class WebhookFailover:
+    """Class for watching a webhook and falling back to long polling.
+
+    Every check reads getWebhookInfo and exports the backlog and the last
+    delivery error as metrics. When the backlog stays above the threshold
+    or Telegram keeps reporting new delivery errors, the webhook is deleted,
+    keeping its pending updates, and the bot long-polls instead. Once the
+    public endpoint answers again, polling stops and the webhook is set
+    again.
+    """
+
+    WEBHOOK = "webhook"
+    POLLING = "polling"
+    RESTORING = "restoring"
+
+    def __init__(self, transport: WebhookTransport):
+        """Initialize the failover.
+
+        Args:
+            transport: Webhook transport being watched
+        """
+        config = transport.engine.config
+        self.transport = transport
+        self.engine = transport.engine
+        self.metrics = transport.engine.pipeline.metrics
+        self.backlog_threshold = config.webhook_backlog_threshold
+        self.failover_after = config.webhook_failover_after
+        self.restore_after = config.webhook_failover_after
+        parsed = urlparse(config.webhook_url)
+        self.health_url = f"{parsed.scheme}://{parsed.netloc}/"
+
+        self.state = self.WEBHOOK
+        self.unhealthy = 0
+        self.healthy = 0
+        self.last_error_date = None
+        self._stop_polling = None
+        self._thread = None
+
+    def check(self):
+        """Run one monitoring step. Called periodically by the job scheduler."""
+        if self.engine.pipeline.closing:
+            return
+        if self.state == self.WEBHOOK:
+            self._check_webhook()
+        elif self.state == self.POLLING:
+            self._check_endpoint()
+        elif self._thread is None or not self._thread.is_alive():
+            # The last getUpdates call has returned; Telegram would refuse
+            # a webhook while one is in flight.
+            self._restore()
+
+    def _check_webhook(self):
+        """Read getWebhookInfo, export it and fail over if it stays unhealthy."""
+        from telebot import apihelper
+
+        try:
+            info = apihelper.get_webhook_info(self.engine.bot.token)
+        except Exception as e:
+            logger.warning(f"Could not read webhook info: {e}")
+            return
+
+        pending = info.get("pending_update_count", 0)
+        self.metrics.set_gauge("webhook_pending_updates", pending)
+
+        error_date = info.get("last_error_date")
+        new_error = bool(error_date) and error_date != self.last_error_date
+        if error_date:
+            self.metrics.set_gauge("webhook_last_error_age_s", max(0, time.time() - error_date))
+        if new_error:
+            self.last_error_date = error_date
+            self.metrics.increment("webhook_delivery_errors")
+            logger.warning(f"Webhook delivery error: {info.get('last_error_message', 'unknown')}")
+
+        if not info.get("url"):
+            logger.warning("Webhook is not set; registering it again")
+            self.transport.register()
+            return
+
+        if pending >= self.backlog_threshold or new_error:
+            self.unhealthy += 1
+        else:
+            self.unhealthy = 0
+        if self.unhealthy >= self.failover_after:
+            self._fail_over(pending, info.get("last_error_message"))
+
+    def _fail_over(self, pending: int, error: Optional[str]):
+        """Delete the webhook and start long polling."""
+        from telebot import apihelper
+
+        try:
+            # Pending updates stay queued at Telegram for getUpdates.
+            apihelper.delete_webhook(self.engine.bot.token, drop_pending_updates=False)
+        except Exception as e:
+            logger.error(f"Could not delete webhook for failover: {e}")
+            return
+
+        logger.warning(f"Webhook unhealthy ({pending} pending, last error: {error or '-'}); "
+                       f"falling back to long polling")
+        self.state = self.POLLING
+        self.unhealthy = 0
+        self.healthy = 0
+        self._stop_polling = threading.Event()
+        self._thread = threading.Thread(
+            target=self.engine.pipeline.run_polling,
+            kwargs={"long_polling_timeout": self.engine.config.long_polling_timeout,
+                    "stop_event": self._stop_polling},
+            name="novaxa-failover-poll", daemon=True,
+        )
+        self._thread.start()
+        self.metrics.increment("webhook_failovers")
+        self.metrics.set_gauge("webhook_failover_active", 1)
+
+    def _check_endpoint(self):
+        """Probe the public endpoint and stop polling once it answers."""
+        import requests
+
+        try:
+            ok = requests.get(self.health_url, timeout=10).status_code == 200
+        except Exception:
+            ok = False
+
+        self.healthy = self.healthy + 1 if ok else 0
+        if self.healthy >= self.restore_after:
+            logger.info("Webhook endpoint is reachable again; stopping long polling")
+            self.state = self.RESTORING
+            self._stop_polling.set()
+
+    def _restore(self):
+        """Set the webhook again after polling stopped."""
+        from telebot import apihelper
+
+        offset = self.engine.pipeline.offset
+        if offset:
+            try:
+                # Confirm the last polled batch, or the webhook would redeliver it.
+                apihelper.get_updates(self.engine.bot.token, offset=offset, limit=1,
+                                      timeout=10, long_polling_timeout=0)
+            except Exception as e:
+                logger.warning(f"Could not confirm polled updates: {e}")
+                return
+        if not self.transport.register():
+            return
+        self.state = self.WEBHOOK
+        self.healthy = 0
+        self._thread = None
+        self.metrics.set_gauge("webhook_failover_active", 0)
+        logger.info("Webhook restored")
+
+
+class ReplayTransport(Transport):
+    """Transport feeding recorded updates, e.g. to reproduce an incident."""
+
+    name = "replay"
+
+    def __init__(self, engine, source: Union[str, Iterable[Dict]] = None, drain_timeout: float = 60.0):
+        """Initialize the transport.
+
+        Args:
+            engine: Engine whose pipeline receives the updates
+            source: Path of a JSONL file with one raw update per line, or the
+                updates themselves; defaults to the configured replay file
+            drain_timeout: Seconds to wait for the replayed updates to finish
+        """
+        super().__init__(engine)
+        self.source = source if source is not None else engine.config.replay_file
+        self.drain_timeout = drain_timeout
+        self.replayed = 0
+
+    def updates(self) -> Iterable[Dict]:
+        """Read the updates to replay."""
+        if not isinstance(self.source, str):
+            yield from self.source or ()
+            return
+
+        with open(self.source, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def run(self):
+        """Replay every update, wait for them to be handled and stop."""
+        pipeline = self.engine.pipeline
+        pipeline.start()
+        for raw in self.updates():
+            pipeline.submit(raw)
+            self.replayed += 1
+
+        if not pipeline.drain(self.drain_timeout):
+            logger.warning(f"{pipeline.pending()} replayed updates still pending")
+        pipeline.stop()
+        logger.info(f"Replayed {self.replayed} updates")
+
+
+TRANSPORTS = {
+    PollingTransport.name: PollingTransport,
+    WebhookTransport.name: WebhookTransport,
+    ReplayTransport.name: ReplayTransport,
+}
+
+
+def create_transport(name: str, engine) -> Transport:
+    """Create the transport with the given name."""
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown transport '{name}'")
+    return TRANSPORTS[name](engine)
+
+
+class LazyWSGIApp:
+    """WSGI app that builds its engine on the first request.
+
+    Lets a preset script expose ``app`` for gunicorn without starting a bot
+    when the module is merely imported.
+    """
+
+    def __init__(self, factory):
+        """Initialize the app.
+
+        Args:
+            factory: Returns a started engine with a webhook transport
+        """
+        self.factory = factory
+        self.engine = None
+        self._app = None
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        """Serve one request, building the engine first if needed."""
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    self.engine = self.factory()
+                    self._app = self.engine.transport.app
+        return self._app(environ, start_response)
@@ -0,0 +1,440 @@
+"""
+Event Log Module for NOVAXA Bot
+------------------------------
+This module appends JSON lines to a log file from a background thread,
+keeps the latest events in memory for queries, and passes events between
+the subsystems of a process.
+
+Handlers that record an event, such as SecurityMonitor.log_event for every
+unauthorized attempt, only put it on a bounded queue and return. A writer
+thread takes events off in batches and writes each batch with one write
+call, when the batch is full or the flush interval has passed. When the
+queue is full the event is dropped and counted rather than holding up the
+handler.
+
+How often the file is fsynced is a trade between durability and flash wear
+on phones: ``never`` leaves it to the OS, ``batch`` syncs after every
+batch, and ``interval`` at most once per flush interval.
+
+EventRing holds a fixed number of recent events. Each event type and user
+has an index of the positions of its events, so the latest events of one
+type or user are found without scanning the others.
+
+Each file has one writer per process, from get_writer(), however many
+monitors and loggers write to it; attach_log_file() sends a logger's
+records through that writer, so no line is written twice and no handler
+thread is duplicated. Subsystems that react to events, such as the abuse
+detector, subscribe to the process-wide ``bus``.
+"""
+
+import os
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Callable, Dict, Iterator, List
+
+from metrics import metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+FSYNC_NEVER = "never"
+FSYNC_BATCH = "batch"
+FSYNC_INTERVAL = "interval"
+FSYNC_POLICIES = (FSYNC_NEVER, FSYNC_BATCH, FSYNC_INTERVAL)
+
+# Every writer of the process, so flush_writers() can empty them at shutdown.
+_writers = weakref.WeakSet()
+# The shared writer and logging handler of each file, by absolute path.
+_shared_writers: Dict[str, "JsonlWriter"] = {}
+_handlers: Dict[str, "WriterHandler"] = {}
+_shared_lock = threading.Lock()
+
+
+class _FlushRequest:
+    """Marker asking the writer thread to write out what it holds."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class JsonlWriter:
+    """Class for appending JSON lines to a file in the background.
+
+    Events are serialized on the writer thread; strings, such as formatted
+    log records, are written as they are.
+    """
+
+    def __init__(self, path: str, queue_size: int = 10000, batch_size: int = 100,
+                 flush_interval: float = 1.0, fsync: str = FSYNC_INTERVAL, metrics=None):
+        """Initialize the writer. Nothing is opened until the first event.
+
+        Args:
+            path: File the lines are appended to
+            queue_size: Events that may wait to be written before new ones are dropped
+            batch_size: Events written together at most
+            flush_interval: Seconds an event may wait to be written
+            fsync: When to fsync the file, ``never``, ``batch`` or ``interval``
+            metrics: Metrics registry, defaults to the shared one
+
+        Raises:
+            ValueError: If the fsync policy is unknown
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}', use one of {', '.join(FSYNC_POLICIES)}")
+
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.metrics = metrics or default_metrics
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._file = None
+        self._last_sync = 0.0
+        _writers.add(self)
+
+    def write(self, event: Dict) -> bool:
+        """Queue an event to be written. Never blocks.
+
+        Returns:
+            bool: False if the queue was full and the event was dropped
+        """
+        self._start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            self.metrics.increment("event_log_dropped")
+            return False
+        return True
+
+    def _start(self):
+        """Start the writer thread on the first event."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"jsonl-writer:{self.path}",
+                                                daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """Take events off the queue and write them in batches."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch, requests = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None:
+                if isinstance(item, _FlushRequest):
+                    requests.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            self._write_batch(batch, force_sync=bool(requests))
+            for request in requests:
+                request.done.set()
+            if item is None:
+                return
+
+    def _write_batch(self, batch, force_sync: bool = False):
+        """Write a batch with one call and sync it as the policy says. Called by the thread."""
+        if not batch and not force_sync:
+            return
+        try:
+            if self._file is None:
+                if os.path.dirname(self.path):
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = open(self.path, "a")
+            if batch:
+                self._file.write("".join(
+                    (event if isinstance(event, str) else json.dumps(event)) + "\n" for event in batch
+                ))
+            self._file.flush()
+
+            now = time.monotonic()
+            if (self.fsync == FSYNC_BATCH or (force_sync and self.fsync != FSYNC_NEVER)
+                    or (self.fsync == FSYNC_INTERVAL and now - self._last_sync >= self.flush_interval)):
+                os.fsync(self._file.fileno())
+                self._last_sync = now
+        except Exception as e:
+            self.metrics.increment("event_log_errors")
+            logger.error(f"Error writing {len(batch)} events to {self.path}: {e}")
+            return
+        with self._lock:
+            self.written += len(batch)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every event queued so far is written.
+
+        Returns:
+            bool: False if the writer did not catch up within the timeout
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        request = _FlushRequest()
+        try:
+            self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            return False
+        return request.done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        """Write out the queued events, stop the thread and close the file."""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                logger.warning(f"Event log {self.path} still busy, closing without waiting")
+            else:
+                thread.join(timeout)
+        self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> Dict:
+        """Get the writer's counts, for the dashboard and tests."""
+        with self._lock:
+            return {"queued": self._queue.qsize(), "written": self.written,
+                    "dropped": self.dropped}
+
+
+class EventRing:
+    """Class for keeping the latest events, indexed by type and user.
+
+    Events are numbered as they arrive and stored in a fixed list at their
+    number modulo the capacity, so appending overwrites the oldest event
+    in place. The indexes keep the numbers of each type's and user's events
+    in order, and the oldest number leaves the front of its index when its
+    slot is overwritten, so appending is O(1) and every index stays bounded.
+    """
+
+    def __init__(self, capacity: int = 1000, type_field: str = "type", user_field: str = "user_id"):
+        """Initialize the ring.
+
+        Args:
+            capacity: Events kept; the oldest is overwritten beyond that
+            type_field: Key of an event's type
+            user_field: Key of an event's user ID
+        """
+        self.capacity = capacity
+        self.type_field = type_field
+        self.user_field = user_field
+        self._slots = [None] * capacity
+        self._next = 0
+        self._by_type: Dict = {}
+        self._by_user: Dict = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unindex(index: Dict, key, number: int):
+        """Drop an overwritten event's number from the front of its index."""
+        numbers = index.get(key)
+        if numbers and numbers[0] == number:
+            numbers.popleft()
+            if not numbers:
+                del index[key]
+
+    def append(self, event: Dict):
+        """Store an event, overwriting the oldest once the ring is full."""
+        with self._lock:
+            number = self._next
+            slot = number % self.capacity
+            old = self._slots[slot]
+            if old is not None:
+                evicted = number - self.capacity
+                self._unindex(self._by_type, old.get(self.type_field), evicted)
+                self._unindex(self._by_user, old.get(self.user_field), evicted)
+
+            self._slots[slot] = event
+            self._by_type.setdefault(event.get(self.type_field), deque()).append(number)
+            user_id = event.get(self.user_field)
+            if user_id is not None:
+                self._by_user.setdefault(user_id, deque()).append(number)
+            self._next = number + 1
+
+    def latest(self, count: int = 10, event_type: str = None, user_id: int = None) -> List[Dict]:
+        """Get the latest events, newest first, optionally of one type and/or user.
+
+        Only the events returned are visited when one filter or none is
+        given. With both, the shorter of the two indexes is walked from the
+        newest end until enough events of the other kind are found.
+        """
+        with self._lock:
+            if event_type is None and user_id is None:
+                numbers = range(self._next - 1, max(self._next - self.capacity, 0) - 1, -1)
+                check = None
+            else:
+                candidates = []
+                if event_type is not None:
+                    candidates.append((self._by_type.get(event_type, ()), self.user_field, user_id))
+                if user_id is not None:
+                    candidates.append((self._by_user.get(user_id, ()), self.type_field, event_type))
+                index, field, wanted = min(candidates, key=lambda candidate: len(candidate[0]))
+                numbers = reversed(index)
+                check = (field, wanted) if len(candidates) == 2 else None
+
+            found = []
+            for number in numbers:
+                if len(found) >= count:
+                    break
+                event = self._slots[number % self.capacity]
+                if check is None or event.get(check[0]) == check[1]:
+                    found.append(event)
+            return found
+
+    def __len__(self) -> int:
+        return min(self._next, self.capacity)
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Iterate over a snapshot of the events, oldest first."""
+        with self._lock:
+            start = max(self._next - self.capacity, 0)
+            return iter([self._slots[number % self.capacity] for number in range(start, self._next)])
+
+
+class WriterHandler(logging.Handler):
+    """Logging handler writing records through a shared background writer.
+
+    Records are formatted on the caller's thread, so their arguments are
+    read before the caller changes them, and written with the writer's
+    other lines.
+    """
+
+    def __init__(self, writer: JsonlWriter):
+        """Initialize the handler.
+
+        Args:
+            writer: Writer of the log file
+        """
+        super().__init__()
+        self.writer = writer
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.writer.write(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.writer.flush()
+
+
+class EventBus:
+    """Class for passing events to the subsystems that react to them.
+
+    Subscribers are called on the publisher's thread, so they must be quick
+    and hand anything slow to a queue of their own. A failing subscriber is
+    logged and does not affect the others.
+    """
+
+    def __init__(self):
+        """Initialize the bus."""
+        # Replaced rather than changed, so publishing needs no lock.
+        self._subscribers: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Dict], None], event_type: str = None):
+        """Call a function with every event, or only with events of one type."""
+        with self._lock:
+            self._subscribers[event_type] = self._subscribers.get(event_type, ()) + (callback,)
+
+    def unsubscribe(self, callback: Callable[[Dict], None], event_type: str = None):
+        """Stop calling a function subscribed with the same event type."""
+        with self._lock:
+            remaining = tuple(item for item in self._subscribers.get(event_type, ())
+                              if item != callback)
+            if remaining:
+                self._subscribers[event_type] = remaining
+            else:
+                self._subscribers.pop(event_type, None)
+
+    def publish(self, event: Dict):
+        """Pass an event to its type's subscribers and to those of every event."""
+        subscribers = self._subscribers
+        for callback in subscribers.get(event.get("type"), ()) + subscribers.get(None, ()):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Event subscriber {callback!r} failed: {e}")
+
+
+def flush_writers(timeout: float = 5.0):
+    """Write out the queued events of every writer in the process."""
+    for writer in list(_writers):
+        if not writer.flush(timeout):
+            logger.warning(f"Event log {writer.path} not flushed within {timeout}s")
+
+
+def writer_from_env(path: str, metrics=None) -> JsonlWriter:
+    """Create a writer with the EVENT_LOG_* settings from the environment."""
+    env = os.environ
+    return JsonlWriter(
+        path,
+        queue_size=int(env.get("EVENT_LOG_QUEUE_SIZE", "10000")),
+        batch_size=int(env.get("EVENT_LOG_BATCH_SIZE", "100")),
+        flush_interval=float(env.get("EVENT_LOG_FLUSH_INTERVAL", "1.0")),
+        fsync=env.get("EVENT_LOG_FSYNC", FSYNC_INTERVAL),
+        metrics=metrics,
+    )
+
+
+def get_writer(path: str) -> JsonlWriter:
+    """Get the process's writer for a file, created from the environment on first use."""
+    key = os.path.abspath(path)
+    with _shared_lock:
+        writer = _shared_writers.get(key)
+        if writer is None:
+            writer = _shared_writers[key] = writer_from_env(path)
+        return writer
+
+
+def attach_log_file(target: logging.Logger, path: str, fmt: str = LOG_FORMAT) -> WriterHandler:
+    """Send a logger's records to a file through the file's shared writer.
+
+    Each file has one handler, and a logger gets it once however often it
+    is attached, so a second monitor does not write every line twice.
+
+    Args:
+        target: Logger whose records go to the file
+        path: Log file
+        fmt: Format of the handler, set when the file's handler is created
+
+    Returns:
+        WriterHandler: The file's handler
+    """
+    writer = get_writer(path)
+    key = os.path.abspath(path)
+    with _shared_lock:
+        handler = _handlers.get(key)
+        if handler is None:
+            handler = _handlers[key] = WriterHandler(writer)
+            handler.setFormatter(logging.Formatter(fmt))
+    target.addHandler(handler)
+    return handler
+
+
+bus = EventBus()
+
+atexit.register(flush_writers, 2.0)
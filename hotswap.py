@@ -0,0 +1,193 @@
+"""
+Hot Swap Module for NOVAXA Bot
+-----------------------------
+This module switches a running bot to a new Telegram token without a restart.
+
+The switch holds update intake, lets the updates already fetched or queued
+finish on the old token, retires the old token, and re-keys the telebot
+instance in place so every handler, the router and the broadcast engine pick
+up the new token at once. Updates that arrive meanwhile wait at Telegram and
+are fetched on the new token, so none are dropped.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from metrics import metrics as default_metrics
+
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=logging.INFO,
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_DRAIN_TIMEOUT = 35.0
+
+
+class TokenSwitchError(Exception):
+    """Raised when the bot cannot be switched to a new token."""
+
+
+def bot_id_of(token: str) -> Optional[int]:
+    """Get the bot ID embedded in a token, or None if it is malformed."""
+    prefix = (token or "").split(":", 1)[0]
+    return int(prefix) if prefix.isdigit() else None
+
+
+class TokenSwitcher:
+    """Class for switching a running bot to a new token.
+
+    Only one switch runs at a time. The new token is checked with getMe
+    before anything is touched, so a bad token leaves the bot running on
+    the old one.
+    """
+
+    def __init__(self, bot, pipeline, drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+                 metrics=None, on_switch: Iterable[Callable[[str, Dict], None]] = ()):
+        """Initialize the token switcher.
+
+        Args:
+            bot: telebot.TeleBot instance to re-key
+            pipeline: UpdatePipeline feeding the bot
+            drain_timeout: Seconds to wait for in-flight updates before switching
+                anyway; should exceed the long-polling timeout
+            metrics: Metrics registry, defaults to the shared one
+            on_switch: Callables run with the old token and the new bot's
+                getMe result after a switch, while intake is still held
+        """
+        self.bot = bot
+        self.pipeline = pipeline
+        self.drain_timeout = drain_timeout
+        self.metrics = metrics or default_metrics
+        self.on_switch = list(on_switch)
+        self._lock = threading.Lock()
+
+    def switch(self, new_token: str) -> Dict:
+        """Switch the bot to a new token.
+
+        Args:
+            new_token: Telegram Bot API token to switch to
+
+        Returns:
+            dict: username, same_bot, drained and elapsed of the switch
+
+        Raises:
+            TokenSwitchError: If the new token is rejected by Telegram
+        """
+        from telebot import apihelper
+
+        with self._lock:
+            old_token = self.bot.token
+            if new_token == old_token:
+                return {"username": None, "same_bot": True, "drained": True, "elapsed": 0.0}
+
+            try:
+                info = apihelper.get_me(new_token)
+            except Exception as e:
+                self.metrics.increment("token_switch_failures")
+                raise TokenSwitchError(f"New token rejected: {e}") from e
+
+            started = time.monotonic()
+            same_bot = info.get("id") == bot_id_of(old_token)
+
+            self.pipeline.hold()
+            try:
+                drained = self.pipeline.drain(self.drain_timeout)
+                if not drained:
+                    logger.warning(f"Switching tokens with {self.pipeline.pending()} updates "
+                                   f"still in flight after {self.drain_timeout}s")
+
+                self._retire(old_token, same_bot)
+                self._prepare(new_token)
+
+                self.bot.token = new_token
+                if hasattr(self.bot, "bot_id"):
+                    self.bot.bot_id = info.get("id")
+                if hasattr(self.bot, "_user"):
+                    self.bot._user = None
+                if not same_bot:
+                    # Update IDs are per bot, so the old offset means nothing here.
+                    self.pipeline.offset = None
+
+                for callback in self.on_switch:
+                    try:
+                        callback(old_token, info)
+                    except Exception as e:
+                        logger.error(f"Error in token switch callback: {e}")
+            finally:
+                self.pipeline.release()
+
+            elapsed = time.monotonic() - started
+            self.metrics.increment("token_switches")
+            self.metrics.observe("token_switch_ms", elapsed * 1000)
+            logger.info(f"Switched to @{info.get('username')} in {elapsed:.2f}s")
+
+            return {
+                "username": info.get("username"),
+                "same_bot": same_bot,
+                "drained": drained,
+                "elapsed": round(elapsed, 2),
+            }
+
+    def switch_async(self, new_token: str,
+                     on_done: Callable[[Optional[Dict], Optional[Exception]], None] = None) -> threading.Thread:
+        """Switch tokens in a background thread.
+
+        Handlers must use this: a switch waits for in-flight updates, which
+        includes the one being handled.
+
+        Args:
+            new_token: Telegram Bot API token to switch to
+            on_done: Called with the result, or None and the error
+
+        Returns:
+            threading.Thread: The thread running the switch
+        """
+        def run():
+            try:
+                result = self.switch(new_token)
+            except Exception as e:
+                logger.error(f"Token switch failed: {e}")
+                result, error = None, e
+            else:
+                error = None
+            if on_done:
+                try:
+                    on_done(result, error)
+                except Exception as e:
+                    logger.error(f"Error reporting token switch: {e}")
+
+        thread = threading.Thread(target=run, name="novaxa-token-switch", daemon=True)
+        thread.start()
+        return thread
+
+    def _retire(self, old_token: str, same_bot: bool):
+        """Release the old token. Best effort, since it may already be revoked."""
+        from telebot import apihelper
+
+        if same_bot:
+            return
+
+        try:
+            if self.pipeline.offset:
+                # Confirm what was processed so the old bot does not replay it.
+                apihelper.get_updates(old_token, offset=self.pipeline.offset, limit=1,
+                                      timeout=10, long_polling_timeout=0)
+            if apihelper.get_webhook_info(old_token).get("url"):
+                apihelper.delete_webhook(old_token)
+                logger.info("Deleted the old bot's webhook")
+        except Exception as e:
+            logger.warning(f"Could not retire the old token: {e}")
+
+    def _prepare(self, new_token: str):
+        """Make the new token ready for polling."""
+        from telebot import apihelper
+
+        try:
+            if apihelper.get_webhook_info(new_token).get("url"):
+                apihelper.delete_webhook(new_token)
+                logger.info("Deleted the new bot's webhook so it can be polled")
+        except Exception as e:
+            logger.warning(f"Could not check the new bot's webhook: {e}")
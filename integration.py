@@ -21,12 +21,17 @@ from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from typing import Dict, List, Optional, Union, Any
 
+from dispatch import remaining_time
+from statefile import write_json
+
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     level=logging.INFO,
 )
 logger = logging.getLogger(__name__)
 
+DEFAULT_REQUEST_TIMEOUT = 10
+
 
 class ServiceIntegration:
     """Class for integrating with external services."""
@@ -67,14 +72,11 @@ class ServiceIntegration:
         try:
             config = {
                 "services": self.services,
-                "enabled_services": list(self.enabled_services),
-                "last_updated": datetime.now().isoformat(),
+                "enabled_services": sorted(self.enabled_services),
             }
             
-            with open(self.config_file, "w") as f:
-                json.dump(config, f, indent=2)
-                
-            logger.info("Services configuration saved")
+            if write_json(self.config_file, config, backups=1, stamp_field="last_updated"):
+                logger.info("Services configuration saved")
         except Exception as e:
             logger.error(f"Error saving services configuration: {e}")
     
@@ -378,9 +380,12 @@ class ServiceIntegration:
         }
     
     def http_request(self, service_id: str, method: str = "GET", endpoint: str = "",
-                   params: Dict = None, data: Dict = None, headers: Dict = None) -> Dict:
+                   params: Dict = None, data: Dict = None, headers: Dict = None,
+                   timeout: float = None) -> Dict:
         """Make an HTTP request to a service.
         
+        The request never outlives the deadline of the handler that made it.
+        
         Args:
             service_id: Unique identifier for the service
             method: HTTP method (GET, POST, PUT, DELETE)
@@ -388,6 +393,7 @@ class ServiceIntegration:
             params: Query parameters
             data: Request data
             headers: Request headers
+            timeout: Timeout in seconds, defaults to the service's "timeout"
             
         Returns:
             dict: Response from the service
@@ -421,17 +427,26 @@ class ServiceIntegration:
         if headers:
             request_headers.update(headers)
         
+        timeout = remaining_time(timeout or config.get("timeout", DEFAULT_REQUEST_TIMEOUT))
+        if timeout <= 0:
+            logger.warning(f"Skipping request to {service_id}: handler deadline exceeded")
+            return {"status": "error", "message": "Deadline exceeded"}
+        
         try:
             start_time = time.time()
             
             if method.upper() == "GET":
-                response = requests.get(url, params=params, headers=request_headers, auth=auth)
+                response = requests.get(url, params=params, headers=request_headers, auth=auth,
+                                        timeout=timeout)
             elif method.upper() == "POST":
-                response = requests.post(url, params=params, json=data, headers=request_headers, auth=auth)
+                response = requests.post(url, params=params, json=data, headers=request_headers, auth=auth,
+                                         timeout=timeout)
             elif method.upper() == "PUT":
-                response = requests.put(url, params=params, json=data, headers=request_headers, auth=auth)
+                response = requests.put(url, params=params, json=data, headers=request_headers, auth=auth,
+                                        timeout=timeout)
             elif method.upper() == "DELETE":
-                response = requests.delete(url, params=params, headers=request_headers, auth=auth)
+                response = requests.delete(url, params=params, headers=request_headers, auth=auth,
+                                           timeout=timeout)
             else:
                 return {"status": "error", "message": f"Unsupported HTTP method: {method}"}
             
@@ -548,7 +563,8 @@ class NotificationSystem:
             msg.attach(MIMEText(body, "plain"))
         
         try:
-            smtp = smtplib.SMTP(host, port)
+            smtp = smtplib.SMTP(host, port,
+                                timeout=remaining_time(config.get("timeout", DEFAULT_REQUEST_TIMEOUT)))
             smtp.ehlo()
             
             if smtp.has_extn("STARTTLS"):
@@ -0,0 +1,188 @@
+"""
+Lease Module for NOVAXA Bot
+--------------------------
+This module elects which of several processes polls a token.
+
+Telegram lets only one getUpdates call per token run at a time, so a warm
+standby process cannot poll alongside the leader. Both processes compete for
+a lease row in a shared SQLite database instead. The leader renews it with a
+heartbeat; when the heartbeat stops, because the leader crashed or hung, the
+lease expires and the standby takes it over and resumes from the persisted
+polling offset.
+"""
+
+import os
+import logging
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from metrics import metrics as default_metrics
+
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=logging.INFO,
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_TTL = 15.0
+
+LEASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires REAL NOT NULL,
+    acquired REAL NOT NULL,
+    generation INTEGER NOT NULL
+);
+"""
+
+
+class PollingLease:
+    """Class for holding a time-limited lease shared between processes.
+
+    The expiry is wall-clock time, so the competing processes must share
+    the database file and a clock, e.g. run on the same host.
+    """
+
+    def __init__(self, name: str, db_file: str = "data/polling.db",
+                 ttl: float = DEFAULT_LEASE_TTL, holder: str = None, metrics=None):
+        """Initialize the lease.
+
+        Args:
+            name: What the lease is for, e.g. the bot ID
+            db_file: Path to the SQLite database the processes share
+            ttl: Seconds a lease lasts without renewal
+            holder: Name of this process, unique by default
+            metrics: Metrics registry, defaults to the shared one
+        """
+        self.name = str(name)
+        self.db_file = db_file
+        self.ttl = ttl
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.metrics = metrics or default_metrics
+        self.generation = None
+        self._lock = threading.Lock()
+
+        if os.path.dirname(db_file):
+            os.makedirs(os.path.dirname(db_file), exist_ok=True)
+
+        # Autocommit, so each BEGIN IMMEDIATE below is the only transaction.
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None,
+                                     timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(LEASE_SCHEMA)
+
+    @property
+    def held(self) -> bool:
+        """Whether this process believes it holds the lease."""
+        return self.generation is not None
+
+    def try_acquire(self) -> bool:
+        """Take the lease if it is free, expired or already ours.
+
+        Returns:
+            bool: True if this process now holds the lease
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                row = self._conn.execute(
+                    "SELECT holder, expires, generation FROM leases WHERE name = ?", (self.name,)
+                ).fetchone()
+                if row and row[0] != self.holder and row[1] > now:
+                    self._conn.execute("COMMIT")
+                    return False
+
+                generation = (row[2] if row else 0) + (0 if row and row[0] == self.holder else 1)
+                self._conn.execute(
+                    "INSERT INTO leases (name, holder, expires, acquired, generation) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET "
+                    "holder = excluded.holder, expires = excluded.expires, "
+                    "acquired = excluded.acquired, generation = excluded.generation",
+                    (self.name, self.holder, now + self.ttl, now, generation),
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                self._rollback()
+                logger.error(f"Could not acquire lease '{self.name}': {e}")
+                return False
+
+            previous = row[0] if row else None
+            self.generation = generation
+
+        if previous != self.holder:
+            self.metrics.increment("lease_acquired")
+            logger.info(f"Acquired lease '{self.name}' (generation {generation}"
+                        f"{f', taken over from {previous}' if previous else ''})")
+        return True
+
+    def renew(self) -> bool:
+        """Extend the lease by one TTL.
+
+        Returns:
+            bool: False if the lease was lost to another process
+        """
+        with self._lock:
+            if self.generation is None:
+                return False
+            try:
+                cursor = self._conn.execute(
+                    "UPDATE leases SET expires = ? WHERE name = ? AND holder = ? AND generation = ?",
+                    (time.time() + self.ttl, self.name, self.holder, self.generation),
+                )
+            except sqlite3.Error as e:
+                # Keep the lease; it only expires if renewal keeps failing.
+                logger.error(f"Could not renew lease '{self.name}': {e}")
+                return True
+
+            if cursor.rowcount == 0:
+                self.generation = None
+                self.metrics.increment("lease_lost")
+                logger.error(f"Lost lease '{self.name}' to another process")
+                return False
+        return True
+
+    def release(self):
+        """Give up the lease, so a standby can take over at once."""
+        with self._lock:
+            if self.generation is None:
+                return
+            try:
+                self._conn.execute(
+                    "DELETE FROM leases WHERE name = ? AND holder = ? AND generation = ?",
+                    (self.name, self.holder, self.generation),
+                )
+            except sqlite3.Error as e:
+                logger.error(f"Could not release lease '{self.name}': {e}")
+            self.generation = None
+        logger.info(f"Released lease '{self.name}'")
+
+    def current(self) -> Optional[Dict]:
+        """Get who holds the lease and until when, or None if nobody does."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT holder, expires, acquired, generation FROM leases WHERE name = ?",
+                (self.name,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"holder": row[0], "expires": row[1], "acquired": row[2],
+                "generation": row[3], "expired": row[1] <= time.time()}
+
+    def _rollback(self):
+        """Roll back a failed transaction. Called with the lock held."""
+        try:
+            self._conn.execute("ROLLBACK")
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        """Release the lease and close the database."""
+        self.release()
+        with self._lock:
+            self._conn.close()
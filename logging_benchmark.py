@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+NOVAXA Logging Benchmark
+------------------------
+Measures what logging a security event costs the handler that logs it, to
+compare the shared background pipeline with the synchronous writes it
+replaced.
+
+``sync`` repeats what SecurityMonitor.log_event used to do per event: the
+JSON line appended with open/write/close, and the same event written again
+by a FileHandler on the security logger, once per monitor that had added
+one. ``shared`` logs through SecurityMonitor instances that share the
+file's writer. Both report the time per event on the caller's thread, the
+time until everything is on disk, and the lines that reached the file.
+
+Usage:
+    python logging_benchmark.py [--events 5000] [--monitors 3]
+"""
+
+import os
+import argparse
+import json
+import logging
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict
+
+from eventlog import LOG_FORMAT
+
+DETAILS = {"command": "broadcast", "chat_id": 123456789}
+
+
+def _count_lines(path: str) -> int:
+    with open(path) as f:
+        return sum(1 for _ in f)
+
+
+def run_sync(path: str, events: int, monitors: int) -> Dict:
+    """Log events the way SecurityMonitor did before the shared pipeline."""
+    target = logging.getLogger("logging_benchmark.sync")
+    target.propagate = False
+    target.setLevel(logging.INFO)
+    handlers = []
+    for _ in range(monitors):
+        # Every SecurityMonitor, including IPProtection's own, added one.
+        handler = logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        target.addHandler(handler)
+        handlers.append(handler)
+
+    started = time.perf_counter()
+    for n in range(events):
+        event = {"timestamp": datetime.now().isoformat(), "type": "unauthorized_broadcast",
+                 "details": DETAILS, "user_id": n}
+        target.info(f"Security event: unauthorized_broadcast (User: {n})")
+        with open(path, "a") as f:
+            f.write(json.dumps(event) + "\n")
+    logged = time.perf_counter()
+
+    for handler in handlers:
+        target.removeHandler(handler)
+        handler.close()
+    return {"caller": logged - started, "total": logged - started, "lines": _count_lines(path)}
+
+
+def run_shared(path: str, events: int, monitors: int) -> Dict:
+    """Log events through monitors sharing the file's background writer."""
+    from security import SecurityMonitor
+
+    # Keep the per-event summary out of the console, as the sync run does.
+    logging.getLogger("security").setLevel(logging.WARNING)
+    instances = [SecurityMonitor(path) for _ in range(monitors)]
+
+    started = time.perf_counter()
+    for n in range(events):
+        instances[n % monitors].log_event("unauthorized_broadcast", DETAILS, n)
+    logged = time.perf_counter()
+    instances[0].flush(timeout=60.0)
+    flushed = time.perf_counter()
+
+    stats = instances[0].writer.stats()
+    instances[0].close()
+    return {"caller": logged - started, "total": flushed - started,
+            "lines": _count_lines(path), "dropped": stats["dropped"]}
+
+
+def report(name: str, result: Dict, events: int):
+    """Print one run's timings."""
+    dropped = f", {result['dropped']} dropped" if result.get("dropped") else ""
+    print(f"{name:>7}: {result['caller'] / events * 1e6:8.1f} us/event on the caller, "
+          f"{result['total'] * 1000:8.1f} ms until written, "
+          f"{result['lines'] / events:.1f} lines/event{dropped}")
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Measure the cost of logging security events")
+    parser.add_argument("--events", type=int, default=5000, help="Events to log")
+    parser.add_argument("--monitors", type=int, default=3,
+                        help="Monitors logging to the same file, e.g. engine and IP protection")
+    args = parser.parse_args()
+
+    print(f"{args.events} events, {args.monitors} monitors, "
+          f"fsync={os.environ.get('EVENT_LOG_FSYNC', 'interval')}")
+    with tempfile.TemporaryDirectory() as workdir:
+        report("sync", run_sync(os.path.join(workdir, "sync.log"), args.events, args.monitors),
+               args.events)
+        report("shared", run_shared(os.path.join(workdir, "shared.log"), args.events,
+                                    args.monitors), args.events)
+
+
+if __name__ == "__main__":
+    main()
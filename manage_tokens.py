@@ -42,6 +42,12 @@ def setup_parser():
     
     active_parser = subparsers.add_parser("active", help="Show active token")
     
+    validate_parser = subparsers.add_parser("validate", help="Check all active tokens with Telegram")
+    validate_parser.add_argument("--workers", "-w", help="Tokens checked at once", type=int, default=8)
+    validate_parser.add_argument("--timeout", "-t", help="Seconds per token", type=float, default=10.0)
+    validate_parser.add_argument("--keep", help="Report dead tokens without deactivating them",
+                                 action="store_true")
+    
     return parser
 
 def get_master_key():
@@ -163,6 +169,27 @@ def main():
                 })
             else:
                 format_output("Error", "No active token information available.", True)
+        
+        elif args.command == "validate":
+            results = token_manager.validate_all(max_workers=args.workers, timeout=args.timeout,
+                                                 deactivate=not args.keep)
+            
+            if not results:
+                format_output("Validation", "No active tokens to check.")
+                return
+            
+            rows = []
+            for token_id, result in results.items():
+                if result["valid"]:
+                    rows.append(f"{token_id:<18} OK    @{result.get('username')}")
+                elif result["valid"] is False:
+                    action = "kept" if args.keep else "deactivated"
+                    rows.append(f"{token_id:<18} DEAD  {result['error']} ({action})")
+                else:
+                    rows.append(f"{token_id:<18} ?     {result['error']}")
+            
+            dead = sum(1 for result in results.values() if result["valid"] is False)
+            format_output("Validation", rows, is_error=bool(dead))
     
     except Exception as e:
         format_output("Error", f"An error occurred: {str(e)}", True)
@@ -0,0 +1,157 @@
+"""
+Metrics Module for NOVAXA Bot
+----------------------------
+This module provides a small, thread-safe metrics registry that the
+dispatch, scheduling and broadcast subsystems share.
+
+Counters, gauges and timings are keyed by name plus an optional set of
+labels, so one registry can serve every bot running in the process.
+"""
+
+import os
+import json
+import threading
+from collections import deque
+from typing import Dict, Tuple
+
+
+def _key(name: str, labels: Dict = None) -> Tuple:
+    """Build a hashable registry key from a metric name and labels."""
+    if not labels:
+        return (name,)
+    return (name,) + tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def _format_key(key: Tuple) -> str:
+    """Render a registry key as ``name{label=value,...}``."""
+    name, labels = key[0], key[1:]
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters, gauges and timing samples."""
+
+    def __init__(self, max_samples: int = 1000):
+        """Initialize the metrics registry.
+
+        Args:
+            max_samples: Number of samples kept per timing series
+        """
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._timings = {}
+
+    def increment(self, name: str, labels: Dict = None, value: int = 1):
+        """Increment a counter."""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Dict = None):
+        """Set a gauge to the given value."""
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, labels: Dict = None):
+        """Record a timing or size sample."""
+        key = _key(name, labels)
+        with self._lock:
+            series = self._timings.get(key)
+            if series is None:
+                series = self._timings[key] = deque(maxlen=self.max_samples)
+            series.append(value)
+
+    def get_counter(self, name: str, labels: Dict = None) -> int:
+        """Get the current value of a counter."""
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0)
+
+    def get_gauge(self, name: str, labels: Dict = None) -> float:
+        """Get the current value of a gauge."""
+        with self._lock:
+            return self._gauges.get(_key(name, labels))
+
+    def snapshot(self) -> Dict:
+        """Get a point-in-time copy of all metrics.
+
+        Returns:
+            dict: Counters, gauges and timing summaries keyed by metric name
+        """
+        with self._lock:
+            counters = {_format_key(k): v for k, v in self._counters.items()}
+            gauges = {_format_key(k): v for k, v in self._gauges.items()}
+            timings = {}
+            for key, series in self._timings.items():
+                values = list(series)
+                timings[_format_key(key)] = {
+                    "count": len(values),
+                    "avg": round(sum(values) / len(values), 2) if values else 0,
+                    "max": round(max(values), 2) if values else 0,
+                }
+
+        return {"counters": counters, "gauges": gauges, "timings": timings}
+
+    def dump(self, path: str):
+        """Write a snapshot to a JSON file, replacing it atomically."""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        """Clear all metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+
+    def labelled(self, **labels) -> "LabelledMetrics":
+        """Get a view of this registry that adds labels to every metric."""
+        return LabelledMetrics(self, labels)
+
+
+class LabelledMetrics:
+    """View of a MetricsRegistry that adds fixed labels, e.g. the bot a metric belongs to."""
+
+    def __init__(self, registry: MetricsRegistry, labels: Dict):
+        """Initialize the view.
+
+        Args:
+            registry: Registry the metrics are recorded in
+            labels: Labels added to every metric
+        """
+        self.registry = registry
+        self.labels = dict(labels)
+
+    def _merge(self, labels: Dict = None) -> Dict:
+        """Combine the fixed labels with per-call ones."""
+        return {**self.labels, **(labels or {})}
+
+    def increment(self, name: str, labels: Dict = None, value: int = 1):
+        """Increment a counter."""
+        self.registry.increment(name, self._merge(labels), value)
+
+    def set_gauge(self, name: str, value: float, labels: Dict = None):
+        """Set a gauge to the given value."""
+        self.registry.set_gauge(name, value, self._merge(labels))
+
+    def observe(self, name: str, value: float, labels: Dict = None):
+        """Record a timing or size sample."""
+        self.registry.observe(name, value, self._merge(labels))
+
+    def get_counter(self, name: str, labels: Dict = None) -> int:
+        """Get the current value of a counter."""
+        return self.registry.get_counter(name, self._merge(labels))
+
+    def get_gauge(self, name: str, labels: Dict = None) -> float:
+        """Get the current value of a gauge."""
+        return self.registry.get_gauge(name, self._merge(labels))
+
+
+metrics = MetricsRegistry()
@@ -11,12 +11,14 @@ import sys
 import logging
 import json
 import time
-import threading
 import psutil
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Union, Any
 from collections import deque
 
+from eventlog import attach_log_file
+from scheduler import get_scheduler
+
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     level=logging.INFO,
@@ -27,8 +29,16 @@ logger = logging.getLogger(__name__)
 class SystemMonitor:
     """Class for monitoring system resources and bot activities."""
     
-    def __init__(self, log_file: str = "logs/system.log", max_logs: int = 1000):
-        """Initialize the system monitor."""
+    def __init__(self, log_file: str = "logs/system.log", max_logs: int = 1000,
+                 sample_interval: float = 60, scheduler=None):
+        """Initialize the system monitor.
+
+        Args:
+            log_file: Path to the log file
+            max_logs: Number of log records kept in memory
+            sample_interval: Seconds between resource samples, 0 to disable
+            scheduler: Job scheduler to sample on, defaults to the shared one
+        """
         self.start_time = datetime.now()
         self.log_file = log_file
         self.max_logs = max_logs
@@ -42,38 +52,40 @@ class SystemMonitor:
             "debug": os.environ.get("DEBUG", "false").lower() == "true",
         }
         
-        os.makedirs(os.path.dirname(log_file), exist_ok=True)
-        
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
-        logger.addHandler(file_handler)
+        # One handler per file however many monitors there are; the file is
+        # written in the background and only created by the first record.
+        attach_log_file(logger, log_file)
         
-        self.monitoring_active = True
-        self.monitor_thread = threading.Thread(target=self._monitor_resources)
-        self.monitor_thread.daemon = True
-        self.monitor_thread.start()
+        self.monitoring_active = bool(sample_interval)
+        self.scheduler = None
+        self.job_name = "system_monitor"
+        self.job = None
+        if self.monitoring_active:
+            # Prime the CPU counter so the first sample covers a full interval.
+            psutil.cpu_percent(interval=None)
+            if scheduler is None:
+                scheduler = get_scheduler()
+            self.scheduler = scheduler
+            # Sampling an idle bot only drains the battery; let idle mode pause it.
+            self.job = self.scheduler.add_job(self.job_name, self._sample_resources,
+                                              sample_interval,
+                                              jitter=min(5.0, sample_interval * 0.1),
+                                              essential=False)
         
         logger.info("System monitor initialized")
     
-    def _monitor_resources(self):
-        """Monitor system resources in background thread."""
-        while self.monitoring_active:
-            try:
-                stats = {
-                    "timestamp": datetime.now().isoformat(),
-                    "cpu_percent": psutil.cpu_percent(interval=1),
-                    "memory_percent": psutil.virtual_memory().percent,
-                    "disk_percent": psutil.disk_usage("/").percent,
-                }
-                
-                self.log_info(f"System stats: CPU={stats['cpu_percent']}%, "
-                             f"Memory={stats['memory_percent']}%, "
-                             f"Disk={stats['disk_percent']}%")
-                
-                time.sleep(60)
-            except Exception as e:
-                logger.error(f"Error monitoring resources: {e}")
-                time.sleep(60)
+    def _sample_resources(self):
+        """Take one resource sample. Runs on the job scheduler."""
+        stats = {
+            "timestamp": datetime.now().isoformat(),
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "memory_percent": psutil.virtual_memory().percent,
+            "disk_percent": psutil.disk_usage("/").percent,
+        }
+        
+        self.log_info(f"System stats: CPU={stats['cpu_percent']}%, "
+                     f"Memory={stats['memory_percent']}%, "
+                     f"Disk={stats['disk_percent']}%")
     
     def log_activity(self, user_id: int, activity: str, details: Dict = None):
         """Log user activity."""
@@ -204,10 +216,10 @@ class SystemMonitor:
         return self.settings["maintenance_mode"]
     
     def stop(self):
-        """Stop the monitoring thread."""
+        """Stop sampling resources."""
         self.monitoring_active = False
-        if self.monitor_thread.is_alive():
-            self.monitor_thread.join(timeout=1)
+        if self.scheduler:
+            self.scheduler.remove_job(self.job_name, self.job)
         logger.info("System monitor stopped")
 
 
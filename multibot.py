@@ -0,0 +1,454 @@
+"""
+Multi-Bot Module for NOVAXA Bot
+------------------------------
+This module serves every active token in the TokenManager from one process.
+
+Each bot gets its own telebot instance, command router, update pipeline and
+handler state, so one bot's handlers or backlog never affect another. The
+HTTP connection pool, job scheduler and metrics registry are shared, and
+metrics carry a ``bot`` label. Updates arrive either by long polling, one
+polling loop per bot, or through a single webhook endpoint that routes
+``/webhook/<token_id>`` to the right bot.
+"""
+
+import os
+import sys
+import atexit
+import hmac
+import logging
+import signal
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from dispatch import CommandRouter, IgnorePolicy, OffsetStore, UpdatePipeline, allowed_updates_for
+from hotswap import bot_id_of
+from engine.transports import webhook_secret
+from metrics import metrics as default_metrics
+from scheduler import get_scheduler
+
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=logging.INFO,
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 20
+RECONCILE_INTERVAL = 60.0
+
+
+def share_http_pool(pool_size: int = DEFAULT_POOL_SIZE):
+    """Make every telebot API call in the process use one connection pool.
+
+    Args:
+        pool_size: Maximum connections kept open to the Bot API
+
+    Returns:
+        requests.Session: The shared session
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from telebot import apihelper
+
+    if apihelper.session is None:
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=pool_size))
+        apihelper.session = session
+    return apihelper.session
+
+
+class BotInstance:
+    """One bot served by the runner, with its own handlers, queues and state."""
+
+    def __init__(self, token_id: str, token: str, privileged_ids: Iterable[int] = (),
+                 router_workers: int = 4, update_workers: int = 2, max_pending: int = 500,
+                 deadlines: Dict[str, float] = None, default_deadline: float = 10.0,
+                 ignore_policy: IgnorePolicy = None, metrics=None, blocklist=None):
+        """Initialize the bot instance.
+
+        Args:
+            token_id: TokenManager ID of the token
+            token: Telegram Bot API token
+            privileged_ids: User IDs whose updates use the priority lane
+            router_workers: Size of the pool handlers run on
+            update_workers: Number of threads processing updates
+            max_pending: Maximum number of queued non-priority updates
+            deadlines: Deadline in seconds per command name
+            default_deadline: Deadline for commands without their own
+            ignore_policy: Updates dropped before they are queued
+            metrics: Metrics registry, defaults to the shared one
+            blocklist: Banned users whose updates are dropped first, e.g.
+                the abuse.AbuseDetector every bot shares
+        """
+        import telebot
+
+        self.token_id = token_id
+        self.token = token
+        self.started = datetime.now()
+        self.metrics = (metrics or default_metrics).labelled(bot=token_id)
+        self.bot = telebot.TeleBot(token, threaded=False)
+        self.router = CommandRouter(self.bot, deadlines=deadlines,
+                                    default_deadline=default_deadline,
+                                    max_workers=router_workers, metrics=self.metrics)
+        self.pipeline = UpdatePipeline(self.bot, privileged_ids=privileged_ids,
+                                       max_pending=max_pending, workers=update_workers,
+                                       ignore_policy=ignore_policy, metrics=self.metrics,
+                                       blocklist=blocklist)
+        self.state = {}
+        self.thread = None
+
+    def start_polling(self):
+        """Start this bot's polling loop in a background thread."""
+        from telebot import apihelper
+
+        try:
+            apihelper.delete_webhook(self.token)
+        except Exception as e:
+            logger.warning(f"Could not delete webhook for bot {self.token_id}: {e}")
+
+        self.thread = threading.Thread(target=self.pipeline.run_polling,
+                                       name=f"novaxa-poll-{self.token_id}", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0) -> Dict:
+        """Stop intake and processing for this bot once its queue drains.
+
+        The polling thread exits when its current getUpdates call returns.
+
+        Returns:
+            dict: The pipeline's shutdown report
+        """
+        report = self.pipeline.shutdown(timeout=timeout)
+        self.router.shutdown()
+        if not report["drained"]:
+            logger.warning(f"Bot {self.token_id} left {len(report['abandoned'])} queued updates "
+                           f"for the next start, {report['in_flight']} still running")
+        return report
+
+
+class MultiBotRunner:
+    """Class for running every active TokenManager token in one process."""
+
+    def __init__(self, token_manager, setup: Callable[[BotInstance], None],
+                 privileged_ids: Iterable[int] = (), config=None, metrics=None, scheduler=None,
+                 pool_size: int = DEFAULT_POOL_SIZE, offsets=None, metrics_file: str = None,
+                 **instance_options):
+        """Initialize the runner.
+
+        Args:
+            token_manager: security.TokenManager holding the tokens
+            setup: Registers handlers on a new BotInstance
+            privileged_ids: User IDs whose updates use the priority lane
+            config: engine.EngineConfig supplying every bot's deadlines,
+                queue limits and ignore policy
+            metrics: Metrics registry, defaults to the shared one
+            scheduler: Job scheduler, defaults to the shared one
+            pool_size: Maximum connections kept open to the Bot API
+            offsets: dispatch.OffsetStore each bot resumes from and persists to
+            metrics_file: File the metrics are written to on shutdown
+            **instance_options: Passed on to every BotInstance
+        """
+        self.token_manager = token_manager
+        self.setup = setup
+        self.privileged_ids = [uid for uid in privileged_ids if uid]
+        self.metrics = metrics or default_metrics
+        self.scheduler = scheduler
+        self.pool_size = pool_size
+        self.offsets = offsets
+        self.metrics_file = metrics_file
+        self.instance_options = {}
+        if config is not None:
+            self.instance_options.update(
+                deadlines=config.handler_deadlines,
+                default_deadline=config.default_deadline,
+                update_workers=config.update_workers,
+                max_pending=config.update_queue_size,
+                ignore_policy=IgnorePolicy.from_spec(config.ignore_updates),
+            )
+        self.instance_options.update(instance_options)
+        self.bots = {}
+        self.mode = None
+        self.base_url = None
+        self._lock = threading.Lock()
+
+    def _active_tokens(self) -> Dict[str, str]:
+        """Get the active tokens keyed by token ID, one ID per distinct token.
+
+        Reads without stamping last_used, so a reconcile never rewrites the
+        token file.
+        """
+        tokens = {}
+        seen = set()
+        for info in self.token_manager.get_tokens():
+            if info["status"] != "active":
+                continue
+            token = self.token_manager.get_token(info["id"], touch=False)
+            if token and token not in seen:
+                seen.add(token)
+                tokens[info["id"]] = token
+        return tokens
+
+    def reconcile(self) -> Dict[str, List[str]]:
+        """Start bots for new active tokens and stop bots whose token went away.
+
+        Returns:
+            dict: Token IDs started and stopped
+        """
+        tokens = self._active_tokens()
+        started, stopped = [], []
+
+        with self._lock:
+            for token_id, instance in list(self.bots.items()):
+                if tokens.get(token_id) != instance.token:
+                    self._retire(instance)
+                    del self.bots[token_id]
+                    stopped.append(token_id)
+
+            for token_id, token in tokens.items():
+                if token_id in self.bots:
+                    continue
+                instance = BotInstance(token_id, token, privileged_ids=self.privileged_ids,
+                                       metrics=self.metrics, **self.instance_options)
+                self.setup(instance)
+                self.bots[token_id] = instance
+                self._launch(instance)
+                started.append(token_id)
+
+            self.metrics.set_gauge("bots_running", len(self.bots))
+
+        if started or stopped:
+            logger.info(f"Bots started: {started or '-'}, stopped: {stopped or '-'}")
+        return {"started": started, "stopped": stopped}
+
+    def _retire(self, instance: BotInstance, timeout: float = 5.0) -> Dict:
+        """Stop a bot and persist what the next process needs to resume it."""
+        report = instance.stop(timeout=timeout)
+        if self.offsets:
+            self.offsets.persist(bot_id_of(instance.token), report)
+        return report
+
+    def _launch(self, instance: BotInstance):
+        """Start feeding updates to a bot in the current mode."""
+        if self.offsets:
+            self.offsets.restore(bot_id_of(instance.token), instance.pipeline)
+        if self.mode == "polling":
+            instance.start_polling()
+        elif self.mode == "webhook":
+            instance.pipeline.start()
+            self._set_webhook(instance)
+
+    def _set_webhook(self, instance: BotInstance):
+        """Point a bot's webhook at this process."""
+        from telebot import apihelper
+
+        if not self.base_url:
+            return
+        try:
+            apihelper.set_webhook(instance.token,
+                                  url=f"{self.base_url}/webhook/{instance.token_id}",
+                                  secret_token=webhook_secret(instance.token),
+                                  allowed_updates=allowed_updates_for(
+                                      instance.bot, instance.pipeline.ignore_policy))
+        except Exception as e:
+            logger.error(f"Could not set webhook for bot {instance.token_id}: {e}")
+
+    def start(self, mode: str = "polling", base_url: str = None,
+              reconcile_interval: float = RECONCILE_INTERVAL):
+        """Start serving every active token.
+
+        Args:
+            mode: "polling" or "webhook"
+            base_url: Public URL the webhook endpoint is reachable at
+            reconcile_interval: Seconds between checks for added or removed tokens
+        """
+        share_http_pool(self.pool_size)
+        self.mode = mode
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.reconcile()
+
+        scheduler = self.scheduler or get_scheduler()
+        scheduler.add_job("multibot_reconcile", self.reconcile, reconcile_interval, jitter=5.0)
+
+    def stop(self, timeout: float = 25.0) -> Dict[str, Dict]:
+        """Stop every bot without losing work.
+
+        Intake stops for all bots at once, then each bot drains within what
+        is left of the timeout. Offsets, unhandled updates and token usage
+        stamps are persisted, and metrics and logs are flushed.
+
+        Args:
+            timeout: Seconds the whole shutdown may take
+
+        Returns:
+            dict: Shutdown report of each bot by token ID
+        """
+        from engine.core import flush_logs
+
+        deadline = time.monotonic() + timeout
+        (self.scheduler or get_scheduler()).remove_job("multibot_reconcile")
+        with self._lock:
+            for instance in self.bots.values():
+                instance.pipeline.close_intake()
+            reports = {
+                token_id: self._retire(instance, timeout=max(0.5, deadline - time.monotonic()))
+                for token_id, instance in self.bots.items()
+            }
+            self.bots.clear()
+            self.metrics.set_gauge("bots_running", 0)
+
+        abandoned = sum(len(report["abandoned"]) for report in reports.values())
+        logger.info(f"Stopped {len(reports)} bots; {abandoned} queued updates kept for the next start")
+
+        self.token_manager.flush()
+
+        if self.metrics_file:
+            try:
+                self.metrics.dump(self.metrics_file)
+            except Exception as e:
+                logger.error(f"Could not write metrics: {e}")
+        flush_logs()
+        return reports
+
+    def handle_webhook(self, token_id: str, secret: Optional[str], payload: Dict) -> int:
+        """Route one webhook request to its bot.
+
+        Args:
+            token_id: Token ID from the URL
+            secret: X-Telegram-Bot-Api-Secret-Token header
+            payload: Update as decoded from the request body
+
+        Returns:
+            int: HTTP status code for the response
+        """
+        instance = self.bots.get(token_id)
+        if instance is None:
+            return 404
+        if instance.pipeline.closing or instance.pipeline.held:
+            return 503
+        if not secret or not hmac.compare_digest(secret, webhook_secret(instance.token)):
+            instance.metrics.increment("webhook_rejected")
+            return 403
+        if not isinstance(payload, dict) or "update_id" not in payload:
+            return 400
+
+        instance.pipeline.submit(payload)
+        return 200
+
+    def create_app(self):
+        """Create the Flask app serving ``/webhook/<token_id>`` for every bot."""
+        from flask import Flask, jsonify, request
+
+        app = Flask(__name__)
+
+        @app.route("/webhook/<token_id>", methods=["POST"])
+        def webhook(token_id):
+            status = self.handle_webhook(
+                token_id,
+                request.headers.get("X-Telegram-Bot-Api-Secret-Token"),
+                request.get_json(silent=True),
+            )
+            return "", status
+
+        @app.route("/")
+        def index():
+            return jsonify({"bots": sorted(self.bots), "metrics": self.metrics.snapshot()})
+
+        return app
+
+
+def engine_setup(config, token_manager=None, security_monitor=None,
+                 ip_protection=None) -> Callable[[BotInstance], None]:
+    """Get a setup that gives each bot the shared engine handlers.
+
+    Args:
+        config: engine.EngineConfig whose features every bot gets
+        token_manager: security.TokenManager, for token features
+        security_monitor: security.SecurityMonitor receiving audit events
+        ip_protection: security.IPProtection verifying the owner
+
+    Returns:
+        Callable: Setup to pass to MultiBotRunner
+    """
+    from engine.context import BotContext
+    from engine.core import load_handlers
+    from engine.registry import registry
+
+    load_handlers()
+
+    def setup(instance: BotInstance):
+        ctx = BotContext(config, instance.bot, instance.router, instance.pipeline,
+                         token_manager=token_manager, security_monitor=security_monitor,
+                         ip_protection=ip_protection, state=instance.state)
+        ctx.started = instance.started
+        registry.apply(ctx, config.features)
+
+    return setup
+
+
+def main():
+    """Serve every active token until interrupted."""
+    from dotenv import load_dotenv
+    from engine.config import EngineConfig
+    from security import IPProtection, TokenManager, get_security_monitor
+
+    if os.path.exists(".env"):
+        load_dotenv()
+
+    config = EngineConfig.from_env("multibot")
+    token_manager = TokenManager()
+    security_monitor = get_security_monitor()
+    setup = engine_setup(config, token_manager, security_monitor,
+                         IPProtection(config.owner_id, security_monitor))
+
+    abuse = None
+    if config.abuse_threshold:
+        from abuse import AbuseDetector
+
+        def notify_owner(text: str):
+            # Any running bot can reach the owner; the first one does.
+            for instance in list(runner.bots.values()):
+                instance.bot.send_message(config.owner_id, text)
+                return
+
+        # One detector for every bot, so a user banned by one is banned by all.
+        abuse = AbuseDetector(threshold=config.abuse_threshold, window=config.abuse_window,
+                              ban_duration=config.abuse_ban,
+                              exempt_ids=[config.owner_id] + config.admin_ids,
+                              notify=notify_owner if config.owner_id else None,
+                              security_monitor=security_monitor)
+        abuse.attach(security_monitor.bus)
+        get_scheduler().add_job("abuse_digest", abuse.send_digest,
+                                config.abuse_digest_interval, essential=False)
+
+    runner = MultiBotRunner(token_manager, setup,
+                            privileged_ids=[config.owner_id] + config.admin_ids, config=config,
+                            offsets=OffsetStore(os.path.join(config.data_dir, "polling.db")),
+                            metrics_file=config.metrics_file, blocklist=abuse)
+
+    webhook_url = os.environ.get("MULTIBOT_WEBHOOK_URL")
+    if webhook_url:
+        runner.start(mode="webhook", base_url=webhook_url)
+        atexit.register(runner.stop, config.shutdown_timeout)
+        runner.create_app().run(host="0.0.0.0", port=int(os.environ.get("PORT", "8443")))
+        return
+
+    runner.start(mode="polling")
+    if not runner.bots:
+        logger.error("No active tokens to serve")
+        sys.exit(1)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda sig, frame: stop.set())
+    signal.signal(signal.SIGTERM, lambda sig, frame: stop.set())
+    stop.wait()
+
+    logger.info("Shutting down...")
+    runner.stop(timeout=config.shutdown_timeout)
+    if abuse:
+        abuse.send_digest()
+    get_scheduler().stop()
+
+
+if __name__ == "__main__":
+    main()
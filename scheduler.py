@@ -0,0 +1,675 @@
+"""
+Scheduler Module for NOVAXA Bot
+------------------------------
+This module provides the bot's timers: a periodic job scheduler for
+background work and a reminder scheduler that fires user reminders at their
+due time.
+
+Periodic jobs (resource sampling, health checks, cleanup) register with one
+process-wide JobScheduler instead of running their own sleeping threads.
+
+Reminders are stored in SQLite, indexed by due time, and the ones due soonest
+are kept in an in-memory min-heap. A single thread sleeps until the head of
+the heap is due, so the process never runs a thread per reminder and the
+number of pending reminders is bounded by disk, not memory.
+"""
+
+import os
+import re
+import heapq
+import logging
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+from metrics import metrics as default_metrics
+
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=logging.INFO,
+)
+logger = logging.getLogger(__name__)
+
+REMINDER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reminders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    user_id INTEGER,
+    text TEXT NOT NULL,
+    due_at REAL NOT NULL,
+    created TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_reminders_due ON reminders (due_at, id);
+CREATE INDEX IF NOT EXISTS idx_reminders_user ON reminders (user_id, due_at);
+"""
+
+REMINDER_COLUMNS = ("id", "chat_id", "user_id", "text", "due_at", "created")
+
+_RELATIVE = re.compile(r"^(\d+)\s*([smhd])$")
+_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+
+def parse_when(spec: str, now: datetime = None) -> Optional[datetime]:
+    """Parse a reminder time.
+
+    Accepts a clock time (``15:00``, the next occurrence of it) or a delay
+    (``30s``, ``10m``, ``2h``, ``1d``).
+
+    Args:
+        spec: Time specification
+        now: Reference time, defaults to the current local time
+
+    Returns:
+        datetime: When the reminder is due, or None if the spec is invalid
+    """
+    now = now or datetime.now()
+    spec = spec.strip().lower()
+
+    match = _RELATIVE.match(spec)
+    if match:
+        return now + timedelta(**{_UNITS[match.group(2)]: int(match.group(1))})
+
+    try:
+        clock = datetime.strptime(spec, "%H:%M")
+    except ValueError:
+        return None
+
+    due = now.replace(hour=clock.hour, minute=clock.minute, second=0, microsecond=0)
+    if due <= now:
+        due += timedelta(days=1)
+    return due
+
+
+class PeriodicJob:
+    """A function run by the JobScheduler at a fixed interval."""
+
+    def __init__(self, name: str, func: Callable[[], None], interval: float, jitter: float = 0.0,
+                 essential: bool = True, idle_interval: float = None):
+        """Initialize the job.
+
+        Args:
+            name: Unique job name, used for metrics
+            func: Function to run
+            interval: Seconds between runs
+            jitter: Up to this many seconds are added to each delay at random
+            essential: False if the job may be suspended while the bot is idle
+            idle_interval: Seconds between runs while the bot is idle
+        """
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.essential = essential
+        self.idle_interval = idle_interval
+        self.suspended = False
+        self.next_run = None
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.overlaps = 0
+        self.last_run = None
+        self.last_duration = None
+
+    def delay(self, idle: bool = False) -> float:
+        """Get the delay before the next run, including jitter."""
+        interval = self.idle_interval if idle and self.idle_interval else self.interval
+        return interval + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def to_dict(self) -> Dict:
+        """Get the job's state and run-time statistics."""
+        return {
+            "name": self.name,
+            "interval": self.interval,
+            "essential": self.essential,
+            "suspended": self.suspended,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "overlaps": self.overlaps,
+            "last_run": datetime.fromtimestamp(self.last_run).isoformat() if self.last_run else None,
+            "last_duration_ms": round(self.last_duration * 1000, 2) if self.last_duration is not None else None,
+            "next_run": datetime.fromtimestamp(self.next_run).isoformat() if self.next_run else None,
+        }
+
+
+class JobScheduler:
+    """Class for running periodic jobs from a single timer thread.
+
+    Due jobs are handed to a small worker pool so a slow job never delays
+    the others. A job whose previous run is still in progress is skipped
+    for that tick rather than run twice concurrently.
+    """
+
+    def __init__(self, workers: int = 2, metrics=None):
+        """Initialize the job scheduler.
+
+        Args:
+            workers: Number of threads jobs run on
+            metrics: Metrics registry, defaults to the shared one
+        """
+        self.workers = workers
+        self.metrics = metrics or default_metrics
+        self._jobs = {}
+        self._heap = []
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._executor = None
+        self._thread = None
+        self.running = False
+        self.idle = False
+
+    def add_job(self, name: str, func: Callable[[], None], interval: float, jitter: float = 0.0,
+                initial_delay: float = None, essential: bool = True,
+                idle_interval: float = None) -> PeriodicJob:
+        """Register a periodic job, replacing any job with the same name.
+
+        Args:
+            name: Unique job name
+            func: Function to run
+            interval: Seconds between runs
+            jitter: Up to this many seconds are added to each delay at random
+            initial_delay: Seconds before the first run, defaults to one delay
+            essential: False if the job may be suspended while the bot is idle
+            idle_interval: Seconds between runs while the bot is idle
+
+        Returns:
+            PeriodicJob: The registered job
+        """
+        job = PeriodicJob(name, func, interval, jitter, essential, idle_interval)
+        delay = job.delay() if initial_delay is None else initial_delay
+
+        with self._condition:
+            self._jobs[name] = job
+            if self.idle and not essential:
+                job.suspended = True
+            else:
+                self._push(job, time.time() + delay)
+                self._condition.notify()
+
+        logger.info(f"Periodic job '{name}' registered every {interval}s")
+        return job
+
+    def remove_job(self, name: str, job: PeriodicJob = None) -> bool:
+        """Unregister a job. A run already in progress is allowed to finish.
+
+        Args:
+            name: Job name
+            job: If given, only remove the job if it is still this one and
+                was not replaced by a later ``add_job`` under the same name
+        """
+        with self._condition:
+            if job is not None and self._jobs.get(name) is not job:
+                return False
+            return self._jobs.pop(name, None) is not None
+
+    def set_idle(self, idle: bool) -> List[str]:
+        """Enter or leave idle mode.
+
+        While idle, non-essential jobs are dropped from the timer, so they
+        cause no wakeups at all, and jobs with an idle interval run at that
+        slower pace. Leaving idle mode puts both back on their normal pace.
+
+        Args:
+            idle: Whether the bot is idle
+
+        Returns:
+            list: Names of the jobs affected
+        """
+        with self._condition:
+            if idle == self.idle:
+                return []
+            self.idle = idle
+            now = time.time()
+            names = []
+            for job in self._jobs.values():
+                if not job.essential:
+                    job.suspended = idle
+                    if idle:
+                        job.next_run = None
+                    else:
+                        self._push(job, now + job.delay())
+                    names.append(job.name)
+                elif job.idle_interval:
+                    names.append(job.name)
+                    when = now + job.delay()
+                    if not idle and job.next_run and when < job.next_run:
+                        # Do not let the slow idle pace delay the next run.
+                        self._push(job, when)
+
+            # Drop suspended runs and the stale entries of rescheduled jobs.
+            self._heap = [entry for entry in self._heap
+                          if not entry[2].suspended and entry[0] == entry[2].next_run]
+            heapq.heapify(self._heap)
+            self._condition.notify()
+
+        logger.info(f"Scheduler {'idle' if idle else 'active'}; adjusted jobs: {', '.join(names) or '-'}")
+        return names
+
+    def get_jobs(self) -> List[Dict]:
+        """Get the state and statistics of every registered job."""
+        with self._condition:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def _push(self, job: PeriodicJob, when: float):
+        """Schedule a job's next run. Caller holds the condition."""
+        job.next_run = when
+        self._sequence += 1
+        heapq.heappush(self._heap, (when, self._sequence, job))
+
+    def _run(self):
+        """Timer thread: hand due jobs to the worker pool."""
+        with self._condition:
+            while self.running:
+                now = time.time()
+                if not self._heap or self._heap[0][0] > now:
+                    self._condition.wait(self._heap[0][0] - now if self._heap else None)
+                    continue
+
+                when, _, job = heapq.heappop(self._heap)
+                if self._jobs.get(job.name) is not job or job.suspended or when != job.next_run:
+                    continue
+
+                if job.running:
+                    job.overlaps += 1
+                    self.metrics.increment("job_overlaps", {"job": job.name})
+                    logger.warning(f"Periodic job '{job.name}' still running, skipping this run")
+                else:
+                    job.running = True
+                    future = self._executor.submit(self._execute, job)
+                    future.add_done_callback(partial(self._reset_cancelled, job))
+
+                # Stay on the original cadence unless we have fallen behind it.
+                delay = job.delay(self.idle)
+                self._push(job, max(when + delay, now + delay * 0.5))
+
+    @staticmethod
+    def _reset_cancelled(job: PeriodicJob, future):
+        """Clear the running flag of a run cancelled before it started."""
+        if future.cancelled():
+            job.running = False
+
+    def _execute(self, job: PeriodicJob):
+        """Run one job and record its run time."""
+        started = time.time()
+        try:
+            job.func()
+        except Exception as e:
+            job.failures += 1
+            self.metrics.increment("job_failures", {"job": job.name})
+            logger.error(f"Periodic job '{job.name}' failed: {e}")
+        finally:
+            job.last_run = started
+            job.last_duration = time.time() - started
+            job.runs += 1
+            job.running = False
+            self.metrics.increment("job_runs", {"job": job.name})
+            self.metrics.observe("job_run_ms", job.last_duration * 1000, {"job": job.name})
+
+    def start(self):
+        """Start the timer thread."""
+        with self._condition:
+            if self.running:
+                return
+            self.running = True
+            self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix="novaxa-job")
+            self._thread = threading.Thread(target=self._run, name="novaxa-scheduler", daemon=True)
+            self._thread.start()
+        logger.info("Job scheduler started")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the timer thread and wait for running jobs to finish."""
+        with self._condition:
+            if not self.running:
+                return
+            self.running = False
+            self._condition.notify_all()
+
+        self._thread.join(timeout=timeout)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+        deadline = time.time() + timeout
+        while any(job.running for job in list(self._jobs.values())) and time.time() < deadline:
+            time.sleep(0.05)
+
+        self._thread = None
+        self._executor = None
+        logger.info("Job scheduler stopped")
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> JobScheduler:
+    """Get the process-wide job scheduler, starting it on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = JobScheduler()
+        if not _scheduler.running:
+            _scheduler.start()
+        return _scheduler
+
+
+class ReminderScheduler:
+    """Class for persisting reminders and firing them when they are due.
+
+    Only the reminders up to a loaded watermark are held in the heap. When
+    the heap runs dry the next batch is read from the due-time index, so the
+    head of the heap is always the earliest pending reminder.
+    """
+
+    def __init__(self, deliver: Callable[[Dict], None], db_file: str = "data/reminders.db",
+                 batch_size: int = 1000, max_sleep: float = 60.0, max_attempts: int = 5,
+                 retry_delay: float = 30.0, metrics=None):
+        """Initialize the reminder scheduler.
+
+        Args:
+            deliver: Called with the reminder dict when it is due
+            db_file: Path to the SQLite database
+            batch_size: Reminders loaded into the heap per refill
+            max_sleep: Longest the timer thread sleeps without re-checking
+            max_attempts: Deliveries tried before a reminder is dropped
+            retry_delay: Delay before the first retry, doubled on each failure
+            metrics: Metrics registry, defaults to the shared one
+        """
+        self.deliver = deliver
+        self.db_file = db_file
+        self.batch_size = batch_size
+        self.max_sleep = max_sleep
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.metrics = metrics or default_metrics
+
+        self._heap = []
+        self._cancelled = set()
+        # Every stored reminder at or before this (due_at, id) key is in the heap.
+        self._watermark = None
+        self._exhausted = False
+        self._condition = threading.Condition()
+        self._db_lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+        self._connection = None
+        self._thread = None
+        self.running = False
+
+        logger.info("Reminder scheduler initialized")
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """The database connection, opened on first use rather than at startup."""
+        with self._connect_lock:
+            if self._connection is None:
+                if os.path.dirname(self.db_file):
+                    os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+
+                conn = sqlite3.connect(self.db_file, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(REMINDER_SCHEMA)
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(reminders)")}
+                if "attempts" not in columns:
+                    conn.execute("ALTER TABLE reminders ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+                conn.commit()
+                self._connection = conn
+            return self._connection
+
+    def add(self, chat_id: int, text: str, due: datetime, user_id: int = None) -> int:
+        """Schedule a reminder.
+
+        Args:
+            chat_id: Chat the reminder is sent to
+            text: Reminder text
+            due: When to send it
+            user_id: User who set it
+
+        Returns:
+            int: Reminder ID
+        """
+        due_at = due.timestamp()
+
+        with self._db_lock:
+            cursor = self._conn.execute(
+                "INSERT INTO reminders (chat_id, user_id, text, due_at, created) VALUES (?, ?, ?, ?, ?)",
+                (chat_id, user_id, text, due_at, datetime.now().isoformat()),
+            )
+            self._conn.commit()
+            reminder_id = cursor.lastrowid
+
+        self._enqueue((due_at, reminder_id, chat_id, user_id, text))
+        self.metrics.increment("reminders_scheduled")
+        return reminder_id
+
+    def _enqueue(self, entry: tuple):
+        """Load a stored reminder into the heap if it belongs there."""
+        due_at, reminder_id = entry[0], entry[1]
+        key = (due_at, reminder_id)
+        with self._condition:
+            if self._watermark is not None and key <= self._watermark:
+                heapq.heappush(self._heap, entry)
+            elif self._exhausted and len(self._heap) < self.batch_size:
+                # Everything stored is loaded and there is room; keep it that way.
+                heapq.heappush(self._heap, entry)
+                self._watermark = key
+            else:
+                # Leave it on disk; a later refill picks it up in order.
+                self._exhausted = False
+
+            if self._heap and self._heap[0][1] == reminder_id:
+                self._condition.notify()
+
+    def cancel(self, reminder_id: int, user_id: int = None) -> bool:
+        """Cancel a pending reminder.
+
+        Args:
+            reminder_id: Reminder ID
+            user_id: If given, only cancel the reminder if it belongs to this user
+
+        Returns:
+            bool: True if a reminder was cancelled
+        """
+        with self._db_lock:
+            if user_id is None:
+                cursor = self._conn.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
+            else:
+                cursor = self._conn.execute(
+                    "DELETE FROM reminders WHERE id = ? AND user_id = ?", (reminder_id, user_id)
+                )
+            self._conn.commit()
+            deleted = cursor.rowcount > 0
+
+        if deleted:
+            with self._condition:
+                self._cancelled.add(reminder_id)
+        return deleted
+
+    def pending(self, user_id: int = None, limit: int = 20) -> List[Dict]:
+        """List pending reminders, soonest first."""
+        with self._db_lock:
+            if user_id is None:
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(REMINDER_COLUMNS)} FROM reminders ORDER BY due_at, id LIMIT ?",
+                    (limit,),
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(REMINDER_COLUMNS)} FROM reminders WHERE user_id = ? "
+                    f"ORDER BY due_at, id LIMIT ?",
+                    (user_id, limit),
+                ).fetchall()
+        return [dict(zip(REMINDER_COLUMNS, row)) for row in rows]
+
+    def count(self) -> int:
+        """Count pending reminders."""
+        with self._db_lock:
+            return self._conn.execute("SELECT COUNT(*) FROM reminders").fetchone()[0]
+
+    def next_due(self) -> Optional[float]:
+        """Get the due timestamp of the earliest pending reminder, if loaded."""
+        with self._condition:
+            self._skip_cancelled()
+            return self._heap[0][0] if self._heap else None
+
+    def _refill(self):
+        """Load the next batch of reminders past the watermark into the heap."""
+        # Only called with an empty heap, so no cancelled entry is left to skip.
+        self._cancelled.clear()
+
+        with self._db_lock:
+            if self._watermark is None:
+                rows = self._conn.execute(
+                    "SELECT id, chat_id, user_id, text, due_at FROM reminders "
+                    "ORDER BY due_at, id LIMIT ?",
+                    (self.batch_size,),
+                ).fetchall()
+            else:
+                due_at, reminder_id = self._watermark
+                rows = self._conn.execute(
+                    "SELECT id, chat_id, user_id, text, due_at FROM reminders "
+                    "WHERE due_at > ? OR (due_at = ? AND id > ?) ORDER BY due_at, id LIMIT ?",
+                    (due_at, due_at, reminder_id, self.batch_size),
+                ).fetchall()
+
+        for reminder_id, chat_id, user_id, text, due_at in rows:
+            if reminder_id not in self._cancelled:
+                heapq.heappush(self._heap, (due_at, reminder_id, chat_id, user_id, text))
+
+        if rows:
+            self._watermark = (rows[-1][4], rows[-1][0])
+        self._exhausted = len(rows) < self.batch_size
+        self.metrics.set_gauge("reminders_loaded", len(self._heap))
+
+    def _skip_cancelled(self):
+        """Drop cancelled reminders from the head of the heap."""
+        while self._heap and self._heap[0][1] in self._cancelled:
+            _, reminder_id, _, _, _ = heapq.heappop(self._heap)
+            self._cancelled.discard(reminder_id)
+
+    def _take_due(self) -> Optional[tuple]:
+        """Wait for the next reminder to fall due and pop it."""
+        with self._condition:
+            while self.running:
+                self._skip_cancelled()
+                if not self._heap and not self._exhausted:
+                    self._refill()
+                    continue
+
+                now = time.time()
+                if self._heap and self._heap[0][0] <= now:
+                    return heapq.heappop(self._heap)
+
+                wait = self.max_sleep
+                if self._heap:
+                    wait = min(wait, self._heap[0][0] - now)
+                self._condition.wait(wait)
+        return None
+
+    def _fire(self, entry: tuple):
+        """Deliver a reminder and remove it from the store.
+
+        A failed delivery is retried with exponential backoff until
+        ``max_attempts`` is reached, then the reminder is dropped.
+        """
+        due_at, reminder_id, chat_id, user_id, text = entry
+        lateness = time.time() - due_at
+        self.metrics.observe("reminder_lateness_ms", lateness * 1000)
+
+        reminder = {"id": reminder_id, "chat_id": chat_id, "user_id": user_id,
+                    "text": text, "due_at": due_at, "late": lateness > 1.0}
+        try:
+            self.deliver(reminder)
+        except Exception as e:
+            self.metrics.increment("reminders_failed")
+            logger.error(f"Error delivering reminder {reminder_id}: {e}")
+            self._retry(entry)
+            return
+
+        self.metrics.increment("reminders_fired")
+        # Delete after delivery: a crash in between re-sends rather than loses it.
+        self._delete(reminder_id)
+
+    def _retry(self, entry: tuple):
+        """Record a failed attempt and reschedule the reminder."""
+        _, reminder_id, chat_id, user_id, text = entry
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT attempts FROM reminders WHERE id = ?", (reminder_id,)
+            ).fetchone()
+            if row is None:
+                # Cancelled while it was being delivered.
+                return
+            attempts = row[0] + 1
+            if attempts >= self.max_attempts:
+                self._conn.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
+                self._conn.commit()
+                self.metrics.increment("reminders_dropped")
+                logger.warning(f"Dropping reminder {reminder_id} after {attempts} failed attempts")
+                return
+
+            due_at = time.time() + self.retry_delay * 2 ** (attempts - 1)
+            self._conn.execute(
+                "UPDATE reminders SET attempts = ?, due_at = ? WHERE id = ?",
+                (attempts, due_at, reminder_id),
+            )
+            self._conn.commit()
+
+        self.metrics.increment("reminders_retried")
+        self._enqueue((due_at, reminder_id, chat_id, user_id, text))
+
+    def _delete(self, reminder_id: int):
+        """Remove a delivered reminder from the store."""
+        with self._db_lock:
+            self._conn.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
+            self._conn.commit()
+
+    def _run(self):
+        """Timer thread: fire reminders as they fall due."""
+        while self.running:
+            entry = self._take_due()
+            if entry is not None:
+                self._fire(entry)
+
+    def start(self):
+        """Start the timer thread.
+
+        Reminders that fell due while the process was down are fired
+        immediately, oldest first.
+        """
+        if self.running:
+            return
+        self.running = True
+        overdue = self._count_overdue()
+        if overdue:
+            logger.info(f"Catching up on {overdue} overdue reminders")
+        self._thread = threading.Thread(target=self._run, name="novaxa-reminders", daemon=True)
+        self._thread.start()
+
+    def _count_overdue(self) -> int:
+        """Count reminders already past their due time."""
+        with self._db_lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM reminders WHERE due_at <= ?", (time.time(),)
+            ).fetchone()[0]
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the timer thread."""
+        with self._condition:
+            self.running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def close(self):
+        """Stop the scheduler and close the database."""
+        self.stop()
+        with self._db_lock, self._connect_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -12,10 +12,17 @@ import json
 import time
 import hashlib
 import base64
+import binascii
 import hmac
 import secrets
-from typing import Dict, List, Optional, Union, Any
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Union
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from functools import lru_cache
+
+from eventlog import EventRing, bus as default_bus, get_writer
+from tokenstore import STORE_JSON, create_token_store
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -23,105 +30,406 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+# Stored values look like enc1:<salt>:<nonce + ciphertext + tag>, base64.
+ENCRYPTED_PREFIX = "enc1:"
+SALT_SIZE = 16
+NONCE_SIZE = 12
+PLAINTEXT_CACHE_SIZE = 256
+# scrypt cost: 16 MiB and about 50 ms per derivation, done once per process.
+SCRYPT_N, SCRYPT_R, SCRYPT_P = 2 ** 14, 8, 1
+
+
+@lru_cache(maxsize=8)
+def derive_key(master_key: str, salt: bytes) -> bytes:
+    """Derive the AES key from the master key with scrypt, once per process."""
+    return hashlib.scrypt(master_key.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P,
+                          dklen=32)
+
+
+def _aesgcm(key: bytes):
+    """Create an AES-GCM cipher, importing cryptography on first use."""
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    return AESGCM(key)
+
+
+def encrypt_value(master_key: str, salt: bytes, text: str, associated: str = None) -> str:
+    """Encrypt and authenticate text under a master key.
+    
+    Args:
+        master_key: Master key the AES key is derived from
+        salt: KDF salt, stored with the value
+        text: Text to encrypt
+        associated: Authenticated but unencrypted context, e.g. the token ID
+        
+    Returns:
+        str: The stored form of the value
+    """
+    nonce = secrets.token_bytes(NONCE_SIZE)
+    sealed = _aesgcm(derive_key(master_key, salt)).encrypt(
+        nonce, text.encode(), associated.encode() if associated else None
+    )
+    return (ENCRYPTED_PREFIX + base64.urlsafe_b64encode(salt).decode() + ":"
+            + base64.urlsafe_b64encode(nonce + sealed).decode())
+
+
+def value_salt(value: str) -> Optional[bytes]:
+    """Get the KDF salt of a stored value, or None if it is not encrypted."""
+    if not value.startswith(ENCRYPTED_PREFIX):
+        return None
+    return base64.urlsafe_b64decode(value[len(ENCRYPTED_PREFIX):].split(":", 1)[0])
+
+
+def decrypt_value(master_key: str, value: str, associated: str = None) -> str:
+    """Decrypt a value stored by encrypt_value.
+    
+    Values written before encryption was introduced, a base64 HMAC followed
+    by the text, are read as before until they are next saved or re-keyed;
+    anything else is taken as plaintext.
+    
+    Raises:
+        ValueError: If the value was tampered with or the key is wrong
+    """
+    if not value.startswith(ENCRYPTED_PREFIX):
+        return _legacy_value(master_key, value)
+    
+    from cryptography.exceptions import InvalidTag
+    
+    try:
+        salt, sealed = value[len(ENCRYPTED_PREFIX):].split(":", 1)
+        sealed = base64.urlsafe_b64decode(sealed)
+        return _aesgcm(derive_key(master_key, base64.urlsafe_b64decode(salt))).decrypt(
+            sealed[:NONCE_SIZE], sealed[NONCE_SIZE:], associated.encode() if associated else None
+        ).decode()
+    except InvalidTag:
+        raise ValueError("wrong master key or tampered value")
+    except (TypeError, binascii.Error) as e:
+        raise ValueError(f"malformed value: {e}")
+
+
+def _legacy_value(master_key: str, value: str) -> str:
+    """Read a value stored in the old HMAC-prefixed format, or a plaintext one."""
+    try:
+        data = base64.b64decode(value.encode(), validate=True)
+        text = data[32:].decode()
+    except (binascii.Error, UnicodeDecodeError):
+        return value
+    key = hashlib.sha256(master_key.encode()).digest()
+    if not hmac.compare_digest(data[:32], hmac.new(key, text.encode(), hashlib.sha256).digest()):
+        return value
+    return text
+
+
+def check_token(token: str, timeout: float = 10.0) -> Dict:
+    """Ask Telegram's getMe whether a token works.
+    
+    Args:
+        token: Telegram Bot API token
+        timeout: Seconds to wait for Telegram
+        
+    Returns:
+        dict: ``valid`` is True or False when Telegram answered and None
+        when it could not be asked, plus ``username`` or ``error``
+    """
+    import requests
+    
+    try:
+        response = requests.get(f"{TELEGRAM_API_URL}/bot{token}/getMe", timeout=timeout)
+    except requests.RequestException as e:
+        return {"valid": None, "error": str(e)}
+    
+    if response.status_code in (401, 404):
+        # Revoked or never issued; retrying will not help.
+        return {"valid": False, "error": f"HTTP {response.status_code}"}
+    try:
+        data = response.json()
+    except ValueError:
+        data = {}
+    if response.status_code == 200 and data.get("ok"):
+        return {"valid": True, "username": data["result"].get("username")}
+    return {"valid": None, "error": data.get("description") or f"HTTP {response.status_code}"}
+
 
 class TokenManager:
     """Class for managing Telegram bot tokens and security."""
     
-    def __init__(self, token_file: str = "config/tokens.json", master_key: str = None):
+    def __init__(self, token_file: str = "config/tokens.json", master_key: str = None,
+                 flush_interval: float = 60.0, flush_every: int = 100, backups: int = 3,
+                 store=None, reload_interval: float = 1.0):
         """Initialize the token manager.
         
         Args:
             token_file: Path to token configuration file
             master_key: Master key for token encryption
+            flush_interval: Seconds usage stamps may stay unsaved
+            flush_every: Unsaved usage stamps that trigger a save at once
+            backups: Earlier versions of the token file to keep
+            store: tokenstore backend, picked by the TOKEN_STORE environment
+                variable if not given
+            reload_interval: Seconds between checks for changes made by
+                other processes, e.g. the dashboard
         """
         self.token_file = token_file
         self.master_key = master_key or os.environ.get("NOVAXA_MASTER_KEY")
+        self.store = store or create_token_store(
+            os.environ.get("TOKEN_STORE", STORE_JSON), token_file,
+            os.environ.get("TOKEN_DB", "data/tokens.db"), backups,
+        )
         self.tokens = {}
         self.active_token_id = None
-        self.backup_file = f"{token_file}.backup"
+        # The version before the last change, restored by emergency_reset.
+        self.backup_file = self.store.backup_file
         self.owner_id = int(os.environ.get("OWNER_ID", "0"))
-        
-        os.makedirs(os.path.dirname(token_file), exist_ok=True)
-        
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self.reload_interval = reload_interval
+        
+        # Usage stamps are saved behind reads; changes are saved at once.
+        self._lock = threading.RLock()
+        self._unsaved_touches = 0
+        self._touched_ids = set()
+        self._flush_timer = None
+        # The stored version and active token this process last saw.
+        self._signature = None
+        self._stored_active_id = None
+        self._checked = 0.0
+        # getMe results by token ID: (checked at, stored token value, result).
+        self._health = {}
+        # Decrypted values by (stored value, token ID), least recently used first.
+        self._plaintexts = OrderedDict()
+        self._salt = None
+        
+        # Loading only reads: the store is first written by the first
+        # change, so starting the bot touches nothing on disk.
         self._load_tokens()
         
-        self._backup_tokens()
-        
         logger.info("Token manager initialized")
     
     def _load_tokens(self):
-        """Load tokens from file."""
+        """Load tokens from the store."""
         try:
-            if os.path.exists(self.token_file):
-                with open(self.token_file, "r") as f:
-                    data = json.load(f)
-                    self.tokens = data.get("tokens", {})
-                    self.active_token_id = data.get("active_token_id")
-                    logger.info(f"Loaded {len(self.tokens)} tokens from configuration")
-            else:
-                logger.info("No tokens configuration file found, using defaults")
-                self._save_tokens()
+            self._signature = self.store.signature()
+            self.tokens, self.active_token_id = self.store.load()
+            self._stored_active_id = self.active_token_id
+            if self.tokens:
+                logger.info(f"Loaded {len(self.tokens)} tokens from configuration")
         except Exception as e:
             logger.error(f"Error loading tokens: {e}")
     
-    def _backup_tokens(self):
-        """Create a backup of tokens."""
+    def refresh(self, keep: Iterable[str] = ()) -> bool:
+        """Take over changes other processes made to the store.
+        
+        Only the entries that differ are replaced, and usage stamps not yet
+        saved survive. Checking costs a stat() or one query, so this is
+        cheap when nothing changed.
+        
+        Args:
+            keep: IDs of tokens this process changed and has not saved yet
+            
+        Returns:
+            bool: True if the store had changed
+        """
+        with self._lock:
+            signature = self.store.signature()
+            if signature == self._signature:
+                return False
+            
+            keep = set(keep)
+            tokens, active_token_id = self.store.load()
+            # Read the signature again: a store created by load() has one now.
+            self._signature = self.store.signature()
+            
+            reloaded = 0
+            for token_id in [token_id for token_id in self.tokens
+                             if token_id not in tokens and token_id not in keep]:
+                del self.tokens[token_id]
+                self._touched_ids.discard(token_id)
+                reloaded += 1
+            for token_id, token in tokens.items():
+                if token_id in keep:
+                    continue
+                current = self.tokens.get(token_id)
+                if current and token_id in self._touched_ids:
+                    token["last_used"] = current.get("last_used")
+                if current != token:
+                    self.tokens[token_id] = token
+                    reloaded += 1
+            
+            # An active token this process picked but has not saved wins.
+            if self.active_token_id == self._stored_active_id:
+                self.active_token_id = active_token_id
+            self._stored_active_id = active_token_id
+            
+            if reloaded:
+                logger.info(f"Reloaded {reloaded} tokens changed by another process")
+            return True
+    
+    def _maybe_refresh(self):
+        """Refresh at most once per reload interval, for frequent reads."""
+        now = time.monotonic()
+        if now - self._checked < self.reload_interval:
+            return
+        self._checked = now
         try:
-            if os.path.exists(self.token_file):
-                with open(self.token_file, "r") as src:
-                    with open(self.backup_file, "w") as dst:
-                        dst.write(src.read())
-                logger.info("Tokens backup created")
+            self.refresh()
         except Exception as e:
-            logger.error(f"Error creating tokens backup: {e}")
+            logger.error(f"Error reloading tokens: {e}")
     
-    def _save_tokens(self):
-        """Save tokens to file."""
-        try:
-            data = {
-                "tokens": self.tokens,
-                "active_token_id": self.active_token_id,
-                "last_updated": datetime.now().isoformat(),
-            }
-            
-            with open(self.token_file, "w") as f:
-                json.dump(data, f, indent=2)
+    def _save_tokens(self, changed: Iterable[str] = None, deleted: Iterable[str] = ()):
+        """Save tokens, including any unsaved usage stamps.
+        
+        Saving holds the store's lock across processes and first takes over
+        what other processes changed, so their changes are not overwritten.
+        
+        Args:
+            changed: IDs of the changed tokens, or None to store the tokens
+                of this process as they are
+            deleted: IDs of the deleted tokens
+        """
+        with self._lock:
+            if self._flush_timer:
+                self._flush_timer.cancel()
+                self._flush_timer = None
             
-            self._backup_tokens()
-                
-            logger.info("Tokens configuration saved")
-        except Exception as e:
-            logger.error(f"Error saving tokens: {e}")
+            try:
+                with self.store.locked():
+                    if changed is not None:
+                        self.refresh(keep=set(changed) | set(deleted))
+                        changed = set(changed) | self._touched_ids
+                    self._unsaved_touches = 0
+                    self._touched_ids = set()
+                    
+                    if self.store.save(self.tokens, self.active_token_id, changed, deleted):
+                        logger.info("Tokens configuration saved")
+                    self._signature = self.store.signature()
+                    self._stored_active_id = self.active_token_id
+            except Exception as e:
+                logger.error(f"Error saving tokens: {e}")
+    
+    def _touch(self, token_id: str):
+        """Record a token use in memory and schedule saving it."""
+        with self._lock:
+            self.tokens[token_id]["last_used"] = datetime.now().isoformat()
+            self._unsaved_touches += 1
+            self._touched_ids.add(token_id)
+            if self._unsaved_touches >= self.flush_every:
+                self._save_tokens(changed=())
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    def flush(self):
+        """Save usage stamps that have not been written yet, e.g. at shutdown."""
+        with self._lock:
+            if self._unsaved_touches:
+                self._save_tokens(changed=())
+            elif self._flush_timer:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+    
+    def _has_token(self, token_id: str) -> bool:
+        """Check that a token exists, looking for one another process just added."""
+        if token_id in self.tokens:
+            return True
+        self.refresh()
+        return token_id in self.tokens
     
-    def _encrypt(self, text: str) -> str:
-        """Encrypt text using the master key."""
+    def _next_active_id(self, exclude: str) -> Optional[str]:
+        """Get the oldest active token other than the one being retired."""
+        for token_id in self.store.find(status="active", limit=2):
+            if token_id != exclude:
+                return token_id
+        return None
+    
+    def _encrypt(self, text: str, token_id: str = None) -> str:
+        """Encrypt text with AES-GCM under the master key.
+        
+        The token ID is authenticated along with the text, so an encrypted
+        value copied to another entry does not decrypt.
+        """
         if not self.master_key:
             logger.warning("No master key set, using plaintext")
             return text
-            
-        try:
-            key = hashlib.sha256(self.master_key.encode()).digest()
-            return base64.b64encode(
-                hmac.new(key, text.encode(), hashlib.sha256).digest() +
-                text.encode()
-            ).decode()
-        except Exception as e:
-            logger.error(f"Error encrypting text: {e}")
-            return text
+        
+        return encrypt_value(self.master_key, self._current_salt(), text, token_id)
     
-    def _decrypt(self, encrypted_text: str) -> str:
-        """Decrypt text using the master key."""
+    def _decrypt(self, encrypted_text: str, token_id: str = None) -> Optional[str]:
+        """Decrypt text encrypted by _encrypt, from a small cache when possible.
+        
+        Returns:
+            str: The text, or None if it does not decrypt under the master key
+        """
         if not self.master_key:
             logger.warning("No master key set, using plaintext")
             return encrypted_text
-            
+        
+        with self._lock:
+            cached = self._plaintexts.get((encrypted_text, token_id))
+            if cached is not None:
+                self._plaintexts.move_to_end((encrypted_text, token_id))
+                return cached
+        
         try:
-            data = base64.b64decode(encrypted_text.encode())
-            text = data[32:].decode()
-            return text
-        except Exception as e:
-            logger.error(f"Error decrypting text: {e}")
-            return encrypted_text
+            text = decrypt_value(self.master_key, encrypted_text, token_id)
+        except ValueError as e:
+            logger.error(f"Error decrypting token {token_id}: {e}")
+            return None
+        
+        with self._lock:
+            self._plaintexts[(encrypted_text, token_id)] = text
+            if len(self._plaintexts) > PLAINTEXT_CACHE_SIZE:
+                self._plaintexts.popitem(last=False)
+        return text
+    
+    def _current_salt(self) -> bytes:
+        """Get the KDF salt for new values: the one the stored tokens use, or a new one."""
+        if self._salt is None:
+            self._salt = next(
+                (salt for salt in (value_salt(token["token"]) for token in self.tokens.values())
+                 if salt), None,
+            ) or secrets.token_bytes(SALT_SIZE)
+        return self._salt
+    
+    def rekey(self, new_master_key: str) -> int:
+        """Re-encrypt every token under a new master key in one atomic save.
+        
+        Tokens are decrypted and re-encrypted one at a time, so at most one
+        plaintext is held at once. Nothing changes if any token fails to
+        decrypt. Store the new key, e.g. in .env, only after this returns;
+        until then the stored tokens still open with the old one.
+        
+        Args:
+            new_master_key: Master key to encrypt under from now on
+            
+        Returns:
+            int: Number of re-encrypted tokens
+            
+        Raises:
+            ValueError: If a token does not decrypt under the current key
+        """
+        salt = secrets.token_bytes(SALT_SIZE)
+        with self._lock, self.store.locked():
+            self.refresh()
+            rekeyed = {}
+            for token_id, token_data in self.tokens.items():
+                if self.master_key:
+                    text = decrypt_value(self.master_key, token_data["token"], token_id)
+                else:
+                    text = token_data["token"]
+                rekeyed[token_id] = encrypt_value(new_master_key, salt, text, token_id)
+            
+            for token_id, value in rekeyed.items():
+                self.tokens[token_id]["token"] = value
+            self.master_key = new_master_key
+            self._salt = salt
+            self._plaintexts.clear()
+            self._health.clear()
+            self._save_tokens()
+        
+        logger.info(f"Re-encrypted {len(rekeyed)} tokens under a new master key")
+        return len(rekeyed)
     
     def add_token(self, token: str, name: str = "Default", owner_id: int = None) -> str:
         """Add a new token.
@@ -138,7 +446,7 @@ class TokenManager:
         
         self.tokens[token_id] = {
             "id": token_id,
-            "token": self._encrypt(token),
+            "token": self._encrypt(token, token_id),
             "name": name,
             "owner_id": owner_id,
             "created": datetime.now().isoformat(),
@@ -149,7 +457,7 @@ class TokenManager:
         if not self.active_token_id:
             self.active_token_id = token_id
         
-        self._save_tokens()
+        self._save_tokens(changed=[token_id])
         
         logger.info(f"Token {token_id} added")
         return token_id
@@ -164,14 +472,14 @@ class TokenManager:
         Returns:
             bool: True if token was updated, False otherwise
         """
-        if token_id not in self.tokens:
+        if not self._has_token(token_id):
             logger.warning(f"Token {token_id} does not exist")
             return False
         
-        self.tokens[token_id]["token"] = self._encrypt(token)
+        self.tokens[token_id]["token"] = self._encrypt(token, token_id)
         self.tokens[token_id]["updated"] = datetime.now().isoformat()
         
-        self._save_tokens()
+        self._save_tokens(changed=[token_id])
         
         logger.info(f"Token {token_id} updated")
         return True
@@ -197,13 +505,13 @@ class TokenManager:
         Returns:
             bool: True if token was activated, False otherwise
         """
-        if token_id not in self.tokens:
+        if not self._has_token(token_id):
             logger.warning(f"Token {token_id} does not exist")
             return False
         
         self.active_token_id = token_id
         
-        self._save_tokens()
+        self._save_tokens(changed=())
         
         logger.info(f"Token {token_id} activated")
         return True
@@ -217,21 +525,16 @@ class TokenManager:
         Returns:
             bool: True if token was deactivated, False otherwise
         """
-        if token_id not in self.tokens:
+        if not self._has_token(token_id):
             logger.warning(f"Token {token_id} does not exist")
             return False
         
         self.tokens[token_id]["status"] = "inactive"
         
         if self.active_token_id == token_id:
-            active_tokens = [tid for tid, t in self.tokens.items() 
-                            if t["status"] == "active"]
-            if active_tokens:
-                self.active_token_id = active_tokens[0]
-            else:
-                self.active_token_id = None
+            self.active_token_id = self._next_active_id(token_id)
         
-        self._save_tokens()
+        self._save_tokens(changed=[token_id])
         
         logger.info(f"Token {token_id} deactivated")
         return True
@@ -245,32 +548,33 @@ class TokenManager:
         Returns:
             bool: True if token was deleted, False otherwise
         """
-        if token_id not in self.tokens:
+        if not self._has_token(token_id):
             logger.warning(f"Token {token_id} does not exist")
             return False
         
-        del self.tokens[token_id]
+        with self._lock:
+            del self.tokens[token_id]
+            self._touched_ids.discard(token_id)
         
         if self.active_token_id == token_id:
-            if self.tokens:
-                self.active_token_id = list(self.tokens.keys())[0]
-            else:
-                self.active_token_id = None
+            self.active_token_id = self._next_active_id(token_id)
         
-        self._save_tokens()
+        self._save_tokens(deleted=[token_id], changed=())
         
         logger.info(f"Token {token_id} deleted")
         return True
     
-    def get_token(self, token_id: str = None) -> str:
+    def get_token(self, token_id: str = None, touch: bool = True) -> str:
         """Get a token.
         
         Args:
             token_id: Token ID to get, or None for active token
+            touch: Whether to record the access in last_used
             
         Returns:
             str: Token value
         """
+        self._maybe_refresh()
         token_id = token_id or self.active_token_id
         
         if not token_id or token_id not in self.tokens:
@@ -283,17 +587,99 @@ class TokenManager:
             logger.warning(f"Token {token_id} is inactive")
             return None
         
-        token_data["last_used"] = datetime.now().isoformat()
-        self._save_tokens()
+        if touch:
+            self._touch(token_id)
         
-        return self._decrypt(token_data["token"])
+        return self._decrypt(token_data["token"], token_id)
     
-    def get_tokens(self) -> List[Dict]:
-        """Get all tokens.
+    def validate_all(self, max_workers: int = 8, timeout: float = 10.0, ttl: float = 300.0,
+                     deactivate: bool = True) -> Dict[str, Dict]:
+        """Check every active token with getMe, several at a time.
+        
+        Results are cached for ttl seconds, or until the token is rotated.
+        Tokens Telegram rejects are deactivated together with a single save;
+        tokens that could not be checked, e.g. on a network error, are left
+        alone.
+        
+        Args:
+            max_workers: Tokens checked at the same time
+            timeout: Seconds to wait for Telegram per token
+            ttl: Seconds a result is reused
+            deactivate: Whether to deactivate the tokens Telegram rejects
+            
+        Returns:
+            dict: Result of check_token by token ID, with ``cached`` set for
+            reused results
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        self._maybe_refresh()
+        now = time.monotonic()
+        results, due = {}, {}
+        with self._lock:
+            for token_id, token_data in self.tokens.items():
+                if token_data["status"] != "active":
+                    continue
+                cached = self._health.get(token_id)
+                if cached and cached[1] == token_data["token"] and now - cached[0] < ttl:
+                    results[token_id] = {**cached[2], "cached": True}
+                else:
+                    due[token_id] = token_data["token"]
+        
+        if due:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(due)),
+                                    thread_name_prefix="novaxa-getme") as pool:
+                checks = {}
+                for token_id, stored in due.items():
+                    token = self._decrypt(stored, token_id)
+                    if token is None:
+                        # Not Telegram's verdict; never deactivate over a wrong key.
+                        results[token_id] = {"valid": None, "error": "does not decrypt"}
+                    else:
+                        checks[token_id] = pool.submit(check_token, token, timeout)
+                for token_id, future in checks.items():
+                    results[token_id] = future.result()
+        
+        with self._lock:
+            for token_id, stored in due.items():
+                if results[token_id]["valid"] is not None:
+                    self._health[token_id] = (now, stored, results[token_id])
+            
+            dead = [token_id for token_id, result in results.items()
+                    if result["valid"] is False and token_id in self.tokens
+                    and self.tokens[token_id]["status"] == "active"]
+            if deactivate and dead:
+                for token_id in dead:
+                    self.tokens[token_id]["status"] = "inactive"
+                if self.active_token_id in dead:
+                    self.active_token_id = next(
+                        (token_id for token_id in self.store.find(status="active")
+                         if token_id not in dead and self.tokens.get(token_id, {}).get("status") == "active"),
+                        None,
+                    )
+                self._save_tokens(changed=dead)
+                logger.warning(f"Deactivated {len(dead)} tokens rejected by Telegram: {', '.join(dead)}")
+        
+        logger.info(f"Validated {len(results)} tokens ({len(due)} checked, {len(dead)} dead)")
+        return results
+    
+    def get_tokens(self, owner_id: int = None, status: str = None) -> List[Dict]:
+        """Get all tokens, or those of an owner and/or with a status.
+        
+        Args:
+            owner_id: Only tokens owned by this user
+            status: Only tokens with this status, e.g. "active"
         
         Returns:
             list: List of token information (without actual token values)
         """
+        self._maybe_refresh()
+        if owner_id is None and status is None:
+            token_ids = list(self.tokens)
+        else:
+            token_ids = [token_id for token_id in self.store.find(owner_id, status)
+                         if token_id in self.tokens]
+        
         return [{
             "id": token_id,
             "name": token["name"],
@@ -303,7 +689,7 @@ class TokenManager:
             "last_used": token.get("last_used"),
             "status": token["status"],
             "active": token_id == self.active_token_id,
-        } for token_id, token in self.tokens.items()]
+        } for token_id, token in ((token_id, self.tokens[token_id]) for token_id in token_ids)]
         
     def emergency_reset(self, owner_id: int = None) -> bool:
         """Emergency reset of tokens.
@@ -322,12 +708,10 @@ class TokenManager:
             return False
             
         try:
-            if os.path.exists(self.backup_file):
-                with open(self.backup_file, "r") as f:
-                    data = json.load(f)
-                    self.tokens = data.get("tokens", {})
-                    self.active_token_id = data.get("active_token_id")
-                    logger.info("Tokens restored from backup during emergency reset")
+            backup = self.store.load_backup()
+            if backup is not None:
+                self.tokens, self.active_token_id = backup
+                logger.info("Tokens restored from backup during emergency reset")
             else:
                 for token_id in self.tokens:
                     self.tokens[token_id]["status"] = "inactive"
@@ -349,12 +733,13 @@ class TokenManager:
         Returns:
             str: JSON string with token data
         """
+        self._maybe_refresh()
         if include_values:
             export_data = {
                 "tokens": {
                     token_id: {
                         **token,
-                        "token": self._decrypt(token["token"]) if include_values else "[REDACTED]"
+                        "token": self._decrypt(token["token"], token_id) if include_values else "[REDACTED]"
                     }
                     for token_id, token in self.tokens.items()
                 },
@@ -393,14 +778,13 @@ class TokenManager:
         try:
             data = json.loads(json_data)
             
-            self._backup_tokens()
-            
             imported_tokens = data.get("tokens", {})
+            imported_ids = []
             
             for token_id, token_data in imported_tokens.items():
                 if "token" in token_data and token_data["token"] != "[REDACTED]":
                     # Encrypt the token value
-                    token_data["token"] = self._encrypt(token_data["token"])
+                    token_data["token"] = self._encrypt(token_data["token"], token_id)
                 elif token_id in self.tokens:
                     token_data["token"] = self.tokens[token_id]["token"]
                 else:
@@ -408,11 +792,12 @@ class TokenManager:
                     continue
                     
                 self.tokens[token_id] = token_data
+                imported_ids.append(token_id)
                 
             if "active_token_id" in data and data["active_token_id"] in self.tokens:
                 self.active_token_id = data["active_token_id"]
                 
-            self._save_tokens()
+            self._save_tokens(changed=imported_ids)
             logger.info(f"Imported {len(imported_tokens)} tokens")
             return True
         except Exception as e:
@@ -423,22 +808,33 @@ class TokenManager:
 class SecurityMonitor:
     """Class for monitoring security-related events."""
     
-    def __init__(self, log_file: str = "logs/security.log", max_logs: int = 1000):
-        """Initialize the security monitor."""
+    def __init__(self, log_file: str = "logs/security.log", max_logs: int = 1000, writer=None,
+                 bus=None):
+        """Initialize the security monitor.
+
+        Args:
+            log_file: JSON lines file the events are appended to
+            max_logs: Recent events kept in memory for queries
+            writer: eventlog.JsonlWriter for the file, the process's shared
+                writer of the file if not given
+            bus: eventlog.EventBus the events are published on, defaults to
+                the process-wide one
+        """
         self.log_file = log_file
         self.max_logs = max_logs
-        self.logs = []
-        
-        os.makedirs(os.path.dirname(log_file), exist_ok=True)
-        
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-        logger.addHandler(file_handler)
+        self.logs = EventRing(max_logs)
+        self.writer = writer or get_writer(log_file)
+        self.bus = bus or default_bus
         
         logger.info("Security monitor initialized")
     
     def log_event(self, event_type: str, details: Dict = None, user_id: int = None):
-        """Log a security event."""
+        """Log a security event.
+
+        The event goes to the process log, is queued for the security log
+        file and is published on the bus; nothing is written to disk on the
+        caller's thread.
+        """
         timestamp = datetime.now()
         
         event = {
@@ -449,43 +845,67 @@ class SecurityMonitor:
         }
         
         self.logs.append(event)
-        if len(self.logs) > self.max_logs:
-            self.logs.pop(0)
         
         log_message = f"Security event: {event_type}"
         if user_id:
             log_message += f" (User: {user_id})"
         
         logger.info(log_message)
-        
-        try:
-            with open(self.log_file, "a") as f:
-                f.write(json.dumps(event) + "\n")
-        except Exception as e:
-            logger.error(f"Error writing to security log file: {e}")
+        self.writer.write(event)
+        self.bus.publish(event)
+    
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until the queued events are in the security log file."""
+        return self.writer.flush(timeout)
+    
+    def close(self):
+        """Write out the queued events and close the security log file.
+
+        The writer is shared with every monitor of the file, so only close
+        it when the process is done with security events.
+        """
+        self.writer.close()
     
     def get_recent_events(self, count: int = 10, event_type: str = None, user_id: int = None) -> List[Dict]:
-        """Get recent security events."""
-        filtered_events = self.logs
-        
-        if event_type:
-            filtered_events = [event for event in filtered_events if event["type"] == event_type]
-        
-        if user_id:
-            filtered_events = [event for event in filtered_events if event["user_id"] == user_id]
+        """Get recent security events, newest first.
         
-        filtered_events.sort(key=lambda x: x["timestamp"], reverse=True)
-        
-        return filtered_events[:count]
+        Args:
+            count: Events to return at most
+            event_type: Only events of this type
+            user_id: Only events of this user
+            
+        Returns:
+            list: The matching events, without copying the whole log
+        """
+        return self.logs.latest(count, event_type or None, user_id or None)
+
+
+_security_monitor = None
+_security_monitor_lock = threading.Lock()
+
+
+def get_security_monitor() -> SecurityMonitor:
+    """Get the process-wide security monitor, creating it on first use."""
+    global _security_monitor
+    with _security_monitor_lock:
+        if _security_monitor is None:
+            _security_monitor = SecurityMonitor()
+        return _security_monitor
 
 
 class IPProtection:
     """Class for intellectual property protection."""
     
-    def __init__(self, owner_id: int = None):
-        """Initialize IP protection."""
+    def __init__(self, owner_id: int = None, security_monitor: "SecurityMonitor" = None):
+        """Initialize IP protection.
+
+        Args:
+            owner_id: Owner ID, defaults to the OWNER_ID environment variable
+            security_monitor: Monitor receiving failed verifications, the
+                process-wide one if not given
+        """
         self.owner_id = owner_id or int(os.environ.get("OWNER_ID", "0"))
-        self.security_monitor = SecurityMonitor()
+        self.security_monitor = security_monitor or get_security_monitor()
         logger.info("IP protection initialized")
     
     def verify_owner(self, user_id: int) -> bool:
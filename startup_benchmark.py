@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+NOVAXA Startup Benchmark
+------------------------
+Measures how long a bot takes to come up from a cold process, to compare
+Render and Termux cold starts before and after a change.
+
+For each entry module it reports the slowest imports from
+``python -X importtime`` and the total import time. For each preset it then
+times building the engine in a fresh process inside an empty working
+directory, and lists every file that building it wrote besides the bot log,
+which should be none.
+
+Usage:
+    python startup_benchmark.py [--presets novaxa,enhanced] [--top 15]
+"""
+
+import os
+import sys
+import argparse
+import json
+import subprocess
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DUMMY_TOKEN = "123456789:AAbenchmarkbenchmarkbenchmarkbenchm"
+LOG_FILE = "logs/bot.log"
+
+
+def _environment(**extra) -> Dict[str, str]:
+    """Environment for a child process importing the repository's modules."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    env.update(extra)
+    return env
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """Import a module in a fresh interpreter and collect -X importtime output.
+
+    Args:
+        module: Name of the module to import
+
+    Returns:
+        list: (module, self microseconds, cumulative microseconds) per import
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=tempfile.gettempdir(), env=_environment(), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(own), int(cumulative)))
+    return rows
+
+
+def report_imports(module: str, top: int):
+    """Print the slowest imports of a module and its total import time."""
+    rows = import_times(module)
+    total = next((cumulative for name, _, cumulative in rows if name == module), 0)
+    print(f"\nimport {module}: {total / 1000:.1f} ms")
+    print(f"  {'cumulative':>12} {'self':>10}  module")
+    for name, own, cumulative in sorted(rows, key=lambda row: row[2], reverse=True)[:top]:
+        print(f"  {cumulative / 1000:>10.1f}ms {own / 1000:>8.1f}ms  {name}")
+
+
+def _build_child(preset: str):
+    """Build an engine in this process and print the timing as JSON."""
+    started = time.perf_counter()
+    from engine import build_engine
+    imported = time.perf_counter()
+    build_engine(preset, log_file=LOG_FILE)
+    built = time.perf_counter()
+    print(json.dumps({"import": imported - started, "build": built - imported}))
+
+
+def _files_under(directory: str) -> Dict[str, float]:
+    """Map every file below a directory to its modification time."""
+    found = {}
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            found[os.path.relpath(path, directory)] = os.path.getmtime(path)
+    return found
+
+
+def report_build(preset: str):
+    """Time building a preset's engine cold and list the files it wrote."""
+    with tempfile.TemporaryDirectory() as workdir:
+        before = _files_under(workdir)
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", preset],
+            cwd=workdir, capture_output=True, text=True,
+            env=_environment(TELEGRAM_BOT_TOKEN=DUMMY_TOKEN, WEBHOOK_URL=""),
+        )
+        if result.returncode != 0:
+            print(f"\nbuild {preset}: failed\n{result.stderr}")
+            return
+        after = _files_under(workdir)
+
+    timing = json.loads(result.stdout.strip().splitlines()[-1])
+    written = sorted(path for path, mtime in after.items()
+                     if before.get(path) != mtime and path != os.path.normpath(LOG_FILE))
+    print(f"\nbuild {preset}: {(timing['import'] + timing['build']) * 1000:.1f} ms "
+          f"(imports {timing['import'] * 1000:.1f} ms, engine {timing['build'] * 1000:.1f} ms)")
+    print(f"  files written: {', '.join(written) if written else 'none'}")
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Measure NOVAXA cold start time")
+    parser.add_argument("--modules", default="novaxa_bot,enhanced_bot,engine",
+                        help="Comma-separated modules to profile imports of")
+    parser.add_argument("--presets", default="novaxa,enhanced",
+                        help="Comma-separated presets to build")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to show")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _build_child(args.child)
+        return
+
+    for module in filter(None, args.modules.split(",")):
+        report_imports(module, args.top)
+    for preset in filter(None, args.presets.split(",")):
+        report_build(preset)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+State File Module for NOVAXA Bot
+-------------------------------
+This module writes the files the bot keeps its state in: the token store,
+the services configuration and the .env file.
+
+A write goes to a temporary file in the same directory, is fsynced and then
+renamed over the old file, so a crash leaves either the old or the new
+content and never a truncated file. Content that did not change is not
+written at all, and backups of earlier generations are only rotated when
+it did. Processes that read, change and write back the same file take
+turns through file_lock.
+"""
+
+import os
+import json
+import hashlib
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Digest of the last content written or read per path, with the stat of
+# the file at that time, so unchanged writes are skipped without a read.
+_digests: Dict[str, Tuple[str, Tuple]] = {}
+_lock = threading.Lock()
+# flock() does not exclude threads of one process, so they queue here first,
+# and _held lets a thread that holds a lock nest saves inside it.
+_process_locks: Dict[str, threading.Lock] = {}
+_process_locks_lock = threading.Lock()
+_held = threading.local()
+
+
+def backup_path(path: str, generation: int = 1) -> str:
+    """Get the path of a backup, ``<path>.backup`` for the newest one."""
+    return f"{path}.backup" if generation == 1 else f"{path}.backup.{generation}"
+
+
+def file_signature(path: str) -> Optional[Tuple]:
+    """Identify a file's current version, or None if it does not exist.
+
+    Every write through this module replaces the file, so the inode alone
+    changes; size and modification time catch in-place edits by hand.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+@contextmanager
+def file_lock(path: str):
+    """Hold an exclusive advisory lock on ``<path>.lock`` across processes.
+
+    Writers that read, change and write back a file hold it, so the bot,
+    the dashboard and the CLI cannot overwrite each other's changes. Where
+    fcntl is unavailable the lock only covers this process.
+    """
+    lock_path = os.path.abspath(f"{path}.lock")
+    held = _held.__dict__.setdefault("paths", set())
+    if lock_path in held:
+        # A nested save within a held lock; a second flock would wait on ourselves.
+        yield
+        return
+
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with _process_locks_lock:
+        process_lock = _process_locks.setdefault(lock_path, threading.Lock())
+    with process_lock, open(lock_path, "a") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        held.add(lock_path)
+        try:
+            yield
+        finally:
+            held.discard(lock_path)
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _current_digest(path: str, digest_of) -> Optional[str]:
+    """Get the digest of a file's content, from the cache while the file is unchanged."""
+    key = file_signature(path)
+    if key is None:
+        return None
+
+    cached = _digests.get(path)
+    if cached and cached[1] == key:
+        return cached[0]
+
+    with open(path, "rb") as f:
+        content = f.read()
+    try:
+        digest = digest_of(content)
+    except ValueError:
+        # Unreadable content is never equal to what we write.
+        return None
+    _digests[path] = (digest, key)
+    return digest
+
+
+def _rotate_backups(path: str, backups: int):
+    """Shift the backups one generation and keep the current file as the newest."""
+    for generation in range(backups - 1, 0, -1):
+        older = backup_path(path, generation)
+        if os.path.exists(older):
+            os.replace(older, backup_path(path, generation + 1))
+
+    newest = backup_path(path)
+    try:
+        os.link(path, newest)
+    except OSError:
+        # No hard links, e.g. on Android shared storage.
+        shutil.copy2(path, newest)
+
+
+def _fsync_directory(directory: str):
+    """Make a rename in a directory durable where the platform allows it."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _replace(path: str, content: bytes, backups: int):
+    """Atomically replace a file's content. Called with the lock held."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp",
+                                    dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+            if backups > 0:
+                _rotate_backups(path, backups)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(directory)
+
+
+def write_file(path: str, content, backups: int = 0) -> bool:
+    """Durably write a file unless it already has this content.
+
+    Args:
+        path: File to write
+        content: New content, str or bytes
+        backups: Earlier generations to keep as ``<path>.backup``,
+            ``<path>.backup.2`` and so on
+
+    Returns:
+        bool: True if the file was written, False if it was unchanged
+
+    Raises:
+        OSError: If the file could not be written
+    """
+    if isinstance(content, str):
+        content = content.encode()
+    digest = hashlib.sha256(content).hexdigest()
+
+    with _lock:
+        if _current_digest(path, lambda old: hashlib.sha256(old).hexdigest()) == digest:
+            return False
+        _replace(path, content, backups)
+        _digests[path] = (digest, file_signature(path))
+    return True
+
+
+def _encode_json(data: Dict, compact: bool) -> bytes:
+    """Serialize a JSON document the way write_json stores it."""
+    if compact:
+        return json.dumps(data, separators=(",", ":")).encode()
+    return json.dumps(data, indent=2).encode()
+
+
+def write_json(path: str, data: Dict, compact: bool = False, backups: int = 0,
+               stamp_field: str = None) -> bool:
+    """Durably write a JSON document unless its content is unchanged.
+
+    Args:
+        path: File to write
+        data: Document to store
+        compact: Whether to drop the indentation, for smaller, faster writes
+        backups: Earlier generations to keep, as for write_file
+        stamp_field: Key set to the time of the write; it does not count as
+            a change, so an unchanged document keeps its old stamp
+
+    Returns:
+        bool: True if the file was written, False if it was unchanged
+
+    Raises:
+        OSError: If the file could not be written
+    """
+    data = {key: value for key, value in data.items() if key != stamp_field}
+    digest = hashlib.sha256(_encode_json(data, compact)).hexdigest()
+
+    def digest_of(old: bytes) -> str:
+        document = json.loads(old)
+        if not isinstance(document, dict):
+            raise ValueError("not a JSON object")
+        document.pop(stamp_field, None)
+        return hashlib.sha256(_encode_json(document, compact)).hexdigest()
+
+    with _lock:
+        if _current_digest(path, digest_of) == digest:
+            return False
+        if stamp_field:
+            data[stamp_field] = datetime.now().isoformat()
+        _replace(path, _encode_json(data, compact), backups)
+        # Cache the digest without the stamp, as digest_of computes it.
+        _digests[path] = (digest, file_signature(path))
+    return True
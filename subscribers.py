@@ -0,0 +1,231 @@
+"""
+Subscriber Module for NOVAXA Bot
+-------------------------------
+This module keeps a persistent registry of the users and chats the bot has
+seen, so broadcasts know who to send to.
+
+Subscribers are stored in SQLite, indexed by status so active recipients can
+be streamed in pages without loading the whole table.
+"""
+
+import os
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=logging.INFO,
+)
+logger = logging.getLogger(__name__)
+
+STATUS_ACTIVE = "active"
+STATUS_BLOCKED = "blocked"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribers (
+    chat_id INTEGER PRIMARY KEY,
+    user_id INTEGER,
+    chat_type TEXT,
+    username TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'active'
+);
+CREATE INDEX IF NOT EXISTS idx_subscribers_status ON subscribers (status, chat_id);
+CREATE INDEX IF NOT EXISTS idx_subscribers_user ON subscribers (user_id);
+"""
+
+
+class SubscriberStore:
+    """Class for storing the chats a broadcast can reach."""
+
+    def __init__(self, db_file: str = "data/subscribers.db", touch_interval: float = 3600):
+        """Initialize the subscriber store.
+
+        Args:
+            db_file: Path to the SQLite database
+            touch_interval: Seconds before a known chat's last_seen is refreshed
+        """
+        self.db_file = db_file
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+        self._recent = {}
+        self._connection = None
+
+        logger.info("Subscriber store initialized")
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """The database connection, opened on first use rather than at startup."""
+        with self._connect_lock:
+            if self._connection is None:
+                if os.path.dirname(self.db_file):
+                    os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+
+                conn = sqlite3.connect(self.db_file, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(SCHEMA)
+                conn.commit()
+                self._connection = conn
+            return self._connection
+
+    def record(self, chat_id: int, user_id: int = None, chat_type: str = None,
+               username: str = None, force: bool = False) -> bool:
+        """Record that a chat was seen.
+
+        Chats seen within ``touch_interval`` are skipped without touching the
+        database unless ``force`` is set. Seeing a blocked chat again makes it
+        active, since the user has evidently unblocked the bot.
+
+        Args:
+            chat_id: Telegram chat ID
+            user_id: Telegram user ID of the sender
+            chat_type: private, group, supergroup or channel
+            username: Username or chat title
+            force: Write even if the chat was seen recently
+
+        Returns:
+            bool: True if the database was written
+        """
+        now = time.monotonic()
+        if not force and now - self._recent.get(chat_id, float("-inf")) < self.touch_interval:
+            return False
+
+        timestamp = datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO subscribers (chat_id, user_id, chat_type, username, first_seen, last_seen, status) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(chat_id) DO UPDATE SET "
+                "user_id = COALESCE(excluded.user_id, user_id), "
+                "chat_type = COALESCE(excluded.chat_type, chat_type), "
+                "username = COALESCE(excluded.username, username), "
+                "last_seen = excluded.last_seen, status = excluded.status",
+                (chat_id, user_id, chat_type, username, timestamp, timestamp, STATUS_ACTIVE),
+            )
+            self._conn.commit()
+            self._recent[chat_id] = now
+
+        return True
+
+    def record_update(self, raw: Dict) -> bool:
+        """Record the chat of a raw Bot API update, if it has one.
+
+        Args:
+            raw: Update as decoded from the Bot API JSON
+
+        Returns:
+            bool: True if the database was written
+        """
+        for key, payload in raw.items():
+            if key == "update_id" or not isinstance(payload, dict):
+                continue
+            if "message" in payload and isinstance(payload["message"], dict):
+                # Callback queries carry the chat on their message.
+                chat = payload["message"].get("chat")
+            else:
+                chat = payload.get("chat")
+            if not chat:
+                return False
+
+            sender = payload.get("from") or {}
+            return self.record(
+                chat["id"],
+                user_id=sender.get("id"),
+                chat_type=chat.get("type"),
+                username=chat.get("username") or chat.get("title"),
+            )
+        return False
+
+    def mark_blocked(self, chat_id: int):
+        """Mark a chat as unreachable so broadcasts skip it."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE subscribers SET status = ? WHERE chat_id = ?",
+                (STATUS_BLOCKED, chat_id),
+            )
+            self._conn.commit()
+            self._recent.pop(chat_id, None)
+
+        logger.info(f"Chat {chat_id} marked as blocked")
+
+    def get(self, chat_id: int) -> Optional[Dict]:
+        """Get a subscriber record."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT chat_id, user_id, chat_type, username, first_seen, last_seen, status "
+                "FROM subscribers WHERE chat_id = ?",
+                (chat_id,),
+            )
+            row = cursor.fetchone()
+
+        if not row:
+            return None
+
+        keys = ("chat_id", "user_id", "chat_type", "username", "first_seen", "last_seen", "status")
+        return dict(zip(keys, row))
+
+    def count(self, status: str = STATUS_ACTIVE) -> int:
+        """Count subscribers with a status, or all of them for None."""
+        with self._lock:
+            if status is None:
+                cursor = self._conn.execute("SELECT COUNT(*) FROM subscribers")
+            else:
+                cursor = self._conn.execute(
+                    "SELECT COUNT(*) FROM subscribers WHERE status = ?", (status,)
+                )
+            return cursor.fetchone()[0]
+
+    def page(self, after: int = None, limit: int = 500) -> List[int]:
+        """Get one page of active chat IDs in ascending order.
+
+        Args:
+            after: Only return chat IDs greater than this one
+            limit: Page size
+
+        Returns:
+            list: Chat IDs
+        """
+        with self._lock:
+            if after is None:
+                cursor = self._conn.execute(
+                    "SELECT chat_id FROM subscribers WHERE status = ? ORDER BY chat_id LIMIT ?",
+                    (STATUS_ACTIVE, limit),
+                )
+            else:
+                cursor = self._conn.execute(
+                    "SELECT chat_id FROM subscribers WHERE status = ? AND chat_id > ? "
+                    "ORDER BY chat_id LIMIT ?",
+                    (STATUS_ACTIVE, after, limit),
+                )
+            return [row[0] for row in cursor.fetchall()]
+
+    def iter_active(self, after: int = None, page_size: int = 500) -> Iterator[int]:
+        """Stream active chat IDs page by page.
+
+        Args:
+            after: Resume after this chat ID
+            page_size: Rows fetched per query
+
+        Yields:
+            int: Chat ID
+        """
+        while True:
+            chat_ids = self.page(after, page_size)
+            if not chat_ids:
+                return
+            yield from chat_ids
+            after = chat_ids[-1]
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock, self._connect_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -56,7 +56,7 @@ def system_status():
     print("-" * 50)
     
     if monitor_available:
-        monitor = SystemMonitor()
+        monitor = SystemMonitor(sample_interval=0)
         status = monitor.get_system_status()
         
         print(f"Status: {status['status']}")
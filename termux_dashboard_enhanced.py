@@ -10,9 +10,12 @@ import sys
 import json
 import time
 import getpass
+import secrets
 import subprocess
 from datetime import datetime
 
+from statefile import write_file
+
 security_available = False
 try:
     from security import TokenManager, SecurityMonitor, IPProtection
@@ -59,7 +62,7 @@ def system_status():
     print("-" * 50)
     
     if monitor_available:
-        monitor = SystemMonitor()
+        monitor = SystemMonitor(sample_interval=0)
         status = monitor.get_system_status()
         
         print(f"Status: {status['status']}")
@@ -481,34 +484,45 @@ def generate_new_master_key():
     print("🔐 Generate New Master Key")
     print("-" * 50)
     
-    confirm = input("This will generate a new master key. All existing tokens will need to be re-added. Continue? (y/n): ")
+    confirm = input("This will generate a new master key and re-encrypt all tokens with it. Continue? (y/n): ")
     
     if confirm.lower() != "y":
         print("Operation cancelled.")
         return
     
     try:
-        timestamp = int(time.time())
-        new_master_key = f"novaxa_secure_master_key_{timestamp}"
+        master_key = os.environ.get("NOVAXA_MASTER_KEY")
+        if not master_key:
+            print("NOVAXA_MASTER_KEY not set in environment.")
+            master_key = getpass.getpass("Enter current master key: ")
+        
+        new_master_key = secrets.token_urlsafe(32)
+        # Shown first: if saving .env fails, the tokens need this key.
+        print(f"New master key: {new_master_key}")
+        
+        token_manager = TokenManager(master_key=master_key)
+        rekeyed = token_manager.rekey(new_master_key)
         
         env_file = ".env"
+        lines = []
         if os.path.exists(env_file):
             with open(env_file, "r") as f:
                 lines = f.readlines()
-            
-            with open(env_file, "w") as f:
-                for line in lines:
-                    if line.startswith("NOVAXA_MASTER_KEY="):
-                        f.write(f"NOVAXA_MASTER_KEY={new_master_key}\n")
-                    else:
-                        f.write(line)
+        entry = f"NOVAXA_MASTER_KEY={new_master_key}\n"
+        lines = [entry if line.startswith("NOVAXA_MASTER_KEY=") else line for line in lines]
+        if entry not in lines:
+            if lines and not lines[-1].endswith("\n"):
+                lines[-1] += "\n"
+            lines.append(entry)
+        write_file(env_file, "".join(lines), backups=1)
         
         os.environ["NOVAXA_MASTER_KEY"] = new_master_key
         
-        print(f"✅ New master key generated: {new_master_key}")
-        print("Please restart the bot and re-add your tokens.")
-        
-        export_all_tokens()
+        print(f"✅ Re-encrypted {rekeyed} tokens under the new master key.")
+        print("Please restart the bot to use the new key.")
+    
+    except ValueError as e:
+        print(f"Tokens unchanged: {e}. Check the current master key.")
     
     except Exception as e:
         print(f"Error generating new master key: {e}")
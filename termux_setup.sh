@@ -44,6 +44,10 @@ PORT=8443
 
 ADMIN_IDS=
 OWNER_ID=
+
+# Battery saving: longer polls and paused background jobs while idle
+ENERGY_SAVER=true
+LATENCY_TARGET=60
 ENVEOF
     echo "✅ .env file created."
 fi
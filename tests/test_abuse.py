@@ -0,0 +1,124 @@
+"""
+Test Suite for the NOVAXA abuse detector
+---------------------------------------
+This module contains unit tests for rate-based temporary bans.
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from abuse import AbuseDetector
+from dispatch import UpdatePipeline
+from eventlog import EventBus
+from metrics import MetricsRegistry
+
+
+def denied(user_id, event_type="unauthorized_broadcast"):
+    return {"type": event_type, "details": {}, "user_id": user_id}
+
+
+def message(update_id, user_id):
+    return {"update_id": update_id,
+            "message": {"message_id": update_id, "from": {"id": user_id},
+                        "chat": {"id": user_id, "type": "private"}, "text": "/broadcast hi"}}
+
+
+class TestAbuseDetector(unittest.TestCase):
+    """Test cases for the AbuseDetector class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.now = 1000.0
+        self.notify = MagicMock()
+        self.metrics = MetricsRegistry()
+        self.detector = AbuseDetector(threshold=3, window=10.0, ban_duration=60.0,
+                                      exempt_ids=[1], notify=self.notify, metrics=self.metrics,
+                                      clock=lambda: self.now)
+
+    def attempt(self, user_id, times, every=1.0, event_type="unauthorized_broadcast"):
+        for _ in range(times):
+            self.detector.observe(denied(user_id, event_type))
+            self.now += every
+
+    def test_threshold_within_window_bans(self):
+        """Test that only attempts inside the sliding window count."""
+        self.attempt(2, 3, every=6.0)
+        self.assertFalse(self.detector.is_banned(2))
+
+        self.attempt(2, 2, event_type="owner_verification_failed")
+        self.assertTrue(self.detector.is_banned(2))
+        self.assertEqual(self.metrics.get_counter("abuse_bans"), 1)
+
+    def test_other_events_and_exempt_users_ignored(self):
+        """Test that harmless events and the owner never lead to a ban."""
+        self.attempt(2, 5, event_type="feature_usage")
+        self.attempt(1, 5)
+        self.detector.observe(denied(None))
+
+        self.assertFalse(self.detector.is_banned(2))
+        self.assertFalse(self.detector.is_banned(1))
+        self.assertEqual(self.detector.stats()["tracked"], 0)
+
+    def test_tracked_users_bounded(self):
+        """Test that the least recently seen users are forgotten past the limit."""
+        self.detector.max_users = 10
+        for user_id in range(100, 150):
+            self.attempt(user_id, 1)
+        self.assertEqual(self.detector.stats()["tracked"], 10)
+
+    def test_ban_expires_and_digest_batches(self):
+        """Test that bans and unbans reach the owner in one message per digest."""
+        self.attempt(2, 3)
+        self.attempt(3, 3)
+        self.detector.send_digest()
+
+        self.notify.assert_called_once()
+        text = self.notify.call_args[0][0]
+        self.assertIn("Banned 2", text)
+        self.assertIn("Banned 3", text)
+
+        self.now += 61
+        self.detector.send_digest()
+        self.assertIn("Unbanned 2", self.notify.call_args[0][0])
+        self.assertFalse(self.detector.is_banned(2))
+
+        self.detector.send_digest()
+        self.assertEqual(self.notify.call_count, 2)
+
+    def test_digest_capped(self):
+        """Test that a flood of bans is summarized beyond the digest limit."""
+        self.detector.max_digest = 2
+        for user_id in range(10, 15):
+            self.attempt(user_id, 3)
+        self.detector.send_digest()
+        self.assertIn("and 3 more", self.notify.call_args[0][0])
+
+    def test_bus_feeds_pipeline_gate(self):
+        """Test that a banned user's updates are dropped before observers see them."""
+        bus = EventBus()
+        self.detector.attach(bus)
+        observer = MagicMock()
+        pipeline = UpdatePipeline(None, metrics=self.metrics, process=MagicMock(),
+                                  observers=[observer], blocklist=self.detector)
+
+        self.assertTrue(pipeline.submit(message(1, 2)))
+        for _ in range(3):
+            bus.publish(denied(2))
+        self.assertFalse(pipeline.submit(message(2, 2)))
+        self.assertTrue(pipeline.submit(message(3, 4)))
+
+        self.assertEqual(observer.call_count, 2)
+        self.assertEqual(self.metrics.get_counter("updates_ignored", {"reason": "banned"}), 1)
+
+        self.detector.detach(bus)
+        for _ in range(3):
+            bus.publish(denied(4))
+        self.assertFalse(self.detector.is_banned(4))
+
+
+if __name__ == "__main__":
+    unittest.main()
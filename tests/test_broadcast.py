@@ -0,0 +1,293 @@
+"""
+Test Suite for NOVAXA broadcasts
+-------------------------------
+This module contains unit tests for the subscriber store and broadcast engine.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subscribers import SubscriberStore
+from broadcast import (
+    BroadcastEngine, BroadcastJobStore, BroadcastManager, RateLimiter,
+    JOB_COMPLETED, JOB_PAUSED, JOB_RUNNING,
+)
+from metrics import MetricsRegistry
+
+
+class ApiError(Exception):
+    """Stand-in for telebot's ApiTelegramException."""
+
+    def __init__(self, error_code, retry_after=None):
+        super().__init__(f"Error {error_code}")
+        self.error_code = error_code
+        self.result_json = {"parameters": {"retry_after": retry_after}} if retry_after else {}
+
+
+class TestSubscriberStore(unittest.TestCase):
+    """Test cases for the SubscriberStore class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = SubscriberStore(os.path.join(self.tmpdir, "subscribers.db"))
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.store.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_record_skips_recently_seen(self):
+        """Test that repeat sightings do not hit the database."""
+        self.assertTrue(self.store.record(1, user_id=1, chat_type="private"))
+        self.assertFalse(self.store.record(1, user_id=1))
+        self.assertTrue(self.store.record(1, force=True))
+        self.assertEqual(self.store.count(), 1)
+        self.assertEqual(self.store.get(1)["chat_type"], "private")
+
+    def test_record_update(self):
+        """Test recording chats from raw updates."""
+        self.store.record_update({"update_id": 1, "message": {
+            "from": {"id": 7}, "chat": {"id": -100, "type": "group", "title": "Team"}}})
+        self.store.record_update({"update_id": 2, "callback_query": {
+            "from": {"id": 8}, "message": {"chat": {"id": 8, "type": "private"}}}})
+        self.store.record_update({"update_id": 3, "poll": {"id": "x"}})
+
+        self.assertEqual(self.store.get(-100)["username"], "Team")
+        self.assertEqual(self.store.get(8)["user_id"], 8)
+        self.assertEqual(self.store.count(None), 2)
+
+    def test_iter_active_pages_and_skips_blocked(self):
+        """Test streaming active chats in pages."""
+        for chat_id in range(1, 8):
+            self.store.record(chat_id)
+        self.store.mark_blocked(3)
+
+        self.assertEqual(self.store.page(limit=2), [1, 2])
+        self.assertEqual(list(self.store.iter_active(page_size=2)), [1, 2, 4, 5, 6, 7])
+        self.assertEqual(list(self.store.iter_active(after=5)), [6, 7])
+
+        # Seeing a blocked chat again reactivates it.
+        self.store.record(3)
+        self.assertEqual(self.store.get(3)["status"], "active")
+
+
+class TestBroadcastEngine(unittest.TestCase):
+    """Test cases for the BroadcastEngine class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = SubscriberStore(os.path.join(self.tmpdir, "subscribers.db"))
+        for chat_id in range(1, 11):
+            self.store.record(chat_id)
+        self.bot = MagicMock()
+        self.engine = BroadcastEngine(self.bot, self.store, rate=1000, workers=3,
+                                      page_size=4, metrics=MetricsRegistry())
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.store.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_sends_to_every_active_subscriber(self):
+        """Test that every active chat receives the message once."""
+        progress = []
+        stats = self.engine.run("hello", on_progress=progress.append)
+
+        sent_to = sorted(call.args[0] for call in self.bot.send_message.call_args_list)
+        self.assertEqual(sent_to, list(range(1, 11)))
+        self.assertEqual(stats["sent"], 10)
+        self.assertEqual(progress[-1]["done"], 10)
+
+    def test_blocked_chats_are_marked_and_skipped(self):
+        """Test that a 403 marks the chat so the next broadcast skips it."""
+        def send(chat_id, text, parse_mode=None):
+            if chat_id == 4:
+                raise ApiError(403)
+
+        self.bot.send_message.side_effect = send
+        stats = self.engine.run("hello")
+
+        self.assertEqual(stats["blocked"], 1)
+        self.assertEqual(self.store.get(4)["status"], "blocked")
+
+        self.bot.send_message.reset_mock()
+        self.bot.send_message.side_effect = None
+        self.assertEqual(self.engine.run("again")["sent"], 9)
+
+    def test_retries_after_flood_wait(self):
+        """Test that a 429 pauses the limiter and retries."""
+        attempts = []
+
+        def send(chat_id, text, parse_mode=None):
+            attempts.append(chat_id)
+            if attempts.count(chat_id) == 1 and chat_id == 1:
+                raise ApiError(429, retry_after=0.05)
+
+        self.bot.send_message.side_effect = send
+        stats = self.engine.run("hello")
+
+        self.assertEqual(stats["sent"], 10)
+        self.assertEqual(attempts.count(1), 2)
+
+
+class TestBroadcastJobs(unittest.TestCase):
+    """Test cases for persisted, resumable broadcast jobs."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = SubscriberStore(os.path.join(self.tmpdir, "subscribers.db"))
+        for chat_id in range(1, 21):
+            self.store.record(chat_id)
+        self.jobs = BroadcastJobStore(os.path.join(self.tmpdir, "broadcasts.db"))
+        self.bot = MagicMock()
+        self.bot.send_message.return_value.message_id = 99
+        self.engine = BroadcastEngine(self.bot, self.store, rate=1000, workers=2,
+                                      metrics=MetricsRegistry())
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.store.close()
+        self.jobs.close()
+        shutil.rmtree(self.tmpdir)
+
+    def wait_for(self, job_id, statuses, timeout=5):
+        """Wait until a job reaches one of the given statuses."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.jobs.get_status(job_id) in statuses:
+                return self.jobs.get(job_id)
+            time.sleep(0.01)
+        self.fail(f"Job {job_id} stuck in {self.jobs.get_status(job_id)}")
+
+    def recipients(self):
+        """Chat IDs the broadcast text was sent to."""
+        return [call.args[0] for call in self.bot.send_message.call_args_list
+                if call.args[1] == "hello"]
+
+    def test_checkpoint_cursor_is_contiguous(self):
+        """Test that the cursor never passes an unprocessed recipient."""
+        checkpoints = []
+        self.engine.run("hello", checkpoint_every=5,
+                        on_checkpoint=lambda cursor, stats: checkpoints.append((cursor, stats["done"])))
+
+        for cursor, done in checkpoints:
+            self.assertLessEqual(cursor or 0, done)
+        self.assertEqual(checkpoints[-1], (20, 20))
+
+    def test_job_runs_to_completion_and_edits_progress(self):
+        """Test a queued job with a live progress message."""
+        manager = BroadcastManager(self.engine, self.jobs, checkpoint_every=5, progress_interval=0)
+        job_id = manager.submit("hello", created_by=1, progress_chat_id=1)
+
+        job = self.wait_for(job_id, [JOB_COMPLETED])
+        self.assertEqual(job["sent"], 20)
+        self.assertEqual(job["cursor"], 20)
+        self.assertEqual(job["progress_message_id"], 99)
+        self.assertTrue(self.bot.edit_message_text.called)
+        self.assertEqual(sorted(self.recipients()), list(range(1, 21)))
+
+    def test_resume_after_restart_skips_checkpointed_recipients(self):
+        """Test that a job interrupted mid-run resumes from its cursor."""
+        job_id = self.jobs.create("hello", total=20)
+        self.jobs.set_status(job_id, JOB_RUNNING)
+        self.jobs.checkpoint(job_id, 12, {"sent": 12, "blocked": 0, "failed": 0})
+
+        manager = BroadcastManager(self.engine, self.jobs)
+        manager.recover()
+
+        job = self.wait_for(job_id, [JOB_COMPLETED])
+        self.assertEqual(sorted(self.recipients()), list(range(13, 21)))
+        self.assertEqual(job["sent"], 20)
+
+    def test_pause_from_another_process_and_resume(self):
+        """Test pausing through the store, as the dashboard does."""
+        gate = []
+
+        def send(chat_id, text, parse_mode=None):
+            if chat_id == 6 and not gate:
+                gate.append(chat_id)
+                self.jobs.apply(job_id, "pause")
+            time.sleep(0.01)
+
+        self.bot.send_message.side_effect = send
+        manager = BroadcastManager(self.engine, self.jobs, checkpoint_every=2)
+        job_id = self.jobs.create("hello", total=20)
+        manager.poll()
+
+        self.wait_for(job_id, [JOB_PAUSED])
+        while manager.active_job_id:
+            time.sleep(0.01)
+        self.assertLess(len(self.recipients()), 20)
+
+        self.assertTrue(manager.resume(job_id))
+        self.wait_for(job_id, [JOB_COMPLETED])
+        while manager.active_job_id:
+            time.sleep(0.01)
+
+        self.assertEqual(set(self.recipients()), set(range(1, 21)))
+        # Only chats in flight at the checkpoint may be sent twice.
+        self.assertLessEqual(len(self.recipients()) - 20, self.engine.workers * 2)
+
+    def test_shutdown_suspends_job_for_next_process(self):
+        """Test that a job stopped at shutdown resumes from its checkpoint after a restart."""
+        def send(chat_id, text, parse_mode=None):
+            time.sleep(0.02)
+
+        self.bot.send_message.side_effect = send
+        manager = BroadcastManager(self.engine, self.jobs, checkpoint_every=2)
+        job_id = self.jobs.create("hello", total=20)
+        manager.poll()
+        time.sleep(0.1)
+
+        suspended = manager.shutdown(timeout=5)
+
+        self.assertEqual(suspended["job_id"], job_id)
+        self.assertTrue(suspended["checkpointed"])
+        self.assertEqual(self.jobs.get_status(job_id), JOB_RUNNING)
+        manager.poll()
+        self.assertIsNone(manager.active_job_id)
+        sent_before = set(self.recipients())
+        self.assertLess(len(sent_before), 20)
+
+        self.bot.send_message.side_effect = None
+        restarted = BroadcastManager(self.engine, self.jobs)
+        restarted.recover()
+
+        job = self.wait_for(job_id, [JOB_COMPLETED])
+        self.assertEqual(set(self.recipients()), set(range(1, 21)))
+        self.assertGreater(job["cursor"], suspended["cursor"] or 0)
+
+    def test_control_rejects_invalid_transitions(self):
+        """Test that finished jobs cannot be resumed or cancelled."""
+        job_id = self.jobs.create("hello")
+        self.jobs.set_status(job_id, JOB_COMPLETED)
+
+        self.assertFalse(self.jobs.apply(job_id, "resume"))
+        self.assertFalse(self.jobs.apply(job_id, "cancel"))
+        self.assertEqual(self.jobs.get_status(job_id), JOB_COMPLETED)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test cases for the RateLimiter class."""
+
+    def test_limits_rate(self):
+        """Test that tokens are handed out at the configured rate."""
+        limiter = RateLimiter(rate=50, burst=1)
+        started = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,400 @@
+"""
+Test Suite for the NOVAXA dispatch pipeline
+------------------------------------------
+This module contains unit tests for the command router and update pipeline.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dispatch import (
+    AdaptivePollTimeout, CommandRouter, OffsetStore, IgnorePolicy, UpdatePipeline,
+    allowed_updates_for, parse_deadlines, remaining_time, current_deadline, LANE_PRIORITY, LANE_NORMAL, LANE_EXPENDABLE,
+)
+from metrics import MetricsRegistry
+
+
+class FakeBot:
+    """Minimal stand-in for telebot.TeleBot handler registration."""
+
+    def __init__(self):
+        self.message_handlers = []
+        self.callback_query_handlers = []
+        self.reply_to = MagicMock()
+        self.answer_callback_query = MagicMock()
+
+    def message_handler(self, commands=None, **kwargs):
+        def decorator(handler):
+            self.message_handlers.append((commands, handler))
+            return handler
+        return decorator
+
+    def callback_query_handler(self, **kwargs):
+        def decorator(handler):
+            self.callback_query_handlers.append(handler)
+            return handler
+        return decorator
+
+
+class TestCommandRouter(unittest.TestCase):
+    """Test cases for the CommandRouter class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.bot = FakeBot()
+        self.metrics = MetricsRegistry()
+        self.router = CommandRouter(self.bot, deadlines={"slow": 0.1},
+                                    default_deadline=1.0, metrics=self.metrics)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.router.shutdown()
+
+    def test_fast_handler_returns_result(self):
+        """Test that a handler within its deadline runs normally."""
+        @self.router.message_handler(commands=["fast"])
+        def handle_fast(message):
+            return "done"
+
+        self.assertEqual(self.bot.message_handlers[0][0], ["fast"])
+        self.assertEqual(handle_fast(MagicMock()), "done")
+        self.bot.reply_to.assert_not_called()
+        self.assertEqual(self.metrics.get_counter("handler_overruns", {"command": "fast"}), 0)
+
+    def test_overrun_sends_fallback_and_records_command(self):
+        """Test that an overrunning handler is abandoned with a fallback reply."""
+        @self.router.message_handler(commands=["slow"])
+        def handle_slow(message):
+            time.sleep(0.5)
+
+        message = MagicMock()
+        started = time.monotonic()
+        handle_slow(message)
+
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.bot.reply_to.assert_called_once_with(message, self.router.fallback_text)
+        self.assertEqual(self.metrics.get_counter("handler_overruns", {"command": "slow"}), 1)
+
+    def test_deadline_visible_inside_handler(self):
+        """Test that handlers can bound their own I/O by the deadline."""
+        seen = {}
+
+        @self.router.message_handler(commands=["slow"])
+        def handle_slow(message):
+            seen["deadline"] = current_deadline()
+            seen["remaining"] = remaining_time(30)
+
+        handle_slow(MagicMock())
+
+        self.assertEqual(seen["deadline"].name, "slow")
+        self.assertLessEqual(seen["remaining"], 0.1)
+        self.assertIsNone(current_deadline())
+
+    def test_callback_overrun_answers_query(self):
+        """Test that an overrunning callback handler answers the query."""
+        @self.router.callback_query_handler(name="slow", func=lambda call: True)
+        def callback(call):
+            time.sleep(0.5)
+
+        call = MagicMock()
+        callback(call)
+
+        self.bot.answer_callback_query.assert_called_once_with(call.id, self.router.fallback_text)
+
+    def test_hung_handlers_do_not_starve_pool(self):
+        """Test that handlers ignoring their deadline do not block new ones."""
+        router = CommandRouter(self.bot, deadlines={"hang": 0.1}, max_workers=2,
+                               metrics=self.metrics)
+        release = threading.Event()
+
+        @router.message_handler(commands=["hang"])
+        def handle_hang(message):
+            release.wait(5)
+
+        @router.message_handler(commands=["fast"])
+        def handle_fast(message):
+            return "done"
+
+        try:
+            handle_hang(MagicMock())
+            handle_hang(MagicMock())
+            self.assertEqual(self.metrics.get_gauge("handlers_abandoned_running"), 2)
+            self.assertEqual(handle_fast(MagicMock()), "done")
+        finally:
+            release.set()
+            router.shutdown()
+
+        deadline = time.monotonic() + 2
+        while router.executor.detached and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.metrics.get_gauge("handlers_abandoned_running"), 0)
+
+    def test_parse_deadlines(self):
+        """Test parsing a deadline spec from the environment."""
+        self.assertEqual(parse_deadlines("log=5, /broadcast=30,bad=x,junk"),
+                         {"log": 5.0, "broadcast": 30.0})
+        self.assertEqual(parse_deadlines(""), {})
+
+
+def make_update(update_id, user_id, kind="message", text="hi"):
+    """Build a raw Bot API update."""
+    return {"update_id": update_id, kind: {"from": {"id": user_id}, "text": text}}
+
+
+class TestUpdatePipeline(unittest.TestCase):
+    """Test cases for the UpdatePipeline class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.processed = []
+        self.metrics = MetricsRegistry()
+        self.pipeline = UpdatePipeline(None, privileged_ids=[1, 0], max_pending=2,
+                                       workers=1, metrics=self.metrics,
+                                       process=self.processed.append)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.pipeline.stop()
+
+    def test_classify(self):
+        """Test lane selection by sender and update type."""
+        self.assertEqual(self.pipeline.classify(make_update(1, 1)), LANE_PRIORITY)
+        self.assertEqual(self.pipeline.classify(make_update(2, 5)), LANE_NORMAL)
+        self.assertEqual(self.pipeline.classify(make_update(3, 5, "edited_message")), LANE_EXPENDABLE)
+        self.assertEqual(self.pipeline.classify(make_update(4, 1, "edited_message")), LANE_PRIORITY)
+        self.assertEqual(self.pipeline.classify({"update_id": 5, "channel_post": {}}), LANE_EXPENDABLE)
+
+    def test_priority_dequeued_first(self):
+        """Test that owner and admin updates jump the queue."""
+        self.pipeline.submit(make_update(1, 5))
+        self.pipeline.submit(make_update(2, 5, "edited_message"))
+        self.pipeline.submit(make_update(3, 1))
+
+        self.pipeline.start()
+        deadline = time.time() + 2
+        while len(self.processed) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual([u["update_id"] for u in self.processed], [3, 1, 2])
+
+    def test_sheds_most_expendable_first(self):
+        """Test that overload drops expendable updates before normal ones."""
+        self.assertTrue(self.pipeline.submit(make_update(1, 5, "edited_message")))
+        self.assertTrue(self.pipeline.submit(make_update(2, 5)))
+        self.assertTrue(self.pipeline.submit(make_update(3, 6)))
+
+        self.assertEqual(self.pipeline.pending(), 2)
+        self.assertEqual(self.metrics.get_counter("updates_shed",
+                                                  {"lane": "expendable", "type": "edited_message"}), 1)
+
+        # A new expendable update cannot displace normal traffic.
+        self.assertFalse(self.pipeline.submit(make_update(4, 5, "edited_message")))
+
+    def test_priority_never_shed(self):
+        """Test that the priority lane bypasses the backlog limit."""
+        for update_id in range(5):
+            self.pipeline.submit(make_update(update_id, 5))
+        for update_id in range(5, 10):
+            self.assertTrue(self.pipeline.submit(make_update(update_id, 1)))
+
+        self.assertEqual(len(self.pipeline.lanes[LANE_PRIORITY]), 5)
+        self.assertEqual(len(self.pipeline.lanes[LANE_NORMAL]), 2)
+
+    def test_drain_waits_for_queued_and_running_updates(self):
+        """Test that drain returns only once every update has been handled."""
+        self.pipeline.process = lambda raw: (time.sleep(0.05), self.processed.append(raw))
+        self.pipeline.submit(make_update(1, 5))
+        self.pipeline.submit(make_update(2, 5))
+
+        self.assertFalse(self.pipeline.drain(timeout=0.01))
+        self.pipeline.start()
+        self.assertTrue(self.pipeline.drain(timeout=2))
+        self.assertEqual(len(self.processed), 2)
+
+    def test_held_intake_never_polls(self):
+        """Test that no getUpdates call is made once hold() has returned."""
+        bot = MagicMock()
+        bot.token = "123:abc"
+        pipeline = UpdatePipeline(bot, workers=1, metrics=self.metrics,
+                                  process=self.processed.append)
+        calls = []
+
+        def get_updates(*args, **kwargs):
+            calls.append(pipeline._intake.is_set())
+            time.sleep(0.01)
+            return []
+
+        with patch("telebot.apihelper.get_updates", side_effect=get_updates):
+            thread = threading.Thread(target=pipeline.run_polling,
+                                      kwargs={"allowed_updates": ["message"]})
+            thread.start()
+            try:
+                for _ in range(20):
+                    pipeline.hold()
+                    self.assertTrue(pipeline.drain(timeout=1))
+                    count = len(calls)
+                    time.sleep(0.02)
+                    self.assertEqual(len(calls), count)
+                    pipeline.release()
+                    time.sleep(0.01)
+            finally:
+                pipeline.stop()
+                thread.join(timeout=2)
+
+        self.assertTrue(calls)
+
+    def test_shutdown_returns_abandoned_updates(self):
+        """Test that updates left queued at the deadline are handed back."""
+        self.pipeline.process = lambda raw: (time.sleep(0.3), self.processed.append(raw))
+        self.pipeline.offset = 14
+        for update_id in (13, 11, 12):
+            self.pipeline.submit(make_update(update_id, 1))
+        self.pipeline.start()
+        time.sleep(0.05)
+
+        report = self.pipeline.shutdown(timeout=0.05)
+
+        self.assertFalse(report["drained"])
+        self.assertEqual([raw["update_id"] for raw in report["abandoned"]], [11, 12])
+        self.assertEqual((report["in_flight"], report["offset"]), (1, 14))
+        self.assertFalse(self.pipeline.submit(make_update(15, 5)))
+        self.assertEqual(self.metrics.get_counter("updates_abandoned", {"type": "message"}), 2)
+
+
+class TestAdaptivePollTimeout(unittest.TestCase):
+    """Test cases for the AdaptivePollTimeout class."""
+
+    def test_stretches_when_quiet_within_latency_target(self):
+        """Test that empty polls lengthen the timeout up to the latency target."""
+        metrics = MetricsRegistry()
+        adaptive = AdaptivePollTimeout(base=10, maximum=50, latency_target=45, metrics=metrics)
+
+        adaptive.record(0)
+        self.assertEqual(adaptive.timeout, 20)
+        adaptive.record(0)
+        adaptive.record(0)
+        self.assertEqual(adaptive.timeout, 35)
+        adaptive.record(5)
+        self.assertEqual(adaptive.timeout, 10)
+        self.assertEqual(metrics.get_gauge("wakeups_per_hour"), 4)
+
+    def test_idle_callbacks(self):
+        """Test that the bot goes idle without traffic and wakes on an update."""
+        events = []
+        adaptive = AdaptivePollTimeout(idle_after=0, on_idle=lambda: events.append("idle"),
+                                       on_active=lambda: events.append("active"),
+                                       metrics=MetricsRegistry())
+
+        adaptive.record(0)
+        adaptive.record(0)
+        adaptive.record(1)
+
+        self.assertEqual(events, ["idle", "active"])
+        self.assertFalse(adaptive.idle)
+
+
+class TestOffsetStore(unittest.TestCase):
+    """Test cases for the OffsetStore class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = OffsetStore(os.path.join(self.tmpdir, "polling.db"))
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.store.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_offset_round_trip(self):
+        """Test that offsets are kept per bot and overwritten."""
+        self.assertIsNone(self.store.get("111"))
+        self.store.set("111", 10)
+        self.store.set("111", 12)
+        self.store.set("222", 5)
+
+        self.assertEqual((self.store.get("111"), self.store.get("222")), (12, 5))
+
+    def test_restore_requeues_abandoned_updates_once(self):
+        """Test that updates abandoned at shutdown are handled by the next pipeline."""
+        report = {"drained": False, "abandoned": [make_update(8, 5), make_update(7, 1)],
+                  "in_flight": 0, "offset": 9}
+        self.store.persist("111", report)
+
+        pipeline = UpdatePipeline(None, metrics=MetricsRegistry(), process=lambda raw: None)
+        self.assertEqual(self.store.restore("111", pipeline), 2)
+        self.assertEqual(pipeline.offset, 9)
+        self.assertEqual(pipeline.pending(), 2)
+        self.assertEqual(self.store.take_pending("111"), [])
+
+    def test_restore_without_database_writes_nothing(self):
+        """Test that a first start finds nothing to restore and creates no database."""
+        pipeline = UpdatePipeline(None, metrics=MetricsRegistry(), process=lambda raw: None)
+
+        self.assertEqual(self.store.restore("111", pipeline), 0)
+        self.assertIsNone(pipeline.offset)
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+
+def make_chat_message(update_id, chat_type, text, kind="message"):
+    """Build a raw update for a message in a chat of the given type."""
+    return {"update_id": update_id,
+            kind: {"from": {"id": 5}, "chat": {"id": -100, "type": chat_type}, "text": text}}
+
+
+class TestIgnorePolicy(unittest.TestCase):
+    """Test cases for the IgnorePolicy class."""
+
+    def test_drops_group_chatter_but_keeps_commands(self):
+        """Test that only non-command group messages are dropped."""
+        policy = IgnorePolicy()
+
+        self.assertEqual(policy.reason(make_chat_message(1, "supergroup", "hello all")), "group_chatter")
+        self.assertIsNone(policy.reason(make_chat_message(2, "group", "/status@novaxa_bot")))
+        self.assertIsNone(policy.reason(make_chat_message(3, "private", "hello")))
+
+    def test_drops_edits_and_channel_posts(self):
+        """Test the edit and channel post rules."""
+        policy = IgnorePolicy()
+
+        self.assertEqual(policy.reason(make_chat_message(1, "private", "x", "edited_message")), "edits")
+        self.assertEqual(policy.reason(make_chat_message(2, "channel", "x", "channel_post")), "channel_posts")
+
+    def test_from_spec(self):
+        """Test building a policy from configuration."""
+        self.assertEqual(IgnorePolicy.from_spec("edits, bogus").rules, {"edits"})
+        self.assertEqual(IgnorePolicy.from_spec("none").rules, set())
+        self.assertEqual(len(IgnorePolicy.from_spec(None).rules), 3)
+
+    def test_allowed_updates_from_handlers(self):
+        """Test deriving allowed_updates from registered handlers."""
+        bot = FakeBot()
+        bot.message_handlers.append(([], None))
+        bot.callback_query_handlers.append(None)
+        bot.edited_message_handlers = [None]
+
+        self.assertEqual(allowed_updates_for(bot), ["message", "edited_message", "callback_query"])
+        self.assertEqual(allowed_updates_for(bot, IgnorePolicy()), ["message", "callback_query"])
+
+    def test_pipeline_counts_ignored_updates(self):
+        """Test that ignored updates never reach the queue."""
+        metrics = MetricsRegistry()
+        pipeline = UpdatePipeline(None, metrics=metrics, ignore_policy=IgnorePolicy())
+
+        self.assertFalse(pipeline.submit(make_chat_message(1, "group", "lol")))
+        self.assertTrue(pipeline.submit(make_chat_message(2, "group", "/help")))
+
+        self.assertEqual(pipeline.pending(), 1)
+        self.assertEqual(metrics.get_counter("updates_ignored", {"reason": "group_chatter"}), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,329 @@
+"""
+Test Suite for the NOVAXA bot engine
+-----------------------------------
+This module contains unit tests for presets, the shared handler registry
+and the transports.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import Engine, EngineConfig, HandlerRegistry, PRESETS, ReplayTransport, registry
+from engine.core import load_handlers
+from engine.registry import ROLE_OWNER
+from engine.transports import webhook_secret
+
+
+def command(update_id, user_id, text):
+    """Build a raw update carrying a command."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Test"},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}],
+        },
+    }
+
+
+class TestEngineConfig(unittest.TestCase):
+    """Test cases for presets and the engine configuration."""
+
+    def test_presets_use_declared_features(self):
+        """Test that every preset only enables features the registry knows."""
+        load_handlers()
+        for name, preset in PRESETS.items():
+            registry.specs(preset["features"])
+            self.assertEqual(EngineConfig(name).features, preset["features"])
+
+    def test_environment_overrides_preset(self):
+        """Test that the environment picks the transport and features."""
+        env = {"TELEGRAM_BOT_TOKEN": "111:aaa", "OWNER_ID": "7", "ADMIN_IDS": "8,x,9",
+               "WEBHOOK_ENABLED": "false", "BOT_FEATURES": "core, logs"}
+        with patch.dict(os.environ, env, clear=True):
+            config = EngineConfig.from_env("enhanced", port=9000)
+
+        self.assertEqual(config.transport, "polling")
+        self.assertEqual(config.features, ["core", "logs"])
+        self.assertEqual((config.owner_id, config.admin_ids, config.port), (7, [8, 9], 9000))
+        self.assertNotIn("token", config.to_dict())
+
+    def test_unknown_setting_rejected(self):
+        """Test that misspelled settings are not silently ignored."""
+        with self.assertRaises(TypeError):
+            EngineConfig("novaxa", webhook="https://example.com")
+        with self.assertRaises(ValueError):
+            EngineConfig("nonexistent")
+
+
+class TestHandlerRegistry(unittest.TestCase):
+    """Test cases for the HandlerRegistry class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.registry = HandlerRegistry()
+
+        @self.registry.message("a")
+        def catch_all(ctx, message):
+            pass
+
+        @self.registry.command("a", ["notify"], help="A notify")
+        def notify_a(ctx, message):
+            pass
+
+        @self.registry.command("b", ["notify", "remind"], help="B notify")
+        def notify_b(ctx, message):
+            pass
+
+        @self.registry.command("b", ["secret"], role=ROLE_OWNER, help="Owner only")
+        def secret(ctx, message):
+            pass
+
+    def test_first_feature_wins_and_messages_last(self):
+        """Test command precedence between features and catch-all placement."""
+        names = [spec.func.__name__ for spec in self.registry.specs(["a", "b"])]
+        self.assertEqual(names, ["notify_a", "secret", "catch_all"])
+
+        names = [spec.func.__name__ for spec in self.registry.specs(["b", "a"])]
+        self.assertEqual(names, ["notify_b", "secret", "catch_all"])
+
+    def test_help_entries_follow_role(self):
+        """Test that users do not see owner commands in /help."""
+        self.assertEqual([s.name for s in self.registry.help_entries(["b"], "user")], ["notify"])
+        self.assertEqual([s.name for s in self.registry.help_entries(["b"], "owner")],
+                         ["notify", "secret"])
+
+    def test_unknown_feature_rejected(self):
+        """Test that a typo in the feature list fails loudly."""
+        with self.assertRaises(ValueError):
+            self.registry.specs(["a", "c"])
+
+
+class TestEngine(unittest.TestCase):
+    """Test cases for an engine fed by the replay transport."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.config = EngineConfig(
+            "novaxa", features=["core", "tokens", "fallback"], transport="replay",
+            token="111:aaa", owner_id=1, log_file=os.path.join(self.test_dir, "bot.log"),
+            data_dir=self.test_dir,
+        )
+        self.token_manager = MagicMock()
+        self.token_manager.get_token.return_value = None
+        self.token_manager.get_tokens.return_value = []
+        self.security_monitor = MagicMock()
+        self.engine = Engine(self.config, token_manager=self.token_manager,
+                             security_monitor=self.security_monitor)
+        self.engine.bot.reply_to = MagicMock()
+        self.engine.bot.send_message = MagicMock()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.engine.router.shutdown()
+        shutil.rmtree(self.test_dir)
+
+    def replay(self, *updates):
+        transport = ReplayTransport(self.engine, list(updates), drain_timeout=5)
+        transport.run()
+        return transport
+
+    def replies(self):
+        return [call.args[1] for call in self.engine.bot.reply_to.call_args_list]
+
+    def test_building_engine_writes_no_state(self):
+        """Test that an engine without token features builds no TokenManager and no files."""
+        config = EngineConfig(
+            "novaxa", features=["core", "broadcasts", "fallback"], transport="replay",
+            token="111:aaa", owner_id=1, log_file=os.path.join(self.test_dir, "bot.log"),
+            data_dir=os.path.join(self.test_dir, "data"),
+        )
+        engine = Engine(config)
+        engine.router.shutdown()
+
+        self.assertIsNone(engine.token_manager)
+        self.assertEqual(os.listdir(self.test_dir), ["bot.log"])
+
+    def test_owner_commands_gated(self):
+        """Test that only the owner reaches the token commands."""
+        transport = self.replay(command(1, 2, "/listtokens"), command(2, 1, "/listtokens"))
+
+        self.assertEqual(transport.replayed, 2)
+        self.assertEqual(self.token_manager.get_tokens.call_count, 1)
+        self.assertEqual(len([text for text in self.replies() if "only available to the bot owner" in text]), 1)
+        self.security_monitor.log_event.assert_any_call(
+            "unauthorized_token_access", {"command": "listtokens"}, 2)
+        self.security_monitor.log_event.assert_any_call(
+            "owner_verification_failed", {"attempted_user_id": 2}, 2)
+
+    def test_abuse_detector_gates_intake(self):
+        """Test that denied requests feed the detector that gates the pipeline."""
+        self.assertIs(self.engine.pipeline.blocklist, self.engine.abuse)
+        self.security_monitor.bus.subscribe.assert_any_call(
+            self.engine.abuse.observe, "unauthorized_token_access")
+        self.assertIn(1, self.engine.abuse.exempt_ids)
+
+        self.engine.config.metrics_file = os.path.join(self.test_dir, "metrics.json")
+        self.engine.stop(timeout=0.2)
+        self.security_monitor.bus.unsubscribe.assert_any_call(
+            self.engine.abuse.observe, "unauthorized_token_access")
+
+    def test_help_lists_enabled_features_only(self):
+        """Test that /help is generated from the enabled handlers."""
+        self.replay(command(1, 1, "/help"))
+
+        help_text = self.engine.bot.send_message.call_args.args[1]
+        self.assertIn("/addtoken", help_text)
+        self.assertNotIn("/broadcast", help_text)
+
+    def test_unknown_text_reaches_fallback(self):
+        """Test that the catch-all handler answers last."""
+        raw = command(1, 2, "/nothing")
+        raw["message"]["text"] = "hello"
+        del raw["message"]["entities"]
+        self.replay(raw)
+
+        self.assertIn("I don't understand", self.replies()[0])
+
+    def test_stop_persists_state_and_reports(self):
+        """Test that a stopped engine leaves what the next one resumes from."""
+        self.engine.config.metrics_file = os.path.join(self.test_dir, "metrics.json")
+        self.engine.pipeline.offset = 42
+        self.engine.pipeline.submit(command(40, 2, "/start"))
+
+        report = self.engine.stop(timeout=0.2)
+
+        self.assertFalse(report["drained"])
+        self.assertEqual([raw["update_id"] for raw in report["abandoned"]], [40])
+        self.assertIsNone(report["broadcast"])
+        self.assertTrue(os.path.exists(self.engine.config.metrics_file))
+        self.assertEqual(self.engine.stop(), {})
+
+        restarted = Engine(self.config, token_manager=self.token_manager,
+                           security_monitor=self.security_monitor)
+        restarted.offsets.restore("111", restarted.pipeline)
+        self.assertEqual(restarted.pipeline.offset, 42)
+        self.assertEqual(restarted.pipeline.pending(), 1)
+        restarted.router.shutdown()
+
+    def test_webhook_checks_secret(self):
+        """Test that the webhook transport only queues authenticated updates."""
+        from engine.transports import WebhookTransport
+
+        transport = WebhookTransport(self.engine)
+        secret = webhook_secret("111:aaa")
+
+        self.assertEqual(transport.handle("wrong", command(1, 1, "/start")), 403)
+        self.assertEqual(transport.handle(secret, {}), 400)
+        self.assertEqual(transport.handle(secret, command(1, 1, "/start")), 200)
+        self.assertEqual(self.engine.pipeline.pending(), 1)
+
+        self.engine.pipeline.hold()
+        self.assertEqual(transport.handle(secret, command(2, 1, "/start")), 503)
+        self.engine.pipeline.release()
+        self.assertEqual(transport.handle(secret, command(2, 1, "/start")), 200)
+
+        self.engine.pipeline.close_intake()
+        self.assertEqual(transport.handle(secret, command(3, 1, "/start")), 503)
+
+
+class TestWebhookFailover(unittest.TestCase):
+    """Test cases for falling back from the webhook to long polling."""
+
+    def setUp(self):
+        """Set up test environment."""
+        from engine.transports import WebhookFailover
+
+        self.test_dir = tempfile.mkdtemp()
+        config = EngineConfig(
+            "enhanced", features=["core"], token="111:aaa", owner_id=1,
+            log_file=os.path.join(self.test_dir, "bot.log"), data_dir=self.test_dir,
+            webhook_url="https://example.org/webhook", webhook_backlog_threshold=100,
+            webhook_failover_after=2,
+        )
+        self.engine = Engine(config, token_manager=MagicMock(), security_monitor=MagicMock())
+        self.engine.pipeline.start()
+        self.failover = WebhookFailover(self.engine.transport)
+        self.webhook_info = {"url": config.webhook_url, "pending_update_count": 0}
+
+        def get_updates(*args, **kwargs):
+            time.sleep(0.01)
+            return []
+
+        self.apihelper = {
+            "get_webhook_info": MagicMock(side_effect=lambda token: dict(self.webhook_info)),
+            "delete_webhook": MagicMock(),
+            "set_webhook": MagicMock(),
+            "get_updates": MagicMock(side_effect=get_updates),
+        }
+        patcher = patch.multiple("telebot.apihelper", **self.apihelper)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.engine.pipeline.stop()
+        self.engine.router.shutdown()
+        shutil.rmtree(self.test_dir)
+
+    def test_backlog_fails_over_to_polling_and_back(self):
+        """Test that a growing backlog switches to polling until the endpoint recovers."""
+        from engine.transports import WebhookFailover
+
+        self.webhook_info["pending_update_count"] = 50
+        self.failover.check()
+        self.webhook_info["pending_update_count"] = 500
+        self.failover.check()
+        self.assertEqual(self.failover.state, WebhookFailover.WEBHOOK)
+        self.failover.check()
+
+        self.assertEqual(self.failover.state, WebhookFailover.POLLING)
+        self.apihelper["delete_webhook"].assert_called_once_with("111:aaa", drop_pending_updates=False)
+        metrics = self.engine.pipeline.metrics
+        self.assertEqual(metrics.get_gauge("webhook_pending_updates"), 500)
+        self.assertEqual(metrics.get_gauge("webhook_failover_active"), 1)
+        time.sleep(0.05)
+        self.assertTrue(self.apihelper["get_updates"].called)
+
+        with patch("requests.get") as probe:
+            probe.return_value.status_code = 503
+            self.failover.check()
+            probe.return_value.status_code = 200
+            self.failover.check()
+            self.failover.check()
+        self.assertEqual(self.failover.state, WebhookFailover.RESTORING)
+
+        self.failover._thread.join(timeout=2)
+        self.engine.pipeline.offset = 10
+        self.failover.check()
+
+        self.assertEqual(self.failover.state, WebhookFailover.WEBHOOK)
+        self.assertEqual(self.apihelper["get_updates"].call_args.kwargs["offset"], 10)
+        self.apihelper["set_webhook"].assert_called_once()
+        self.assertEqual(metrics.get_gauge("webhook_failover_active"), 0)
+
+    def test_repeated_delivery_errors_fail_over(self):
+        """Test that new delivery errors on consecutive checks trigger failover."""
+        from engine.transports import WebhookFailover
+
+        for error_date in (1000, 1000, 2000, 3000):
+            self.webhook_info.update(last_error_date=error_date, last_error_message="Timeout")
+            self.failover.check()
+
+        self.assertEqual(self.failover.state, WebhookFailover.POLLING)
+        self.assertEqual(self.engine.pipeline.metrics.get_counter("webhook_delivery_errors"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
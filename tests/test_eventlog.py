@@ -0,0 +1,227 @@
+"""
+Test Suite for the NOVAXA event log writer
+-----------------------------------------
+This module contains unit tests for the background JSON lines writer.
+"""
+
+import os
+import sys
+import json
+import logging
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eventlog import EventBus, EventRing, JsonlWriter, attach_log_file, flush_writers, get_writer
+from metrics import MetricsRegistry
+
+
+class TestJsonlWriter(unittest.TestCase):
+    """Test cases for JsonlWriter."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "logs", "events.log")
+        self.metrics = MetricsRegistry()
+        self.writers = []
+
+    def tearDown(self):
+        """Clean up after tests."""
+        for writer in self.writers:
+            writer.close()
+        shutil.rmtree(self.test_dir)
+
+    def writer(self, **kwargs) -> JsonlWriter:
+        writer = JsonlWriter(self.path, metrics=self.metrics, **kwargs)
+        self.writers.append(writer)
+        return writer
+
+    def lines(self):
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_nothing_opened_before_first_event(self):
+        """Test that creating a writer starts no thread and creates no file."""
+        writer = self.writer()
+        self.assertTrue(writer.flush())
+        self.assertIsNone(writer._thread)
+        self.assertFalse(os.path.exists(os.path.dirname(self.path)))
+
+    def test_events_written_in_batches(self):
+        """Test that queued events are written in order with one write per batch."""
+        writer = self.writer(batch_size=10, flush_interval=60.0, fsync="never")
+        with patch.object(writer, "_write_batch", wraps=writer._write_batch) as write_batch:
+            for n in range(25):
+                writer.write({"n": n})
+            self.assertTrue(writer.flush())
+
+        self.assertEqual([event["n"] for event in self.lines()], list(range(25)))
+        self.assertLessEqual(write_batch.call_count, 4)
+        self.assertEqual(writer.stats()["written"], 25)
+
+    def test_flush_interval_writes_without_flush(self):
+        """Test that a partial batch is written once the interval has passed."""
+        writer = self.writer(batch_size=100, flush_interval=0.05)
+        writer.write({"n": 1})
+
+        for _ in range(100):
+            if writer.stats()["written"]:
+                break
+            threading.Event().wait(0.02)
+        self.assertEqual(self.lines(), [{"n": 1}])
+
+    def test_full_queue_drops_without_blocking(self):
+        """Test that events beyond the queue size are dropped and counted."""
+        writer = self.writer(queue_size=2)
+        release = threading.Event()
+        with patch.object(writer, "_write_batch", side_effect=lambda *args, **kwargs: release.wait()):
+            results = [writer.write({"n": n}) for n in range(10)]
+            release.set()
+
+        self.assertIn(False, results)
+        self.assertEqual(writer.stats()["dropped"], results.count(False))
+        self.assertEqual(self.metrics.get_counter("event_log_dropped"), results.count(False))
+
+    def test_fsync_policy(self):
+        """Test that the batch policy syncs each batch and never does not sync."""
+        with patch("eventlog.os.fsync") as fsync:
+            never = self.writer(fsync="never")
+            never.write({"n": 1})
+            never.flush()
+            never.close()
+            self.assertEqual(fsync.call_count, 0)
+
+            batch = self.writer(fsync="batch", batch_size=1)
+            batch.write({"n": 2})
+            batch.write({"n": 3})
+            batch.flush()
+            self.assertGreaterEqual(fsync.call_count, 2)
+
+        with self.assertRaises(ValueError):
+            JsonlWriter(self.path, fsync="sometimes")
+
+    def test_close_and_flush_writers_write_out_queue(self):
+        """Test that shutdown writes every queued event."""
+        writer = self.writer(flush_interval=60.0)
+        for n in range(5):
+            writer.write({"n": n})
+        flush_writers()
+        self.assertEqual(len(self.lines()), 5)
+
+        writer.write({"n": 5})
+        writer.close()
+        self.assertEqual(len(self.lines()), 6)
+
+
+class TestEventRing(unittest.TestCase):
+    """Test cases for EventRing."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.ring = EventRing(capacity=5)
+
+    def add(self, n, event_type, user_id=None):
+        self.ring.append({"n": n, "type": event_type, "user_id": user_id})
+
+    def numbers(self, events):
+        return [event["n"] for event in events]
+
+    def test_oldest_overwritten_at_capacity(self):
+        """Test that the ring keeps the latest events in order."""
+        for n in range(8):
+            self.add(n, "start", n % 2)
+
+        self.assertEqual(len(self.ring), 5)
+        self.assertEqual(self.numbers(self.ring), [3, 4, 5, 6, 7])
+        self.assertEqual(self.numbers(self.ring.latest(3)), [7, 6, 5])
+        self.assertEqual(self.numbers(self.ring.latest(10)), [7, 6, 5, 4, 3])
+
+    def test_latest_by_type_and_user(self):
+        """Test filtering by type, by user and by both, newest first."""
+        for n, (event_type, user_id) in enumerate([("denied", 1), ("start", 1), ("denied", 2),
+                                                   ("denied", 1), ("start", None)]):
+            self.add(n, event_type, user_id)
+
+        self.assertEqual(self.numbers(self.ring.latest(10, event_type="denied")), [3, 2, 0])
+        self.assertEqual(self.numbers(self.ring.latest(10, user_id=1)), [3, 1, 0])
+        self.assertEqual(self.numbers(self.ring.latest(1, "denied", 1)), [3])
+        self.assertEqual(self.numbers(self.ring.latest(10, "start", 2)), [])
+        self.assertEqual(self.ring.latest(10, event_type="unknown"), [])
+
+    def test_indexes_bounded_by_capacity(self):
+        """Test that evicted events leave their indexes and empty indexes go."""
+        for n in range(100):
+            self.add(n, f"type{n}", n)
+
+        self.assertEqual(len(self.ring._by_type), 5)
+        self.assertEqual(len(self.ring._by_user), 5)
+        self.assertEqual(self.ring.latest(10, event_type="type0"), [])
+        self.assertEqual(self.numbers(self.ring.latest(10, user_id=99)), [99])
+
+
+class TestSharedSinks(unittest.TestCase):
+    """Test cases for the per-file writer and handler registry."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "logs", "system.log")
+        self.loggers = [logging.getLogger(f"test_eventlog.{name}") for name in ("one", "two")]
+
+    def tearDown(self):
+        """Clean up after tests."""
+        for item in self.loggers:
+            for handler in list(item.handlers):
+                item.removeHandler(handler)
+        get_writer(self.path).close()
+        shutil.rmtree(self.test_dir)
+
+    def test_one_writer_per_file(self):
+        """Test that every path naming a file gets the same writer."""
+        relative = os.path.relpath(self.path)
+        self.assertIs(get_writer(self.path), get_writer(relative))
+
+    def test_attached_handlers_write_each_record_once(self):
+        """Test that attaching a file again does not duplicate its lines."""
+        for _ in range(3):
+            for item in self.loggers:
+                attach_log_file(item, self.path)
+        self.assertEqual(len(self.loggers[0].handlers), 1)
+        self.assertIs(self.loggers[0].handlers[0], self.loggers[1].handlers[0])
+        self.assertFalse(os.path.exists(self.path))
+
+        self.loggers[0].warning("disk %s full", "data")
+        self.loggers[0].handlers[0].flush()
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertIn("WARNING - disk data full", lines[0])
+
+
+class TestEventBus(unittest.TestCase):
+    """Test cases for EventBus."""
+
+    def test_publish_to_type_and_all_subscribers(self):
+        """Test that subscribers receive their events and failures stay contained."""
+        bus = EventBus()
+        denied, every = [], []
+        bus.subscribe(lambda event: 1 / 0, "denied")
+        bus.subscribe(denied.append, "denied")
+        bus.subscribe(every.append)
+
+        bus.publish({"type": "denied"})
+        bus.publish({"type": "start"})
+        bus.unsubscribe(denied.append, "denied")
+        bus.publish({"type": "denied"})
+
+        self.assertEqual(len(denied), 1)
+        self.assertEqual([event["type"] for event in every], ["denied", "start", "denied"])
+
+
+if __name__ == "__main__":
+    unittest.main()
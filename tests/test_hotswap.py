@@ -0,0 +1,121 @@
+"""
+Test Suite for NOVAXA token hot swap
+-----------------------------------
+This module contains unit tests for switching tokens in a running process.
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dispatch import UpdatePipeline
+from hotswap import TokenSwitcher, TokenSwitchError
+from metrics import MetricsRegistry
+
+OLD_TOKEN = "111:old"
+SAME_BOT_TOKEN = "111:rotated"
+OTHER_BOT_TOKEN = "222:other"
+
+
+def get_me(token):
+    """Stand-in for apihelper.get_me."""
+    bot_id, secret = token.split(":")
+    if secret == "revoked":
+        raise Exception("Unauthorized")
+    return {"id": int(bot_id), "username": f"bot{bot_id}"}
+
+
+class TestTokenSwitcher(unittest.TestCase):
+    """Test cases for the TokenSwitcher class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.bot = MagicMock()
+        self.bot.token = OLD_TOKEN
+        self.processed = []
+        self.pipeline = UpdatePipeline(self.bot, workers=1, metrics=MetricsRegistry(),
+                                       process=self.process)
+        self.pipeline.offset = 500
+        self.switcher = TokenSwitcher(self.bot, self.pipeline, drain_timeout=2,
+                                      metrics=MetricsRegistry())
+
+        self.apihelper = {
+            "get_me": MagicMock(side_effect=get_me),
+            "get_updates": MagicMock(return_value=[]),
+            "get_webhook_info": MagicMock(return_value={"url": ""}),
+            "delete_webhook": MagicMock(),
+        }
+        patcher = patch.multiple("telebot.apihelper", **self.apihelper)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.pipeline.stop()
+
+    def process(self, raw):
+        """Record which token handled an update."""
+        time.sleep(0.05)
+        self.processed.append((raw["update_id"], self.bot.token))
+
+    def test_in_flight_updates_finish_on_old_token(self):
+        """Test that queued updates drain before the token changes."""
+        self.pipeline.start()
+        for update_id in range(3):
+            self.pipeline.submit({"update_id": update_id, "message": {"from": {"id": 5}}})
+
+        result = self.switcher.switch(SAME_BOT_TOKEN)
+
+        self.assertTrue(result["drained"])
+        self.assertTrue(result["same_bot"])
+        self.assertEqual(self.processed, [(i, OLD_TOKEN) for i in range(3)])
+        self.assertEqual(self.bot.token, SAME_BOT_TOKEN)
+        self.assertEqual(self.pipeline.offset, 500)
+        self.assertTrue(self.pipeline._intake.is_set())
+
+    def test_switch_to_other_bot_resets_offset_and_confirms_old(self):
+        """Test that a different bot starts from a fresh offset."""
+        self.switcher.switch(OTHER_BOT_TOKEN)
+
+        self.assertIsNone(self.pipeline.offset)
+        self.apihelper["get_updates"].assert_called_once()
+        self.assertEqual(self.apihelper["get_updates"].call_args.args[0], OLD_TOKEN)
+        self.assertEqual(self.apihelper["get_updates"].call_args.kwargs["offset"], 500)
+
+    def test_rejected_token_leaves_bot_untouched(self):
+        """Test that a token failing getMe is never applied."""
+        with self.assertRaises(TokenSwitchError):
+            self.switcher.switch("333:revoked")
+
+        self.assertEqual(self.bot.token, OLD_TOKEN)
+        self.assertTrue(self.pipeline._intake.is_set())
+
+    def test_switch_from_handler_does_not_deadlock(self):
+        """Test that a switch started inside a handler waits for it to return."""
+        done = threading.Event()
+        results = []
+
+        def process(raw):
+            self.switcher.switch_async(
+                SAME_BOT_TOKEN, on_done=lambda result, error: (results.append(error), done.set())
+            )
+            time.sleep(0.05)
+            self.processed.append(self.bot.token)
+
+        self.pipeline.process = process
+        self.pipeline.start()
+        self.pipeline.submit({"update_id": 1, "message": {"from": {"id": 5}}})
+
+        self.assertTrue(done.wait(3))
+        self.assertEqual(results, [None])
+        self.assertEqual(self.processed, [OLD_TOKEN])
+        self.assertEqual(self.bot.token, SAME_BOT_TOKEN)
+
+
+if __name__ == "__main__":
+    unittest.main()
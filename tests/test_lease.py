@@ -0,0 +1,131 @@
+"""
+Test Suite for NOVAXA polling leases
+-----------------------------------
+This module contains unit tests for electing the process that polls a token.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import Engine, EngineConfig
+from lease import PollingLease
+from metrics import MetricsRegistry
+
+
+class TestPollingLease(unittest.TestCase):
+    """Test cases for the PollingLease class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.db_file = os.path.join(self.test_dir, "polling.db")
+        self.leader = PollingLease("111", self.db_file, ttl=0.2, holder="leader",
+                                   metrics=MetricsRegistry())
+        self.standby = PollingLease("111", self.db_file, ttl=0.2, holder="standby",
+                                    metrics=MetricsRegistry())
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.leader.close()
+        self.standby.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_only_one_holder(self):
+        """Test that a live lease cannot be taken and renewing keeps it alive."""
+        self.assertTrue(self.leader.try_acquire())
+        self.assertFalse(self.standby.try_acquire())
+
+        time.sleep(0.12)
+        self.assertTrue(self.leader.renew())
+        time.sleep(0.12)
+        self.assertFalse(self.standby.try_acquire())
+        self.assertEqual(self.standby.current()["holder"], "leader")
+
+    def test_expired_lease_taken_over_and_old_holder_fenced(self):
+        """Test that a standby takes over after the heartbeat stops."""
+        self.assertTrue(self.leader.try_acquire())
+        time.sleep(0.25)
+
+        self.assertTrue(self.standby.try_acquire())
+        self.assertEqual(self.standby.generation, self.leader.generation + 1)
+        self.assertFalse(self.leader.renew())
+        self.assertFalse(self.leader.held)
+        self.assertEqual(self.leader.metrics.get_counter("lease_lost"), 1)
+
+    def test_release_hands_over_at_once(self):
+        """Test that a clean shutdown does not make the standby wait."""
+        self.assertTrue(self.leader.try_acquire())
+        self.leader.release()
+
+        self.assertIsNone(self.leader.current())
+        self.assertTrue(self.standby.try_acquire())
+
+
+class TestStandbyEngine(unittest.TestCase):
+    """Test cases for an engine standing by for the polling lease."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.config = EngineConfig(
+            "novaxa", features=["core", "fallback"], transport="polling", token="111:aaa",
+            log_file=os.path.join(self.test_dir, "bot.log"), data_dir=self.test_dir,
+            polling_lease=True, lease_ttl=0.2,
+        )
+        self.engines = []
+        patcher = patch("engine.core.get_scheduler")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        for engine in self.engines:
+            engine.router.shutdown()
+            engine.lease.close()
+        shutil.rmtree(self.test_dir)
+
+    def make_engine(self):
+        """Create and start an engine sharing the data directory."""
+        engine = Engine(self.config, token_manager=MagicMock(), security_monitor=MagicMock())
+        engine.start()
+        self.engines.append(engine)
+        return engine
+
+    def test_standby_takes_over_from_persisted_offset(self):
+        """Test that only the lease holder polls and a standby resumes after it."""
+        leader, standby = self.make_engine(), self.make_engine()
+        self.assertTrue(leader.pipeline.held)
+        self.assertTrue(standby.pipeline.held)
+
+        leader._tend_lease()
+        standby._tend_lease()
+        self.assertFalse(leader.pipeline.held)
+        self.assertTrue(standby.pipeline.held)
+
+        leader.pipeline.offset = 77
+        leader._tend_lease()
+
+        # The leader hangs: no more heartbeats.
+        time.sleep(0.25)
+        standby._tend_lease()
+        self.assertFalse(standby.pipeline.held)
+        self.assertEqual(standby.pipeline.offset, 77)
+
+        leader.stop = MagicMock()
+        leader._tend_lease()
+        self.assertTrue(leader.pipeline.held)
+        deadline = time.time() + 1
+        while not leader.stop.called and time.time() < deadline:
+            time.sleep(0.01)
+        leader.stop.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Test Suite for NOVAXA multi-bot runner
+-------------------------------------
+This module contains unit tests for serving several tokens in one process.
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.config import EngineConfig
+from multibot import MultiBotRunner, webhook_secret
+from metrics import MetricsRegistry
+from scheduler import JobScheduler
+
+
+class FakeTokenManager:
+    """Stand-in for security.TokenManager."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.touched = []
+
+    def get_tokens(self):
+        return [{"id": token_id, "status": status} for token_id, (_, status) in self.tokens.items()]
+
+    def get_token(self, token_id, touch=True):
+        if touch:
+            self.touched.append(token_id)
+        return self.tokens[token_id][0]
+
+    def flush(self):
+        pass
+
+
+class TestMultiBotRunner(unittest.TestCase):
+    """Test cases for the MultiBotRunner class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.token_manager = FakeTokenManager({
+            "a": ("111:aaa", "active"),
+            "b": ("222:bbb", "active"),
+            "dup": ("111:aaa", "active"),
+            "off": ("333:ccc", "inactive"),
+        })
+        self.metrics = MetricsRegistry()
+        self.runner = MultiBotRunner(self.token_manager, self.setup_bot, metrics=self.metrics,
+                                     scheduler=JobScheduler(metrics=self.metrics))
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.runner.stop()
+
+    def setup_bot(self, instance):
+        """Register a handler that keeps per-bot state."""
+        @instance.router.message_handler(commands=["count"])
+        def handle_count(message):
+            instance.state["count"] = instance.state.get("count", 0) + 1
+
+    def test_serves_each_active_token_once(self):
+        """Test that inactive and duplicate tokens are not served."""
+        result = self.runner.reconcile()
+
+        self.assertEqual(sorted(result["started"]), ["a", "b"])
+        self.assertEqual(self.metrics.get_gauge("bots_running"), 2)
+        self.assertEqual(self.token_manager.touched, [])
+
+    def test_bots_follow_engine_config(self):
+        """Test that every bot gets the configured deadlines and ignore policy."""
+        config = EngineConfig(handler_deadlines={"log": 2.0}, default_deadline=3.0,
+                              ignore_updates="edits")
+        runner = MultiBotRunner(self.token_manager, self.setup_bot, config=config,
+                                metrics=self.metrics, scheduler=JobScheduler(metrics=self.metrics))
+        self.addCleanup(runner.stop)
+        runner.reconcile()
+        instance = runner.bots["a"]
+
+        self.assertEqual(instance.router.deadlines, {"log": 2.0})
+        self.assertEqual(instance.router.default_deadline, 3.0)
+        self.assertEqual(instance.pipeline.ignore_policy.rules, {"edits"})
+        self.assertEqual(instance.pipeline.max_pending, config.update_queue_size)
+
+    def test_webhook_requests_only_handled_update_types(self):
+        """Test that setWebhook is limited to the update types bots handle."""
+        self.runner.reconcile()
+        self.runner.base_url = "https://example.org"
+
+        with patch("telebot.apihelper.set_webhook") as set_webhook:
+            self.runner._set_webhook(self.runner.bots["a"])
+
+        kwargs = set_webhook.call_args.kwargs
+        self.assertEqual(kwargs["url"], "https://example.org/webhook/a")
+        self.assertEqual(kwargs["allowed_updates"], ["message"])
+
+    def test_handler_state_is_isolated(self):
+        """Test that every bot has its own telebot instance and state."""
+        self.runner.reconcile()
+        a, b = self.runner.bots["a"], self.runner.bots["b"]
+
+        self.assertIsNot(a.bot, b.bot)
+        self.assertEqual(len(a.bot.message_handlers), 1)
+        a.bot.message_handlers[0]["function"](None)
+
+        self.assertEqual(a.state, {"count": 1})
+        self.assertEqual(b.state, {})
+
+    def test_reconcile_stops_removed_and_rotated_tokens(self):
+        """Test that bots follow changes in the token manager."""
+        self.runner.reconcile()
+        self.token_manager.tokens["b"] = ("222:rotated", "active")
+        self.token_manager.tokens["a"] = ("111:aaa", "inactive")
+        self.token_manager.tokens["dup"] = ("111:aaa", "inactive")
+
+        result = self.runner.reconcile()
+
+        self.assertEqual(sorted(result["stopped"]), ["a", "b"])
+        self.assertEqual(result["started"], ["b"])
+        self.assertEqual(self.runner.bots["b"].bot.token, "222:rotated")
+
+    def test_webhook_routing(self):
+        """Test that webhook requests reach only their own bot."""
+        self.runner.reconcile()
+        update = {"update_id": 1, "message": {"from": {"id": 5}, "text": "/count"}}
+
+        self.assertEqual(self.runner.handle_webhook("zzz", "x", update), 404)
+        self.assertEqual(self.runner.handle_webhook("a", "wrong", update), 403)
+        self.assertEqual(self.runner.handle_webhook("a", webhook_secret("111:aaa"), {}), 400)
+        self.assertEqual(self.runner.handle_webhook("a", webhook_secret("111:aaa"), update), 200)
+
+        self.assertEqual(self.runner.bots["a"].pipeline.pending(), 1)
+        self.assertEqual(self.runner.bots["b"].pipeline.pending(), 0)
+        self.assertEqual(self.metrics.get_counter("updates_received", {"bot": "a", "lane": "normal"}), 1)
+        self.assertEqual(self.metrics.get_counter("webhook_rejected", {"bot": "a"}), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
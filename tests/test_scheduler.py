@@ -0,0 +1,301 @@
+"""
+Test Suite for NOVAXA scheduling
+-------------------------------
+This module contains unit tests for the job and reminder schedulers.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import JobScheduler, ReminderScheduler, parse_when
+from metrics import MetricsRegistry
+
+
+class TestJobScheduler(unittest.TestCase):
+    """Test cases for the JobScheduler class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.scheduler = JobScheduler(metrics=MetricsRegistry())
+        self.scheduler.start()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.scheduler.stop(timeout=1)
+
+    def test_runs_jobs_periodically_on_one_thread(self):
+        """Test that several jobs share the scheduler's timer thread."""
+        runs = {"a": 0, "b": 0}
+
+        def job(name):
+            runs[name] += 1
+
+        self.scheduler.add_job("a", lambda: job("a"), 0.05, initial_delay=0)
+        self.scheduler.add_job("b", lambda: job("b"), 0.05, initial_delay=0)
+        time.sleep(0.3)
+
+        self.assertGreaterEqual(runs["a"], 3)
+        self.assertGreaterEqual(runs["b"], 3)
+        self.assertEqual(self.scheduler.metrics.get_counter("job_runs", {"job": "a"}), runs["a"])
+
+    def test_skips_overlapping_runs(self):
+        """Test that a job still running is not started again."""
+        active = []
+        overlapped = []
+
+        def slow():
+            if active:
+                overlapped.append(True)
+            active.append(True)
+            time.sleep(0.2)
+            active.pop()
+
+        self.scheduler.add_job("slow", slow, 0.05, initial_delay=0)
+        time.sleep(0.35)
+
+        self.assertFalse(overlapped)
+        self.assertGreater(self.scheduler.metrics.get_counter("job_overlaps", {"job": "slow"}), 0)
+
+    def test_failures_are_counted_and_removed_jobs_stop(self):
+        """Test that a failing job keeps its schedule until removed."""
+        calls = []
+
+        def failing():
+            calls.append(True)
+            raise RuntimeError("boom")
+
+        self.scheduler.add_job("failing", failing, 0.05, initial_delay=0)
+        time.sleep(0.2)
+        self.assertTrue(self.scheduler.remove_job("failing"))
+        time.sleep(0.05)  # let a run already handed to a worker finish
+        count = len(calls)
+        time.sleep(0.15)
+
+        self.assertGreaterEqual(count, 2)
+        self.assertEqual(len(calls), count)
+        self.assertEqual(self.scheduler.metrics.get_counter("job_failures", {"job": "failing"}), count)
+        self.assertEqual(self.scheduler.get_jobs(), [])
+
+    def test_stop_resets_runs_cancelled_before_starting(self):
+        """Test that jobs still queued at stop are not left marked running."""
+        scheduler = JobScheduler(workers=1, metrics=MetricsRegistry())
+        scheduler.start()
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocking():
+            started.set()
+            release.wait(2)
+
+        scheduler.add_job("blocking", blocking, 10, initial_delay=0)
+        self.assertTrue(started.wait(1))
+        queued = scheduler.add_job("queued", lambda: None, 10, initial_delay=0)
+        time.sleep(0.05)
+        self.assertTrue(queued.running)
+
+        scheduler.stop(timeout=0.1)
+        release.set()
+
+        self.assertFalse(queued.running)
+        self.assertEqual(queued.runs, 0)
+
+    def test_idle_mode_suspends_and_slows_jobs(self):
+        """Test that idle mode stops non-essential jobs and slows idle-paced ones."""
+        runs = {"sampler": 0, "watcher": 0}
+
+        def job(name):
+            runs[name] += 1
+
+        self.scheduler.add_job("sampler", lambda: job("sampler"), 0.05, initial_delay=0,
+                               essential=False)
+        self.scheduler.add_job("watcher", lambda: job("watcher"), 0.05, initial_delay=0,
+                               idle_interval=10)
+        time.sleep(0.12)
+        self.assertEqual(sorted(self.scheduler.set_idle(True)), ["sampler", "watcher"])
+        time.sleep(0.06)
+        idle_runs = dict(runs)
+        time.sleep(0.2)
+
+        self.assertEqual(runs["sampler"], idle_runs["sampler"])
+        self.assertLessEqual(runs["watcher"], idle_runs["watcher"] + 1)
+        self.assertEqual(self.scheduler._heap[0][2].name, "watcher")
+
+        self.scheduler.set_idle(False)
+        time.sleep(0.2)
+        self.assertGreater(runs["sampler"], idle_runs["sampler"])
+        self.assertGreater(runs["watcher"], idle_runs["watcher"] + 1)
+
+    def test_remove_job_keeps_replacement(self):
+        """Test that removing a replaced job leaves the new one registered."""
+        old = self.scheduler.add_job("monitor", lambda: None, 10)
+        new = self.scheduler.add_job("monitor", lambda: None, 10)
+
+        self.assertFalse(self.scheduler.remove_job("monitor", old))
+        self.assertTrue(self.scheduler.remove_job("monitor", new))
+
+
+class TestReminderScheduler(unittest.TestCase):
+    """Test cases for the ReminderScheduler class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_file = os.path.join(self.tmpdir, "reminders.db")
+        self.fired = []
+        self.schedulers = []
+
+    def tearDown(self):
+        """Clean up after tests."""
+        for scheduler in self.schedulers:
+            scheduler.close()
+        shutil.rmtree(self.tmpdir)
+
+    def make_scheduler(self, **kwargs):
+        """Create a scheduler recording fired reminders."""
+        scheduler = ReminderScheduler(
+            lambda reminder: self.fired.append((time.time(), reminder)),
+            db_file=self.db_file, metrics=MetricsRegistry(), **kwargs
+        )
+        self.schedulers.append(scheduler)
+        return scheduler
+
+    def wait_for_fired(self, count, timeout=3):
+        """Wait until the given number of reminders fired."""
+        deadline = time.time() + timeout
+        while len(self.fired) < count and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.fired), count)
+
+    def test_fires_in_due_order_with_subsecond_precision(self):
+        """Test that reminders fire in order, close to their due time."""
+        scheduler = self.make_scheduler()
+        scheduler.start()
+
+        now = datetime.now()
+        scheduler.add(1, "second", now + timedelta(seconds=0.4))
+        scheduler.add(1, "first", now + timedelta(seconds=0.2))
+
+        self.wait_for_fired(2)
+        self.assertEqual([r["text"] for _, r in self.fired], ["first", "second"])
+        for fired_at, reminder in self.fired:
+            self.assertLess(fired_at - reminder["due_at"], 0.2)
+        self.assertEqual(scheduler.count(), 0)
+
+    def test_catches_up_after_restart(self):
+        """Test that reminders persist and overdue ones fire on startup."""
+        scheduler = self.make_scheduler()
+        scheduler.add(1, "missed", datetime.now() - timedelta(minutes=5), user_id=7)
+        scheduler.add(1, "later", datetime.now() + timedelta(hours=1), user_id=7)
+        scheduler.close()
+
+        restarted = self.make_scheduler()
+        self.assertEqual(restarted.count(), 2)
+        restarted.start()
+
+        self.wait_for_fired(1)
+        self.assertEqual(self.fired[0][1]["text"], "missed")
+        self.assertTrue(self.fired[0][1]["late"])
+        self.assertEqual([r["text"] for r in restarted.pending(user_id=7)], ["later"])
+
+    def test_refills_heap_in_batches(self):
+        """Test that only a batch is held in memory at a time."""
+        scheduler = self.make_scheduler(batch_size=3)
+        past = datetime.now() - timedelta(seconds=10)
+        for i in range(10):
+            scheduler.add(1, f"r{i}", past + timedelta(seconds=i))
+
+        scheduler.start()
+        self.wait_for_fired(10)
+
+        self.assertEqual([r["text"] for _, r in self.fired], [f"r{i}" for i in range(10)])
+        self.assertLessEqual(scheduler.metrics.get_gauge("reminders_loaded"), 3)
+
+    def test_earlier_insert_wakes_timer(self):
+        """Test that adding an earlier reminder preempts a long sleep."""
+        scheduler = self.make_scheduler()
+        scheduler.add(1, "far", datetime.now() + timedelta(hours=1))
+        scheduler.start()
+        time.sleep(0.05)
+
+        scheduler.add(1, "soon", datetime.now() + timedelta(seconds=0.1))
+        self.wait_for_fired(1)
+        self.assertEqual(self.fired[0][1]["text"], "soon")
+
+    def test_cancel(self):
+        """Test cancelling a loaded reminder."""
+        scheduler = self.make_scheduler()
+        scheduler.start()
+        keep = scheduler.add(1, "keep", datetime.now() + timedelta(seconds=0.2), user_id=7)
+        drop = scheduler.add(1, "drop", datetime.now() + timedelta(seconds=0.1), user_id=7)
+
+        self.assertFalse(scheduler.cancel(drop, user_id=8))
+        self.assertTrue(scheduler.cancel(drop, user_id=7))
+
+        self.wait_for_fired(1)
+        time.sleep(0.1)
+        self.assertEqual([r["id"] for _, r in self.fired], [keep])
+
+    def test_failed_delivery_is_retried_then_dropped(self):
+        """Test that a reminder is kept and retried until delivery succeeds."""
+        attempts = []
+
+        def deliver(reminder):
+            attempts.append(reminder["id"])
+            if len(attempts) < 3:
+                raise RuntimeError("Telegram unavailable")
+            self.fired.append((time.time(), reminder))
+
+        scheduler = ReminderScheduler(deliver, db_file=self.db_file, retry_delay=0.05,
+                                      metrics=MetricsRegistry())
+        self.schedulers.append(scheduler)
+        scheduler.start()
+        reminder_id = scheduler.add(1, "retry", datetime.now())
+
+        self.wait_for_fired(1)
+        self.assertEqual(attempts, [reminder_id] * 3)
+        self.assertEqual(scheduler.metrics.get_counter("reminders_retried"), 2)
+        self.assertEqual(scheduler.count(), 0)
+
+    def test_reminder_dropped_after_max_attempts(self):
+        """Test that a reminder that never delivers is eventually dropped."""
+        def deliver(reminder):
+            raise RuntimeError("Chat not found")
+
+        scheduler = ReminderScheduler(deliver, db_file=self.db_file, retry_delay=0.01,
+                                      max_attempts=2, metrics=MetricsRegistry())
+        self.schedulers.append(scheduler)
+        scheduler.start()
+        scheduler.add(1, "never", datetime.now())
+
+        deadline = time.time() + 3
+        while scheduler.count() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(scheduler.count(), 0)
+        self.assertEqual(scheduler.metrics.get_counter("reminders_failed"), 2)
+        self.assertEqual(scheduler.metrics.get_counter("reminders_dropped"), 1)
+
+
+class TestParseWhen(unittest.TestCase):
+    """Test cases for parse_when."""
+
+    def test_parse_when(self):
+        """Test clock times and relative delays."""
+        now = datetime(2024, 1, 1, 16, 30)
+
+        self.assertEqual(parse_when("17:00", now), datetime(2024, 1, 1, 17, 0))
+        self.assertEqual(parse_when("15:00", now), datetime(2024, 1, 2, 15, 0))
+        self.assertEqual(parse_when("10m", now), datetime(2024, 1, 1, 16, 40))
+        self.assertEqual(parse_when("2h", now), datetime(2024, 1, 1, 18, 30))
+        self.assertIsNone(parse_when("soon", now))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,412 @@
+"""
+Test Suite for the NOVAXA security module
+----------------------------------------
+This module contains unit tests for token management and security
+monitoring.
+"""
+
+import os
+import sys
+import base64
+import hashlib
+import hmac
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import security
+from security import IPProtection, SecurityMonitor, TokenManager, get_security_monitor
+from tokenstore import SqliteTokenStore
+
+
+class TestTokenManager(unittest.TestCase):
+    """Test cases for the TokenManager class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.token_file = os.path.join(self.test_dir, "config", "tokens.json")
+
+    def tearDown(self):
+        """Clean up after tests."""
+        shutil.rmtree(self.test_dir)
+
+    def test_startup_writes_nothing(self):
+        """Test that loading a missing token file creates no files."""
+        manager = TokenManager(self.token_file)
+
+        self.assertEqual(manager.tokens, {})
+        self.assertEqual(os.listdir(self.test_dir), [])
+
+    def test_get_token_does_not_rewrite_file(self):
+        """Test that reading the active token leaves the token file alone."""
+        token_id = TokenManager(self.token_file).add_token("111:aaa", "Main")
+        with open(self.token_file) as f:
+            saved = f.read()
+
+        manager = TokenManager(self.token_file)
+        self.assertEqual(manager.get_token(), "111:aaa")
+        self.assertIsNotNone(manager.tokens[token_id]["last_used"])
+        with open(self.token_file) as f:
+            self.assertEqual(f.read(), saved)
+
+        manager.flush()
+        with open(self.token_file) as f:
+            self.assertIsNotNone(json.load(f)["tokens"][token_id]["last_used"])
+
+    def test_usage_stamps_written_behind(self):
+        """Test that usage stamps are saved after the interval or the count, not per read."""
+        token_id = TokenManager(self.token_file).add_token("111:aaa", "Main")
+
+        def saved_stamp():
+            with open(self.token_file) as f:
+                return json.load(f)["tokens"][token_id]["last_used"]
+
+        manager = TokenManager(self.token_file, flush_interval=0.2, flush_every=3)
+        manager.get_token()
+        self.assertIsNone(saved_stamp())
+        time.sleep(0.5)
+        self.assertIsNotNone(saved_stamp())
+
+        manager = TokenManager(self.token_file, flush_interval=60, flush_every=3)
+        manager.get_token()
+        manager.get_token()
+        stamp = saved_stamp()
+        manager.get_token()
+        self.assertNotEqual(saved_stamp(), stamp)
+        self.assertIsNone(manager._flush_timer)
+
+    def test_emergency_reset_restores_previous_version(self):
+        """Test that the backup holds the token file from before the last change."""
+        manager = TokenManager(self.token_file)
+        kept_id = manager.add_token("111:aaa", "Main")
+        manager.add_token("222:bbb", "Leaked")
+
+        self.assertTrue(manager.emergency_reset())
+        self.assertEqual(list(manager.tokens), [kept_id])
+        self.assertEqual(list(TokenManager(self.token_file).tokens), [kept_id])
+
+    def test_sees_changes_from_other_processes(self):
+        """Test that a second manager's changes are picked up entry by entry."""
+        bot = TokenManager(self.token_file, reload_interval=0)
+        first = bot.add_token("111:aaa", "Main")
+        bot.get_token(first)
+        dashboard = TokenManager(self.token_file)
+        second = dashboard.add_token("222:bbb", "Added")
+        dashboard.rotate_token(first, "111:rotated")
+
+        self.assertEqual({t["id"] for t in bot.get_tokens()}, {first, second})
+        self.assertEqual(bot.get_token(first, touch=False), "111:rotated")
+        # The unsaved usage stamp survives the reload.
+        self.assertIsNotNone(bot.tokens[first]["last_used"])
+
+        self.assertTrue(bot.activate_token(second))
+        self.assertEqual(TokenManager(self.token_file).active_token_id, second)
+
+    def test_concurrent_writers_do_not_clobber(self):
+        """Test that managers adding tokens at once keep each other's tokens."""
+        managers = [TokenManager(self.token_file) for _ in range(3)]
+        threads = [threading.Thread(target=lambda m=m, n=n: [m.add_token(f"{n}{i}:x", "Bot")
+                                                             for i in range(5)])
+                   for n, m in enumerate(managers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(TokenManager(self.token_file).tokens), 15)
+
+    def test_changes_saved_at_once(self):
+        """Test that adding and deleting tokens still persists immediately."""
+        manager = TokenManager(self.token_file, flush_interval=60)
+        token_id = manager.add_token("111:aaa", "Main")
+        self.assertIn(token_id, TokenManager(self.token_file).tokens)
+
+        manager.delete_token(token_id)
+        self.assertEqual(TokenManager(self.token_file).tokens, {})
+
+
+class TestTokenEncryption(unittest.TestCase):
+    """Test cases for encrypting stored tokens."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.token_file = os.path.join(self.test_dir, "tokens.json")
+        self.manager = TokenManager(self.token_file, master_key="old key")
+
+    def tearDown(self):
+        """Clean up after tests."""
+        shutil.rmtree(self.test_dir)
+
+    def stored(self):
+        with open(self.token_file) as f:
+            return f.read()
+
+    def test_tokens_encrypted_and_bound_to_their_id(self):
+        """Test that the token value is not stored and entries cannot be swapped."""
+        first = self.manager.add_token("111:secret-one", "One")
+        second = self.manager.add_token("222:secret-two", "Two")
+        self.assertNotIn("secret", self.stored())
+
+        manager = TokenManager(self.token_file, master_key="old key")
+        self.assertEqual(manager.get_token(first, touch=False), "111:secret-one")
+
+        manager.tokens[first]["token"] = manager.tokens[second]["token"]
+        self.assertIsNone(manager.get_token(first, touch=False))
+        self.assertIsNone(TokenManager(self.token_file, master_key="wrong").get_token(second))
+
+    def test_key_derived_once_and_plaintexts_cached(self):
+        """Test that scrypt runs once per key and decryption is cached."""
+        security.derive_key.cache_clear()
+        token_ids = [self.manager.add_token(f"{n}:secret", "Bot") for n in range(5)]
+        for token_id in token_ids:
+            self.manager.get_token(token_id, touch=False)
+        self.assertEqual(security.derive_key.cache_info().misses, 1)
+
+        with patch("security.decrypt_value") as decrypt:
+            self.manager.get_token(token_ids[0], touch=False)
+        decrypt.assert_not_called()
+
+    def test_legacy_values_still_read(self):
+        """Test that values in the old HMAC-prefixed format decrypt."""
+        key = hashlib.sha256(b"old key").digest()
+        legacy = base64.b64encode(hmac.new(key, b"111:aaa", hashlib.sha256).digest()
+                                  + b"111:aaa").decode()
+        self.manager.tokens["legacy"] = {"id": "legacy", "token": legacy, "name": "Old",
+                                         "owner_id": None, "created": "", "status": "active"}
+
+        self.assertEqual(self.manager.get_token("legacy", touch=False), "111:aaa")
+
+    def test_rekey_reencrypts_every_token(self):
+        """Test that re-keying rewrites all tokens under the new key in one save."""
+        values = {self.manager.add_token(f"{n}:secret", "Bot"): f"{n}:secret" for n in range(3)}
+
+        with patch.object(self.manager.store, "save", wraps=self.manager.store.save) as save:
+            self.assertEqual(self.manager.rekey("new key"), 3)
+        self.assertEqual(save.call_count, 1)
+
+        manager = TokenManager(self.token_file, master_key="new key")
+        for token_id, value in values.items():
+            self.assertEqual(manager.get_token(token_id, touch=False), value)
+        self.assertIsNone(TokenManager(self.token_file, master_key="old key").get_token())
+
+    def test_rekey_with_wrong_key_changes_nothing(self):
+        """Test that a token that does not decrypt aborts the re-key."""
+        self.manager.add_token("111:aaa", "Main")
+        before = self.stored()
+
+        manager = TokenManager(self.token_file, master_key="wrong")
+        with self.assertRaises(ValueError):
+            manager.rekey("new key")
+        self.assertEqual(self.stored(), before)
+        self.assertEqual(manager.master_key, "wrong")
+
+
+class TestValidateAll(unittest.TestCase):
+    """Test cases for TokenManager.validate_all."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.manager = TokenManager(os.path.join(self.test_dir, "tokens.json"))
+        self.ids = {value: self.manager.add_token(value, value)
+                    for value in ("1:ok", "2:dead", "3:offline", "4:dead")}
+        self.manager.activate_token(self.ids["2:dead"])
+        self.checked = []
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        shutil.rmtree(self.test_dir)
+
+    def fake_check(self, token, timeout):
+        with self.lock:
+            self.checked.append(token)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        if "dead" in token:
+            return {"valid": False, "error": "HTTP 401"}
+        if "offline" in token:
+            return {"valid": None, "error": "timed out"}
+        return {"valid": True, "username": "okbot"}
+
+    def test_dead_tokens_deactivated_in_one_save(self):
+        """Test that rejected tokens are deactivated together and unknown ones kept."""
+        with patch("security.check_token", self.fake_check), \
+                patch.object(self.manager.store, "save", wraps=self.manager.store.save) as save:
+            results = self.manager.validate_all(max_workers=2)
+
+        self.assertEqual(save.call_count, 1)
+        self.assertLessEqual(self.peak, 2)
+        self.assertEqual(sorted(self.checked), ["1:ok", "2:dead", "3:offline", "4:dead"])
+        self.assertTrue(results[self.ids["1:ok"]]["valid"])
+        statuses = {t["id"]: t["status"] for t in TokenManager(self.manager.token_file).get_tokens()}
+        self.assertEqual(statuses[self.ids["2:dead"]], "inactive")
+        self.assertEqual(statuses[self.ids["4:dead"]], "inactive")
+        self.assertEqual(statuses[self.ids["3:offline"]], "active")
+        self.assertEqual(self.manager.active_token_id, self.ids["1:ok"])
+
+    def test_results_cached_until_ttl_or_rotation(self):
+        """Test that answered checks are reused and rotation invalidates them."""
+        with patch("security.check_token", self.fake_check):
+            self.manager.validate_all(deactivate=False)
+            self.checked.clear()
+            results = self.manager.validate_all(deactivate=False)
+            self.assertEqual(self.checked, ["3:offline"])
+            self.assertTrue(results[self.ids["1:ok"]]["cached"])
+
+            self.manager.rotate_token(self.ids["1:ok"], "1:ok-rotated")
+            self.checked.clear()
+            self.manager.validate_all(deactivate=False)
+            self.assertEqual(sorted(self.checked), ["1:ok-rotated", "3:offline"])
+
+            self.checked.clear()
+            self.manager.validate_all(deactivate=False, ttl=0)
+            self.assertEqual(len(self.checked), 4)
+
+
+class TestSqliteTokenStore(unittest.TestCase):
+    """Test cases for TokenManager on the SQLite token store."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.token_file = os.path.join(self.test_dir, "config", "tokens.json")
+        self.db_file = os.path.join(self.test_dir, "data", "tokens.db")
+
+    def tearDown(self):
+        """Clean up after tests."""
+        shutil.rmtree(self.test_dir)
+
+    def manager(self):
+        return TokenManager(self.token_file, store=SqliteTokenStore(self.db_file, self.token_file))
+
+    def test_migrates_json_file_once(self):
+        """Test that an existing tokens.json is imported and kept aside."""
+        json_manager = TokenManager(self.token_file)
+        first = json_manager.add_token("111:aaa", "Main", owner_id=1)
+        second = json_manager.add_token("222:bbb", "Other", owner_id=2)
+        json_manager.activate_token(second)
+
+        manager = self.manager()
+        self.assertEqual(set(manager.tokens), {first, second})
+        self.assertEqual(manager.active_token_id, second)
+        self.assertEqual(manager.get_token(first, touch=False), "111:aaa")
+        self.assertFalse(os.path.exists(self.token_file))
+        self.assertTrue(os.path.exists(f"{self.token_file}.migrated"))
+        manager.store.close()
+
+    def test_indexed_lookups_and_incremental_updates(self):
+        """Test lookups by owner and status and that changes persist per row."""
+        manager = self.manager()
+        ids = [manager.add_token(f"{n}:tok", f"Bot {n}", owner_id=n % 2) for n in range(6)]
+        manager.deactivate_token(ids[0])
+        manager.delete_token(ids[1])
+        manager.get_token(ids[2])
+        manager.flush()
+        manager.store.close()
+
+        manager = self.manager()
+        self.assertEqual(manager.active_token_id, ids[2])
+        self.assertEqual([t["id"] for t in manager.get_tokens(owner_id=0)], ids[0:6:2])
+        self.assertEqual([t["id"] for t in manager.get_tokens(status="active")], ids[2:])
+        self.assertEqual(manager.get_tokens(owner_id=1, status="inactive"), [])
+        self.assertIsNotNone(manager.tokens[ids[2]]["last_used"])
+        manager.store.close()
+
+    def test_sees_changes_from_other_connections(self):
+        """Test that a row changed by another process is reloaded."""
+        bot = self.manager()
+        bot.reload_interval = 0
+        token_id = bot.add_token("111:aaa", "Main")
+        other = self.manager()
+        other.deactivate_token(token_id)
+
+        self.assertEqual(bot.get_tokens()[0]["status"], "inactive")
+        self.assertIsNone(bot.active_token_id)
+        bot.store.close()
+        other.store.close()
+
+    def test_startup_without_database_writes_nothing(self):
+        """Test that loading an absent store creates no database."""
+        manager = self.manager()
+
+        self.assertEqual(manager.tokens, {})
+        self.assertEqual(os.listdir(self.test_dir), [])
+
+
+class TestSecurityMonitor(unittest.TestCase):
+    """Test cases for the SecurityMonitor class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.test_dir, "logs", "security.log")
+        self.monitor = SecurityMonitor(self.log_file)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.monitor.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_log_opened_on_first_event(self):
+        """Test that the log file is only created when an event is logged."""
+        self.assertFalse(os.path.exists(self.log_file))
+
+        self.monitor.log_event("login_failed", {"reason": "test"}, 5)
+        self.assertTrue(self.monitor.flush())
+        with open(self.log_file) as f:
+            self.assertIn('"login_failed"', f.read())
+
+    def test_each_event_written_once(self):
+        """Test that the log file holds one JSON line per event and nothing else."""
+        for user_id in range(3):
+            self.monitor.log_event("unauthorized_access", {"command": "admin"}, user_id)
+        self.monitor.flush()
+
+        with open(self.log_file) as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual([event["user_id"] for event in events], [0, 1, 2])
+
+    def test_recent_events_leave_log_unchanged(self):
+        """Test that queries return the latest matches without reordering the log."""
+        for user_id in (1, 2, 1):
+            self.monitor.log_event("unauthorized_access", {}, user_id)
+        self.monitor.log_event("start", {}, 1)
+        before = list(self.monitor.logs)
+
+        events = self.monitor.get_recent_events(5, "unauthorized_access", 1)
+        self.assertEqual(len(events), 2)
+        self.assertEqual(self.monitor.get_recent_events(1)[0]["type"], "start")
+        self.assertEqual(list(self.monitor.logs), before)
+
+    def test_monitors_share_writer_and_publish(self):
+        """Test that monitors of one file share its writer and publish their events."""
+        bus = MagicMock()
+        other = SecurityMonitor(self.log_file, bus=bus)
+        self.assertIs(other.writer, self.monitor.writer)
+
+        other.log_event("unauthorized_broadcast", {}, 7)
+        bus.publish.assert_called_once()
+        self.assertEqual(bus.publish.call_args[0][0]["user_id"], 7)
+
+    def test_ip_protection_uses_shared_monitor(self):
+        """Test that IP protection reuses the process-wide monitor."""
+        self.assertIs(IPProtection(1).security_monitor, get_security_monitor())
+        self.assertIs(IPProtection(2).security_monitor, IPProtection(3).security_monitor)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Test Suite for the NOVAXA state file writer
+------------------------------------------
+This module contains unit tests for atomic, change-aware state writes.
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import statefile
+from statefile import backup_path, write_file, write_json
+
+
+class TestStateFile(unittest.TestCase):
+    """Test cases for write_file and write_json."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "config", "state.json")
+
+    def tearDown(self):
+        """Clean up after tests."""
+        shutil.rmtree(self.test_dir)
+
+    def read(self, path=None):
+        with open(path or self.path) as f:
+            return f.read()
+
+    def test_unchanged_content_not_rewritten(self):
+        """Test that writing the same content again leaves the file alone."""
+        self.assertTrue(write_file(self.path, "a=1\n"))
+        mtime = os.stat(self.path).st_mtime_ns
+
+        self.assertFalse(write_file(self.path, "a=1\n"))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, mtime)
+
+        # A change made by another process is detected, not masked by the cache.
+        with open(self.path, "w") as f:
+            f.write("a=2\n")
+        self.assertTrue(write_file(self.path, "a=1\n"))
+        self.assertEqual(self.read(), "a=1\n")
+
+    def test_backups_rotate_on_change_only(self):
+        """Test that backups keep earlier generations and skip unchanged writes."""
+        for value in ("1", "2", "2", "3", "4"):
+            write_file(self.path, value, backups=2)
+
+        self.assertEqual(self.read(), "4")
+        self.assertEqual(self.read(backup_path(self.path)), "3")
+        self.assertEqual(self.read(backup_path(self.path, 2)), "2")
+        self.assertFalse(os.path.exists(backup_path(self.path, 3)))
+
+    def test_failed_write_keeps_old_content(self):
+        """Test that a crash before the rename leaves the old file and no temp files."""
+        write_file(self.path, "old")
+        with patch("statefile.os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                write_file(self.path, "new")
+
+        self.assertEqual(self.read(), "old")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["state.json"])
+
+    def test_json_stamp_does_not_count_as_change(self):
+        """Test that the stamp field is set on writes but ignored when comparing."""
+        self.assertTrue(write_json(self.path, {"a": 1}, stamp_field="last_updated"))
+        stamp = json.loads(self.read())["last_updated"]
+
+        statefile._digests.clear()
+        self.assertFalse(write_json(self.path, {"a": 1, "last_updated": "later"},
+                                    stamp_field="last_updated"))
+        self.assertEqual(json.loads(self.read())["last_updated"], stamp)
+
+        self.assertTrue(write_json(self.path, {"a": 2}, stamp_field="last_updated"))
+        self.assertEqual(json.loads(self.read())["a"], 2)
+
+    def test_compact_json(self):
+        """Test that compact encoding drops the indentation."""
+        write_json(self.path, {"a": [1, 2]}, compact=True)
+        self.assertEqual(self.read(), '{"a":[1,2]}')
+
+
+if __name__ == "__main__":
+    unittest.main()
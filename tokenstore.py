@@ -0,0 +1,313 @@
+"""
+Token Store Module for NOVAXA Bot
+--------------------------------
+This module provides the storage backends behind security.TokenManager.
+
+JsonTokenStore keeps every token in one JSON document and rewrites it on
+each change, which suits a handful of tokens that people edit by hand.
+SqliteTokenStore keeps one row per token with indexes on the owner and the
+status, and writes only the rows that changed, for thousands of tokens
+across tenants. It migrates an existing tokens.json on first use.
+
+Other processes, such as the dashboard and manage_tokens.py, change the
+same store. signature() tells cheaply whether they did, and writers hold
+locked() while they merge and save.
+
+Both hold the same token dicts: ``id``, ``token``, ``name``, ``owner_id``,
+``created``, ``updated``, ``last_used`` and ``status``, plus any extra keys.
+"""
+
+import os
+import json
+import logging
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from statefile import backup_path, file_lock, file_signature, write_json
+
+logger = logging.getLogger(__name__)
+
+STORE_JSON = "json"
+STORE_SQLITE = "sqlite"
+
+TOKEN_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    id TEXT PRIMARY KEY,
+    token TEXT NOT NULL,
+    name TEXT,
+    owner_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'active',
+    created TEXT,
+    updated TEXT,
+    last_used TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tokens_owner ON tokens (owner_id);
+CREATE INDEX IF NOT EXISTS idx_tokens_status ON tokens (status, created);
+CREATE TABLE IF NOT EXISTS token_settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+TOKEN_COLUMNS = ("id", "token", "name", "owner_id", "status", "created", "updated", "last_used")
+
+
+def _matches(token: Dict, owner_id: Optional[int], status: Optional[str]) -> bool:
+    """Check a token against the optional owner and status filters."""
+    return ((owner_id is None or token.get("owner_id") == owner_id)
+            and (status is None or token.get("status") == status))
+
+
+class JsonTokenStore:
+    """Class for keeping tokens in one JSON document."""
+
+    def __init__(self, token_file: str = "config/tokens.json", backups: int = 3):
+        """Initialize the store.
+
+        Args:
+            token_file: Path to the token file
+            backups: Earlier versions of the file to keep
+        """
+        self.token_file = token_file
+        self.backups = backups
+        # The version before the last change, restored by an emergency reset.
+        self.backup_file = backup_path(token_file)
+        self.tokens = {}
+
+    def load(self) -> Tuple[Dict[str, Dict], Optional[str]]:
+        """Read every token and the active token ID. Writes nothing."""
+        if not os.path.exists(self.token_file):
+            logger.info("No tokens configuration file found, using defaults")
+            self.tokens = {}
+            return self.tokens, None
+
+        with open(self.token_file, "r") as f:
+            data = json.load(f)
+        self.tokens = data.get("tokens", {})
+        return self.tokens, data.get("active_token_id")
+
+    def signature(self):
+        """Identify the stored version; it changes whenever the file does."""
+        return file_signature(self.token_file)
+
+    def locked(self):
+        """Lock the token file against writers in other processes."""
+        return file_lock(self.token_file)
+
+    def load_backup(self) -> Optional[Tuple[Dict[str, Dict], Optional[str]]]:
+        """Read the version before the last change, or None if there is none."""
+        if not os.path.exists(self.backup_file):
+            return None
+        with open(self.backup_file, "r") as f:
+            data = json.load(f)
+        return data.get("tokens", {}), data.get("active_token_id")
+
+    def save(self, tokens: Dict[str, Dict], active_token_id: Optional[str],
+             changed: Iterable[str] = None, deleted: Iterable[str] = ()) -> bool:
+        """Persist the tokens. The whole document is written whatever changed.
+
+        Returns:
+            bool: True if the file was written, False if it was unchanged
+        """
+        self.tokens = tokens
+        data = {"tokens": tokens, "active_token_id": active_token_id}
+        return write_json(self.token_file, data, backups=self.backups, stamp_field="last_updated")
+
+    def find(self, owner_id: int = None, status: str = None, limit: int = None) -> List[str]:
+        """Get the IDs of the tokens of an owner and/or with a status, oldest first."""
+        found = []
+        for token_id, token in self.tokens.items():
+            if _matches(token, owner_id, status):
+                found.append(token_id)
+                if limit and len(found) >= limit:
+                    break
+        return found
+
+    def close(self):
+        """Release the store. Nothing is held open."""
+
+
+class SqliteTokenStore:
+    """Class for keeping tokens in an indexed SQLite table."""
+
+    def __init__(self, db_file: str = "data/tokens.db", legacy_file: str = "config/tokens.json"):
+        """Initialize the store.
+
+        Args:
+            db_file: Path to the SQLite database
+            legacy_file: tokens.json imported when the database is first created
+        """
+        self.db_file = db_file
+        self.legacy_file = legacy_file
+        self.backup_file = None
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self, create: bool = True) -> Optional[sqlite3.Connection]:
+        """Open the database on first use. Called with the lock held."""
+        if self._conn is None:
+            if not create and not os.path.exists(self.db_file):
+                return None
+            if os.path.dirname(self.db_file):
+                os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(TOKEN_SCHEMA)
+            self._conn.commit()
+        return self._conn
+
+    def _row(self, token: Dict) -> Tuple:
+        """Turn a token dict into a table row."""
+        extra = {key: value for key, value in token.items() if key not in TOKEN_COLUMNS}
+        return tuple(token.get(column) for column in TOKEN_COLUMNS) + (
+            json.dumps(extra) if extra else None,
+        )
+
+    @staticmethod
+    def _token(row: Tuple) -> Dict:
+        """Turn a table row into a token dict."""
+        token = dict(zip(TOKEN_COLUMNS, row[:-1]))
+        if row[-1]:
+            token.update(json.loads(row[-1]))
+        return token
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """Import the legacy JSON token file once. Called with the lock held."""
+        with open(self.legacy_file, "r") as f:
+            data = json.load(f)
+        tokens = data.get("tokens", {})
+        self._write(conn, tokens, data.get("active_token_id"), None, ())
+        os.replace(self.legacy_file, f"{self.legacy_file}.migrated")
+        logger.info(f"Migrated {len(tokens)} tokens from {self.legacy_file} to {self.db_file}")
+
+    def load(self) -> Tuple[Dict[str, Dict], Optional[str]]:
+        """Read every token and the active token ID.
+
+        Nothing is written unless a legacy token file has to be migrated.
+        """
+        with self._lock:
+            migrate = self.legacy_file and os.path.exists(self.legacy_file)
+            conn = self._connect(create=bool(migrate))
+            if conn is None:
+                logger.info("No token database found, using defaults")
+                return {}, None
+
+            if migrate and not conn.execute("SELECT 1 FROM tokens LIMIT 1").fetchone():
+                self._migrate(conn)
+
+            tokens = {
+                row[0]: self._token(row) for row in conn.execute(
+                    f"SELECT {', '.join(TOKEN_COLUMNS)}, extra FROM tokens ORDER BY created, id"
+                )
+            }
+            row = conn.execute(
+                "SELECT value FROM token_settings WHERE key = 'active_token_id'"
+            ).fetchone()
+        return tokens, row[0] if row else None
+
+    def signature(self):
+        """Identify the stored version; it changes when another connection commits."""
+        with self._lock:
+            conn = self._connect(create=False)
+            if conn is None:
+                return None
+            return conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def locked(self):
+        """Lock the database against writers in other processes between merge and save."""
+        return file_lock(self.db_file)
+
+    def load_backup(self) -> Optional[Tuple[Dict[str, Dict], Optional[str]]]:
+        """Get an earlier version of the tokens. The database keeps none."""
+        return None
+
+    def _write(self, conn: sqlite3.Connection, tokens: Dict[str, Dict],
+               active_token_id: Optional[str], changed: Optional[Iterable[str]],
+               deleted: Iterable[str]):
+        """Write changed rows in one transaction. Called with the lock held."""
+        placeholders = ", ".join("?" * (len(TOKEN_COLUMNS) + 1))
+        with conn:
+            if changed is None:
+                conn.execute("DELETE FROM tokens")
+                changed = tokens.keys()
+            conn.executemany(
+                f"INSERT OR REPLACE INTO tokens ({', '.join(TOKEN_COLUMNS)}, extra) "
+                f"VALUES ({placeholders})",
+                [self._row(tokens[token_id]) for token_id in changed if token_id in tokens],
+            )
+            conn.executemany("DELETE FROM tokens WHERE id = ?", [(token_id,) for token_id in deleted])
+            conn.execute(
+                "INSERT OR REPLACE INTO token_settings (key, value) VALUES ('active_token_id', ?)",
+                (active_token_id,),
+            )
+
+    def save(self, tokens: Dict[str, Dict], active_token_id: Optional[str],
+             changed: Iterable[str] = None, deleted: Iterable[str] = ()) -> bool:
+        """Persist the given tokens.
+
+        Args:
+            tokens: Every token by ID
+            active_token_id: ID of the active token
+            changed: IDs of the tokens to write, or None to replace all of them
+            deleted: IDs of the tokens to remove
+
+        Returns:
+            bool: Always True
+        """
+        with self._lock:
+            self._write(self._connect(), tokens, active_token_id, changed, deleted)
+        return True
+
+    def find(self, owner_id: int = None, status: str = None, limit: int = None) -> List[str]:
+        """Get the IDs of the tokens of an owner and/or with a status, oldest first."""
+        clauses, params = [], []
+        if owner_id is not None:
+            clauses.append("owner_id = ?")
+            params.append(owner_id)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        query = "SELECT id FROM tokens"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY created, id"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            conn = self._connect(create=False)
+            if conn is None:
+                return []
+            return [row[0] for row in conn.execute(query, params)]
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_token_store(kind: str = STORE_JSON, token_file: str = "config/tokens.json",
+                       db_file: str = "data/tokens.db", backups: int = 3):
+    """Create the token store named by TOKEN_STORE.
+
+    Args:
+        kind: ``json`` or ``sqlite``
+        token_file: JSON token file, migrated into the database for sqlite
+        db_file: SQLite database for sqlite
+        backups: Earlier versions of the JSON file to keep
+
+    Raises:
+        ValueError: If the kind is unknown
+    """
+    if kind == STORE_JSON:
+        return JsonTokenStore(token_file, backups)
+    if kind == STORE_SQLITE:
+        return SqliteTokenStore(db_file, legacy_file=token_file)
+    raise ValueError(f"Unknown token store '{kind}', use '{STORE_JSON}' or '{STORE_SQLITE}'")
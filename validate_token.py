@@ -4,6 +4,8 @@ import requests
 import logging
 from dotenv import load_dotenv
 
+from statefile import write_file
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -81,12 +83,9 @@ def update_token_in_env(token):
         with open('.env', 'r') as f:
             lines = f.readlines()
         
-        with open('.env', 'w') as f:
-            for line in lines:
-                if line.startswith('TELEGRAM_BOT_TOKEN='):
-                    f.write(f'TELEGRAM_BOT_TOKEN={token}\n')
-                else:
-                    f.write(line)
+        lines = [f'TELEGRAM_BOT_TOKEN={token}\n' if line.startswith('TELEGRAM_BOT_TOKEN=') else line
+                 for line in lines]
+        write_file('.env', ''.join(lines), backups=1)
         return True, "Token updated in .env file"
     except Exception as e:
         return False, f"Error updating token in .env file: {str(e)}"